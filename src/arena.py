@@ -0,0 +1,233 @@
+import os
+import math
+import time
+import random
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import chess
+import numpy as np
+
+from mcts import MCTS
+
+_worker_engines = None
+_stop_event = None
+
+def score_interval(wins, draws, losses, z=1.96):
+    """Mean score of the candidate and its normal-approximation confidence interval."""
+    games = wins + draws + losses
+    if games == 0:
+        return 0.5, 0.0, 1.0
+
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = z * math.sqrt(variance / games)
+    return score, max(score - margin, 0.0), min(score + margin, 1.0)
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return 400 * math.log10(score / (1 - score))
+
+def elo_to_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    """
+    Log-likelihood ratio of H1 (candidate elo1 stronger) against H0 (elo0), with the
+    normal approximation of the trinomial game results used by engine testing frameworks.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0
+
+    # half a game of each result keeps the variance positive when only one kind came in so far
+    wins, draws, losses = wins + 0.5, draws + 0.5, losses + 0.5
+    total = wins + draws + losses
+    score = (wins + 0.5 * draws) / total
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / total
+    score0, score1 = elo_to_score(elo0), elo_to_score(elo1)
+    return games * (score1 - score0) * (2 * score - score0 - score1) / (2 * variance)
+
+def sprt_bounds(alpha, beta):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+def random_opening(plies, seed):
+    rng = random.Random(seed)
+    board = chess.Board()
+    for _ in range(plies):
+        moves = list(board.legal_moves)
+        if not moves or board.is_game_over():
+            break
+        board.push(rng.choice(moves))
+    return board.fen()
+
+def init_arena_worker(candidate_path, baseline_path, stop_event=None):
+    from engine import ChessEngine
+    from model.loader import load_model
+
+    global _worker_engines, _stop_event
+    _worker_engines = [ChessEngine(load_model(path)) for path in (candidate_path, baseline_path)]
+    _stop_event = stop_event
+
+class _ArenaGame:
+    def __init__(self, fen, candidate_white, engines, C):
+        self.board = chess.Board(fen)
+        self.candidate_white = candidate_white
+        # each side searches with its own tree, kept between its moves
+        self.searches = [MCTS(engine, engine.game, reuse_tree=True) for engine in engines]
+        self.C = C
+        self.root = None
+        self.simulations = 0
+
+    def player(self):
+        # 0 is the candidate, 1 the baseline
+        return 0 if self.board.turn == self.candidate_white else 1
+
+    def search(self):
+        return self.searches[self.player()]
+
+def play_arena_games(task):
+    """
+    Play all games of a task at once. Every round, each live game selects leaves for the side
+    to move, and the leaves of all games that wait for the same model go through one network call.
+    Once the arena has decided, the games still running are abandoned and their results are None.
+    """
+    engines = _worker_engines
+    games = [
+        _ArenaGame(fen, candidate_white, engines, task["C"])
+        for fen in task["openings"] for candidate_white in (True, False)
+    ]
+    results = [None] * len(games)
+    live = [i for i in range(len(games))]
+
+    while live:
+        if _stop_event is not None and _stop_event.is_set():
+            break
+
+        pending = ([], [])
+        for i in live:
+            game = games[i]
+            if game.root is None:
+                game.root = game.search().start_search(game.board, game.C)
+
+            paths = game.search().collect_leaves(game.root, min(task["leaves_per_game"], task["simulations"] - game.simulations))
+            pending[game.player()].append((i, paths))
+
+        for player, requests in enumerate(pending):
+            leaves = [path[-1] for _, paths in requests for path in paths]
+            if not leaves:
+                continue
+
+            evaluations = engines[player].evaluate_batch([leaf.state for leaf in leaves], [leaf.perspective for leaf in leaves])
+            offset = 0
+            for i, paths in requests:
+                games[i].search().apply_evaluations(paths, evaluations[offset:offset + len(paths)])
+                games[i].simulations += len(paths)
+                offset += len(paths)
+
+        for i in list(live):
+            game = games[i]
+            if game.simulations < task["simulations"]:
+                continue
+
+            action_probs = game.search().finish_search(game.root, game.simulations)
+            game.board.push(engines[0].game.index_to_move(int(np.argmax(action_probs))))
+            game.root = None
+            game.simulations = 0
+
+            if game.board.is_game_over(claim_draw=True) or game.board.ply() >= task["max_plies"]:
+                result = game.board.result(claim_draw=True)
+                white_score = 1 if result == "1-0" else -1 if result == "0-1" else 0
+                results[i] = white_score if game.candidate_white else -white_score
+                live.remove(i)
+
+    return results
+
+def run_arena(candidate_path, baseline_path, num_games=400, simulations=100, C=1.41, openings_per_task=8,
+              leaves_per_game=8, num_workers=None, opening_plies=4, max_plies=400, elo0=0, elo1=10,
+              alpha=0.05, beta=0.05, seed=None):
+    """
+    Play up to `num_games` games between two models (alternating colors on shared random openings)
+    and stop early once the SPRT of elo0 against elo1 accepts either hypothesis.
+    """
+    num_workers = num_workers or os.cpu_count()
+    rng = random.Random(seed)
+    lower, upper = sprt_bounds(alpha, beta)
+
+    # every opening is played twice, once with each color, so both halves of a pair come back together
+    tasks = []
+    pairs = max(num_games // 2, 1)
+    for start in range(0, pairs, openings_per_task):
+        tasks.append({
+            "openings": [random_opening(opening_plies, rng.getrandbits(32)) for _ in range(min(openings_per_task, pairs - start))],
+            "simulations": simulations,
+            "leaves_per_game": leaves_per_game,
+            "max_plies": max_plies,
+            "C": C,
+        })
+
+    wins = draws = losses = 0
+    llr = 0.0
+    decision = None
+    started = time.perf_counter()
+
+    context = mp.get_context("spawn")
+    # set on a decision: tasks already running stop after their current round instead of finishing their games
+    stop_event = context.Event()
+    executor = ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=context,
+        initializer=init_arena_worker,
+        initargs=(candidate_path, baseline_path, stop_event)
+    )
+
+    try:
+        futures = {executor.submit(play_arena_games, task) for task in tasks}
+        while futures and decision is None:
+            finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+
+            for future in finished:
+                for result in future.result():
+                    if result is None:
+                        continue
+                    wins += result == 1
+                    draws += result == 0
+                    losses += result == -1
+
+            llr = sprt_llr(wins, draws, losses, elo0, elo1)
+            score, score_low, score_high = score_interval(wins, draws, losses)
+            print(f"Games {wins + draws + losses}: +{wins} ={draws} -{losses}, "
+                  f"elo {score_to_elo(score):+.0f} [{score_to_elo(score_low):+.0f}, {score_to_elo(score_high):+.0f}], "
+                  f"LLR {llr:.2f} ({lower:.2f}, {upper:.2f})")
+
+            if llr >= upper:
+                decision = "H1"
+            elif llr <= lower:
+                decision = "H0"
+    finally:
+        stop_event.set()
+        executor.shutdown(cancel_futures=True)
+
+    score, score_low, score_high = score_interval(wins, draws, losses)
+    summary = {
+        "games": wins + draws + losses,
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "score": score,
+        "elo": score_to_elo(score),
+        "elo_interval": [score_to_elo(score_low), score_to_elo(score_high)],
+        "llr": llr,
+        "llr_bounds": [lower, upper],
+        "decision": decision,
+        "seconds": time.perf_counter() - started,
+    }
+
+    if decision == "H1":
+        print(f"Candidate is stronger (SPRT accepted elo >= {elo1})")
+    elif decision == "H0":
+        print(f"Candidate is not stronger (SPRT accepted elo <= {elo0})")
+    else:
+        print("No SPRT decision within the game limit")
+
+    return summary
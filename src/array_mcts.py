@@ -0,0 +1,244 @@
+import math
+import time
+import numpy as np
+
+from mcts import K_TOP, VIRTUAL_LOSS, out_of_time, search_limit, select_top_policies, stop_requested
+from telemetry import phase_timer
+
+class ArrayTree:
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.capacity = capacity
+
+        self.visit_count = np.zeros(capacity, dtype=np.int32)
+        self.value_sum = np.zeros(capacity, dtype=np.float32)
+        self.prior = np.zeros(capacity, dtype=np.float32)
+        self.action = np.full(capacity, -1, dtype=np.int32)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.full(capacity, -1, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int32)
+
+    def _grow(self, required):
+        capacity = self.capacity
+        while capacity < required:
+            capacity *= 2
+
+        for name, fill in (("visit_count", 0), ("value_sum", 0), ("prior", 0), ("action", -1),
+                           ("parent", -1), ("first_child", -1), ("num_children", 0)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+        self.capacity = capacity
+
+    def add_root(self):
+        if self.size + 1 > self.capacity:
+            self._grow(self.size + 1)
+
+        root = self.size
+        self.size += 1
+        return root
+
+    def add_children(self, node, actions, priors):
+        count = len(actions)
+        if self.size + count > self.capacity:
+            self._grow(self.size + count)
+
+        start = self.size
+        end = start + count
+        self.action[start:end] = actions
+        self.prior[start:end] = priors
+        self.parent[start:end] = node
+        self.first_child[node] = start
+        self.num_children[node] = count
+        self.size = end
+
+    def is_expanded(self, node):
+        return self.num_children[node] > 0
+
+    def children(self, node):
+        start = self.first_child[node]
+        return start, start + self.num_children[node]
+
+    def select_child(self, node, C):
+        start, end = self.children(node)
+        visits = self.visit_count[start:end]
+        value_sums = self.value_sum[start:end]
+
+        q_values = np.where(visits > 0, 1 - (value_sums / np.maximum(visits, 1) + 1) / 2, 0)
+        ucb = q_values + C * (math.sqrt(self.visit_count[node]) / (visits + 1)) * self.prior[start:end]
+
+        return start + int(np.argmax(ucb))
+
+    def add_virtual_loss(self, node, virtual_loss):
+        self.visit_count[node] += virtual_loss
+        self.value_sum[node] += virtual_loss
+
+    def backpropagate(self, node, value, virtual_loss=0):
+        # every ply switches the side to move, so the value flips at each step up
+        while node != -1:
+            parent = self.parent[node]
+            loss = virtual_loss if parent != -1 else 0
+
+            self.value_sum[node] += value - loss
+            self.visit_count[node] += 1 - loss
+
+            value = -value
+            node = parent
+
+    def revert_virtual_loss(self, node, virtual_loss):
+        while self.parent[node] != -1:
+            self.visit_count[node] -= virtual_loss
+            self.value_sum[node] -= virtual_loss
+            node = self.parent[node]
+
+class ArrayMCTS:
+    def __init__(self, engine, game, virtual_loss=VIRTUAL_LOSS, capacity=1024):
+        self._game = game
+        self._evaluate = engine.evaluate
+        self._evaluate_batch = engine.evaluate_batch
+        self._virtual_loss = virtual_loss
+        self._capacity = capacity
+        self.stats = None
+        self.simulations_done = 0
+        # the array tree is never pruned, it is only counted for telemetry
+        self.nodes_pruned = 0
+        self._last_tree = None
+
+    @property
+    def node_count(self):
+        return self._last_tree.size if self._last_tree is not None else 0
+
+    def reset(self):
+        # every search builds a fresh tree, only the last one is kept for its principal variation
+        self._last_tree = None
+
+    def search(self, state, simulations=100, C=1.41, batch_size=1, deadline=None, stop_event=None):
+        limit = search_limit(simulations, deadline, stop_event)
+        started = time.perf_counter()
+
+        tree = ArrayTree(self._capacity)
+        root = tree.add_root()
+        board = state.copy()
+
+        done = 0
+        while done < limit:
+            if batch_size > 1:
+                done += self._search_batch(tree, root, board, min(batch_size, limit - done), C)
+            else:
+                done += self._simulate(tree, root, board, C)
+
+            if deadline is not None or stop_event is not None:
+                start, end = tree.children(root)
+                visit_counts = tree.visit_count[start:end]
+                if out_of_time(visit_counts, done, limit, started, deadline) or stop_requested(visit_counts, stop_event):
+                    break
+
+        self.simulations_done = done
+        self._last_tree = tree
+
+        start, end = tree.children(root)
+        action_probs = np.zeros(self._game.action_size)
+        action_probs[tree.action[start:end]] = tree.visit_count[start:end]
+        if action_probs.sum() == 0:
+            # too short a search to visit any move: fall back to the priors of the expanded root
+            action_probs[tree.action[start:end]] = tree.prior[start:end]
+        if action_probs.sum() > 0:
+            # a terminal root has no moves to give probabilities to
+            action_probs /= action_probs.sum()
+        return action_probs
+
+    def principal_variation(self, max_length=10):
+        actions = []
+        tree = self._last_tree
+        node = 0
+
+        while tree is not None and tree.is_expanded(node) and len(actions) < max_length:
+            start, end = tree.children(node)
+            node = start + int(np.argmax(tree.visit_count[start:end]))
+            if tree.visit_count[node] == 0:
+                break
+            actions.append(int(tree.action[node]))
+
+        return actions
+
+    def _simulate(self, tree, root, board, C):
+        phase = phase_timer(self.stats)
+
+        with phase("select"):
+            node, depth = self._descend(tree, root, board, C, 0)
+
+        with phase("evaluate"):
+            is_terminal, value, policy = self._evaluate(board, self._game.get_perspective(board))
+        if not is_terminal:
+            with phase("expand"):
+                self._expand(tree, node, board, policy)
+        with phase("backpropagate"):
+            tree.backpropagate(node, float(np.squeeze(value)))
+
+        for _ in range(depth):
+            board.pop()
+        return 1
+
+    def _descend(self, tree, root, board, C, virtual_loss):
+        node = root
+        depth = 0
+
+        # nodes only keep their move, the position is replayed on the shared board
+        while tree.is_expanded(node):
+            node = tree.select_child(node, C)
+            tree.add_virtual_loss(node, virtual_loss)
+            board.push(self._game.index_to_move(tree.action[node]))
+            depth += 1
+
+        return node, depth
+
+    def _search_batch(self, tree, root, board, batch_size, C):
+        leaves = []
+        leaf_boards = []
+        collisions = []
+        phase = phase_timer(self.stats)
+
+        with phase("select"):
+            for _ in range(batch_size):
+                node, depth = self._descend(tree, root, board, C, self._virtual_loss)
+
+                if node in leaves:
+                    # the virtual loss stays until the batch is collected, so the next descents spread out
+                    collisions.append(node)
+                else:
+                    leaves.append(node)
+                    with phase("board_copy"):
+                        leaf_boards.append(board.copy())
+                for _ in range(depth):
+                    board.pop()
+
+            for node in collisions:
+                tree.revert_virtual_loss(node, self._virtual_loss)
+
+        with phase("evaluate"):
+            results = self._evaluate_batch(leaf_boards, [self._game.get_perspective(leaf_board) for leaf_board in leaf_boards])
+
+        for node, leaf_board, (is_terminal, value, policy) in zip(leaves, leaf_boards, results):
+            if not is_terminal:
+                with phase("expand"):
+                    self._expand(tree, node, leaf_board, policy)
+            with phase("backpropagate"):
+                tree.backpropagate(node, float(np.squeeze(value)), self._virtual_loss)
+
+        if self.stats is not None:
+            self.stats.count("batch_leaves", len(leaves))
+            self.stats.count("batch_capacity", batch_size)
+
+        return len(leaves)
+
+    def _expand(self, tree, node, board, policy, k_top=K_TOP):
+        actions, priors = select_top_policies(self._game, board, policy, k_top)
+        if len(actions) == 0:
+            return
+
+        tree.add_children(node, actions, priors)
+
+        if self.stats is not None:
+            self.stats.count("nodes_created", len(actions))
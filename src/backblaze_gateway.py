@@ -1,11 +1,13 @@
 from b2sdk.v2 import InMemoryAccountInfo, B2Api
 
 class BackblazeGateway:
-    def __init__(self, application_key_id, application_key, bucket_name):
+    def __init__(self, application_key_id, application_key, bucket_name, upload_threads=10, min_part_size=None):
+        # files above the part size are sent as a large file, with its parts uploaded in parallel
         self.info = InMemoryAccountInfo()
-        self.b2_api = B2Api(self.info)
+        self.b2_api = B2Api(self.info, max_upload_workers=upload_threads)
         self.b2_api.authorize_account("production", application_key_id, application_key)
         self.bucket = self.b2_api.get_bucket_by_name(bucket_name)
+        self.min_part_size = min_part_size
 
     def upload_file(self, local_path, remote_path, file_info=None):
         if file_info is None:
@@ -14,4 +16,5 @@ class BackblazeGateway:
             local_file=local_path,
             file_name=remote_path,
             file_infos=file_info,
-        )
\ No newline at end of file
+            min_part_size=self.min_part_size,
+        )
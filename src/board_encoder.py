@@ -0,0 +1,77 @@
+import chess
+import numpy as np
+
+class BoardEncoder:
+    def __init__(self, max_batch_size=64):
+        self._buffer = np.zeros((max_batch_size, 8, 8, 16), dtype=np.float32)
+        self._masks = np.zeros((max_batch_size, 12), dtype="<u8")
+        self._castling = np.zeros((max_batch_size, 4), dtype=np.float32)
+
+    def encode(self, board):
+        return self.encode_batch([board])[0].copy()
+
+    def encode_batch(self, boards, out=None):
+        """
+        Encode boards into an (N, 8, 8, 16) float32 array.
+
+        Without `out` the result is a view of an internal buffer that the next call overwrites.
+        """
+        size = len(boards)
+        if size > len(self._masks):
+            self._grow(size)
+        if out is None:
+            out = self._buffer[:size]
+
+        masks = self._masks[:size]
+        castling = self._castling[:size]
+
+        for i, board in enumerate(boards):
+            white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+
+            # planes 0-5 are white pawn..king, 6-11 the same for black
+            masks[i] = (
+                board.pawns & white, board.knights & white, board.bishops & white,
+                board.rooks & white, board.queens & white, board.kings & white,
+                board.pawns & black, board.knights & black, board.bishops & black,
+                board.rooks & black, board.queens & black, board.kings & black,
+            )
+            castling[i] = (
+                board.has_kingside_castling_rights(chess.WHITE),
+                board.has_queenside_castling_rights(chess.WHITE),
+                board.has_kingside_castling_rights(chess.BLACK),
+                board.has_queenside_castling_rights(chess.BLACK),
+            )
+
+        # bit n of a mask is square n (a1 = 0), i.e. rank n // 8 and file n % 8
+        bits = np.unpackbits(masks.view(np.uint8).reshape(size, 12, 8), axis=2, bitorder="little")
+        bits = bits.reshape(size, 12, 8, 8)[:, :, ::-1, :]
+
+        out[:, :, :, :12] = bits.transpose(0, 2, 3, 1)
+        out[:, :, :, 12:] = castling[:, np.newaxis, np.newaxis, :]
+        return out
+
+    def _grow(self, size):
+        self._buffer = np.zeros((size, 8, 8, 16), dtype=np.float32)
+        self._masks = np.zeros((size, 12), dtype="<u8")
+        self._castling = np.zeros((size, 4), dtype=np.float32)
+
+def decode_board(planes, turn=chess.WHITE):
+    """
+    The board of (8, 8, 16) encoder planes. The planes hold no side to move, en passant square
+    or move counters, so the side to move is taken from `turn` and the rest is left unset.
+    """
+    planes = np.asarray(planes)
+    board = chess.Board(None)
+    board.turn = turn
+
+    # row 0 of the planes is rank 8, squares are numbered from a1
+    occupied = planes[::-1, :, :12].reshape(64, 12) > 0
+    for square, plane in zip(*np.nonzero(occupied)):
+        board.set_piece_at(int(square), chess.Piece(int(plane) % 6 + 1, chess.WHITE if plane < 6 else chess.BLACK))
+
+    rights = planes[0, 0, 12:] > 0
+    board.castling_rights = (
+        (chess.BB_H1 if rights[0] else 0) | (chess.BB_A1 if rights[1] else 0)
+        | (chess.BB_H8 if rights[2] else 0) | (chess.BB_A8 if rights[3] else 0)
+    )
+    return board
@@ -6,6 +6,7 @@ class ChessGame:
         self.action_size = 4672  
         
         self._move_to_index_map, self._index_to_move_map = self._build_move_index()
+        self._move_index_table = self._build_move_index_table()
 
     def _build_move_index(self):
         QUEEN_DIRS = [(-1, 0), (-1, 1), (0, 1), (1, 1),
@@ -77,6 +78,18 @@ class ChessGame:
 
         return move_to_index_map, index_to_move_map
 
+    def _build_move_index_table(self):
+        # flat (from_square, to_square, promotion) -> action index lookup, -1 where no action exists
+        table = np.full(64 * 64 * 7, -1, dtype=np.int32)
+        for index, move in enumerate(self._index_to_move_map):
+            if move is not None:
+                table[self._move_key(move)] = index
+        return table
+
+    @staticmethod
+    def _move_key(move):
+        return (move.from_square * 64 + move.to_square) * 7 + (move.promotion or 0)
+
     def get_initial_state(self):
         return chess.Board()
 
@@ -86,19 +99,23 @@ class ChessGame:
 
         return next_state
 
-    def get_valid_moves(self, state):
-        valid_moves = np.zeros(self.action_size, dtype=np.uint8)
-        legal_moves = list(state.legal_moves)
-        for move in legal_moves:
-            idx = self.move_to_index(move)
-            valid_moves[idx] = 1
+    def get_valid_moves(self, state, out=None):
+        valid_moves = np.zeros(self.action_size, dtype=np.uint8) if out is None else out
+        if out is not None:
+            valid_moves.fill(0)
+        valid_moves[self.get_legal_indices(state)] = 1
         return valid_moves
+
+    def get_legal_indices(self, state):
+        move_key = self._move_key
+        return self._move_index_table[[move_key(move) for move in state.legal_moves]]
     
     def get_perspective(self, state):
         return "white" if state.turn else "black"
 
     def move_to_index(self, move):
-        return self._move_to_index_map.get(move.uci())
+        index = self._move_index_table[self._move_key(move)]
+        return int(index) if index >= 0 else None
 
     def index_to_move(self, index):
         return self._index_to_move_map[index] 
@@ -1,16 +1,62 @@
 import os 
 import h5py
 import chess
+import chess.polyglot
 import numpy as np
 import uuid
+import time
+import random
+import multiprocessing as mp
 from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def play_game_worker(func, max_simulations):
-    return func(chess.Board(), max_simulations)
+from game_records import GameRecordWriter, read_games
+from telemetry import GameTelemetry, SearchStats, TelemetryLog
+
+_worker_trainer = None
+
+def init_self_play_worker(model_path, engine_options=None, warm_up_batch_sizes=(1,)):
+    from engine import ChessEngine
+    from model.loader import load_model
+
+    # loaded once per process, every game played by this worker reuses it
+    model = load_model(model_path, warm_up_batch_sizes)
+
+    global _worker_trainer
+    _worker_trainer = ChessTrainer(ChessEngine(model, **(engine_options or {})))
+
+def init_inference_worker(request_queue, response_queues, free_clients, engine_options=None):
+    from engine import ChessEngine
+    from inference_server import connect_client
+
+    global _worker_trainer
+    client = connect_client(request_queue, response_queues, free_clients)
+    _worker_trainer = ChessTrainer(ChessEngine(client, **(engine_options or {})))
+
+def play_game_task(task):
+    random.seed(task["seed"])
+    np.random.seed(task["seed"])
+
+    board = chess.Board(task["fen"])
+    move_time = task.get("move_time")
+    if not task.get("telemetry"):
+        return _worker_trainer.play_game(board, task["max_simulations"], task["batch_size"], move_time=move_time), None
+
+    engine = _worker_trainer._engine
+    stats = SearchStats()
+    engine.set_stats(stats)
+    try:
+        telemetry = GameTelemetry(engine, stats)
+        game_data = _worker_trainer.play_game(board, task["max_simulations"], task["batch_size"], telemetry, move_time)
+    finally:
+        engine.set_stats(None)
+
+    return game_data, telemetry.moves + [telemetry.game]
 
 class ChessTrainer:
     def __init__(self, engine):  
         self._engine = engine
+        self._executor = None
+        self._executor_config = None
 
     def _get_simulations_num(self, board, max_simulations):
         board_copy = board.copy()
@@ -28,41 +74,126 @@ class ChessTrainer:
         sim_count = max(int(max_simulations * 0.2), min(sim_count, max_simulations))
         return max(1, min(sim_count, max_simulations))
 
-    def play_game(self, initial_board, max_simulations=100):
+    def play_game(self, initial_board, max_simulations=100, batch_size=1, telemetry=None, move_time=None):
         game_data = []
         board = initial_board.copy() if initial_board else chess.Board()
+        self._engine.reset()
 
         while not board.is_game_over():
-            simulations = self._get_simulations_num(board, max_simulations)
-            move, policy, value = self._engine.best_move(board, simulations, 1.41)
+            started = time.perf_counter()
+            if move_time is not None:
+                # a fixed time per move, with max_simulations as a cap
+                move, policy, value, simulations = self._engine.timed_best_move(board, move_time, 1.41, batch_size, max_simulations)
+            else:
+                simulations = self._get_simulations_num(board, max_simulations)
+                move, policy, value = self._engine.best_move(board, simulations, 1.41, batch_size)
             
             state = self._engine.board_to_tensor(board)
-            game_data.append((state, policy, value))
+            game_data.append((state, policy, value, chess.polyglot.zobrist_hash(board)))
 
-            print(move)
+            if telemetry is not None:
+                telemetry.record_move(board, move, simulations, time.perf_counter() - started)
             board.push(move)
+
+        if telemetry is not None:
+            telemetry.finish(board)
         
         return game_data
         
-    def generate_games(self, save_folder,  num_games=10, max_simulations=100):
+    def generate_games(self, save_folder,  num_games=10, max_simulations=100, batch_size=1,
+                       inference_server=None, engine_options=None, model_path=None, seed=None,
+                       telemetry_path=None, move_time=None):
         os.makedirs(save_folder, exist_ok=True)
         buffer = []
+        positions = 0
+        started = time.perf_counter()
 
-        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
-            futures = [executor.submit(play_game_worker, self.play_game, max_simulations) for _ in range(num_games)]
+        executor = self._get_executor(model_path, inference_server, engine_options, batch_size)
+        telemetry_log = TelemetryLog(telemetry_path) if telemetry_path else None
 
-            for future in as_completed(futures):
-                game_memory = future.result()
+        rng = random.Random(seed)
+        tasks = [
+            {
+                "seed": rng.getrandbits(32),
+                "fen": chess.STARTING_FEN,
+                "max_simulations": max_simulations,
+                "batch_size": batch_size,
+                "telemetry": telemetry_log is not None,
+                "move_time": move_time,
+            }
+            for _ in range(num_games)
+        ]
+        futures = [executor.submit(play_game_task, task) for task in tasks]
+
+        try:
+            for game_index, future in enumerate(as_completed(futures)):
+                game_memory, records = future.result()
                 buffer.append(game_memory)
+                positions += len(game_memory)
+
+                if telemetry_log is not None:
+                    for record in records:
+                        telemetry_log.write({"game": game_index, **record})
 
                 if len(buffer) >= 10:
                     self.save_games(buffer, save_folder)
                     buffer = []
 
-        if buffer:
-            self.save_games(buffer, save_folder)
+            if buffer:
+                self.save_games(buffer, save_folder)
+
+            if telemetry_log is not None:
+                elapsed = time.perf_counter() - started
+                telemetry_log.write({
+                    "event": "run",
+                    "games": num_games,
+                    "positions": positions,
+                    "seconds": elapsed,
+                    "games_per_hour": num_games * 3600 / elapsed,
+                    "max_simulations": max_simulations,
+                    "move_time": move_time,
+                    "batch_size": batch_size,
+                    "engine_options": sorted(name for name, value in (engine_options or {}).items() if value is not None and value is not False),
+                })
+        finally:
+            if telemetry_log is not None:
+                telemetry_log.close()
 
-    def save_games(self, games_data, save_folder):
+    def _get_executor(self, model_path, inference_server, engine_options, batch_size):
+        config = (model_path, inference_server, engine_options, batch_size)
+        if self._executor is not None and self._executor_config == config:
+            return self._executor
+
+        self.close()
+
+        if inference_server is not None:
+            max_workers = inference_server.num_clients
+            initializer = init_inference_worker
+            initargs = (*inference_server.client_args(), engine_options)
+        elif model_path is not None:
+            max_workers = os.cpu_count()
+            initializer = init_self_play_worker
+            initargs = (model_path, engine_options, tuple(sorted({1, batch_size})))
+        else:
+            raise ValueError("Self-play workers need a model path or an inference server.")
+
+        # spawned, so workers never inherit the parent's TensorFlow runtime
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=initializer,
+            initargs=initargs
+        )
+        self._executor_config = config
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._executor_config = None
+
+    def save_games(self, games_data, save_folder, compact=True):
         if not save_folder:
             raise ValueError("path not provided.")
 
@@ -72,6 +203,13 @@ class ChessTrainer:
         file_uuid = str(uuid.uuid4())
         save_path = os.path.join(save_folder, f"{file_uuid}.h5")
 
+        if compact:
+            with GameRecordWriter(save_path) as writer:
+                writer.append_games(games_data)
+
+            print(f"Games saved successfully in: {save_path}")
+            return save_path
+
         with h5py.File(save_path, "w") as h5_file:
             for game_idx, game_data in enumerate(games_data):
                 game_group = h5_file.create_group(f"game_{game_idx}")
@@ -101,16 +239,9 @@ class ChessTrainer:
             h5_files = [load_path]
 
         for file in h5_files:
-            with h5py.File(file, "r") as h5_file:
-                for game_name in h5_file.keys():
-                    game_group = h5_file[game_name]
-                    
-                    states = game_group["states"][:]
-                    policies = game_group["policies"][:]
-                    values = game_group["values"][:]
-
-                    game_data = [(states[i], policies[i], values[i]) for i in range(len(states))]
-                    loaded_games.append(game_data)
+            for states, policies, values, _ in read_games(file):
+                game_data = [(states[i], policies[i], values[i]) for i in range(len(states))]
+                loaded_games.append(game_data)
         
         print(f"Loaded {len(loaded_games)} games from {load_path}")
         return loaded_games
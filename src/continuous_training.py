@@ -0,0 +1,120 @@
+import os
+import time
+import random
+import multiprocessing as mp
+
+from game_records import read_games
+from self_play_queue import SelfPlayCoordinator, run_local_worker
+
+class ContinuousTrainer:
+    """
+    Self-play and training running at the same time instead of in turns.
+
+    Local worker processes (and any remote ones attached to the same queue directory) keep
+    playing games with the latest published checkpoint. Finished games go into a sliding
+    replay buffer that the trainer samples from. Every `checkpoint_every` steps the trainer
+    publishes its weights, and the workers switch to them for their next game.
+    """
+    def __init__(self, model, replay_buffer, queue_root, save_folder, checkpoint_folder, lease_seconds=600):
+        self._model = model
+        self._buffer = replay_buffer
+        self._coordinator = SelfPlayCoordinator(queue_root, lease_seconds)
+        self._save_folder = save_folder
+        self._checkpoint_folder = checkpoint_folder
+
+        self.steps = 0
+        self.games_collected = 0
+
+        os.makedirs(save_folder, exist_ok=True)
+        os.makedirs(checkpoint_folder, exist_ok=True)
+
+    def publish_checkpoint(self):
+        path = os.path.join(self._checkpoint_folder, f"checkpoint_{self.steps:07d}.keras")
+        self._model.save_to(path)
+        return self._coordinator.publish_model(path)
+
+    def _collect(self, num_workers, max_simulations, batch_size, move_time, rng, max_games):
+        queue = self._coordinator.queue
+        collected, _ = self._coordinator.poll(self._save_folder)
+
+        for task in collected:
+            path = os.path.join(self._save_folder, os.path.basename(task["games_path"]))
+            self._buffer.add_games(read_games(path))
+        self.games_collected += len(collected)
+
+        # enough queued work that no worker waits, but few enough tasks that new weights are picked up soon
+        counts = queue.counts()
+        queued = counts["pending"] + counts["claimed"]
+        wanted = num_workers * 2 - queued
+        if max_games is not None:
+            wanted = min(wanted, max_games - self.games_collected - queued)
+        if wanted > 0:
+            self._coordinator.submit_games(wanted, max_simulations, batch_size, move_time, rng.getrandbits(32))
+
+    def run(self, num_workers=None, engine_options=None, max_simulations=100, search_batch_size=1, move_time=None,
+            train_batch_size=64, min_positions=10000, checkpoint_every=500, max_sample_ratio=8,
+            max_steps=None, max_games=None, duration=None, poll_interval=2.0, log_every=100, seed=None):
+        num_workers = os.cpu_count() - 1 if num_workers is None else num_workers
+        rng = random.Random(seed)
+        queue = self._coordinator.queue
+        queue.clear_stop()
+
+        self.publish_checkpoint()
+
+        context = mp.get_context("spawn")
+        workers = [
+            context.Process(
+                target=run_local_worker,
+                args=(queue.root, f"local-{os.getpid()}-{i}", engine_options, min(poll_interval, 1.0)),
+                daemon=True
+            )
+            for i in range(num_workers)
+        ]
+        for worker in workers:
+            worker.start()
+
+        started = time.time()
+        last_poll = 0
+        losses = None
+
+        try:
+            while True:
+                if max_steps is not None and self.steps >= max_steps:
+                    break
+                if max_games is not None and self.games_collected >= max_games:
+                    break
+                if duration is not None and time.time() - started > duration:
+                    break
+
+                if time.time() - last_poll > poll_interval:
+                    self._collect(num_workers, max_simulations, search_batch_size, move_time, rng, max_games)
+                    last_poll = time.time()
+
+                # capping samples per generated position keeps the trainer from overfitting a small window
+                if (len(self._buffer) < max(min_positions, 1)
+                        or self.steps * train_batch_size > max_sample_ratio * self._buffer.positions_added):
+                    time.sleep(min(poll_interval, 0.5))
+                    continue
+
+                states, policies, values = self._buffer.sample(train_batch_size)
+                losses = self._model.train_batch(states, policies, values)
+                self.steps += 1
+
+                if self.steps % log_every == 0:
+                    print(f"Step {self.steps}: loss {losses}, {len(self._buffer)} positions in the window, "
+                          f"{self.games_collected} games collected")
+                if self.steps % checkpoint_every == 0:
+                    self.publish_checkpoint()
+        finally:
+            queue.request_stop()
+            for worker in workers:
+                worker.join(timeout=60)
+                if worker.is_alive():
+                    worker.terminate()
+
+        if self.steps % checkpoint_every:
+            self.publish_checkpoint()
+
+        print(f"Trained {self.steps} steps on {self._buffer.positions_added} positions "
+              f"from {self.games_collected} games in {time.time() - started:.0f}s")
+        return losses
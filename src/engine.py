@@ -1,50 +1,129 @@
-import chess
+import time
 import numpy as np
 
-from mcts import MCTS
+from mcts import MCTS, K_TOP
+from array_mcts import ArrayMCTS
 from chess_game import ChessGame
+from board_encoder import BoardEncoder
+
+def check_search_options(array_tree=False, widening=0, max_nodes=None):
+    if max_nodes is not None and max_nodes < K_TOP + 1:
+        # the root and its children are never pruned
+        raise ValueError(f"A node budget needs room for the root and its {K_TOP} children, at least {K_TOP + 1} nodes.")
+    if array_tree and max_nodes is not None:
+        raise ValueError("A node budget is only supported by the node tree.")
+    if array_tree and widening:
+        # the array tree stores a node's children contiguously, they cannot grow after expansion
+        raise ValueError("Progressive widening is only supported by the node tree.")
 
 class ChessEngine:
-    def __init__(self, model):
+    def __init__(self, model, array_tree=False, reuse_tree=True, transpositions=False, cache=None, path_replay=False,
+                 widening=0, book=None, book_plies=12, book_temperature=1.0, max_nodes=None):
         self._model = model
         self._game = ChessGame()
+        self._cache = cache
+        self._encoder = BoardEncoder()
+        self._stats = None
+        self._book = book
+        self._book_plies = book_plies
+        self._book_temperature = book_temperature
+        check_search_options(array_tree, widening, max_nodes)
+        if array_tree:
+            self._search = ArrayMCTS(self, self._game)
+        else:
+            self._search = MCTS(self, self._game, reuse_tree=reuse_tree, transpositions=transpositions, path_replay=path_replay,
+                                widening=widening, max_nodes=max_nodes)
+
+    @property
+    def game(self):
+        """The ChessGame move tables, for callers that run their own searches with this engine."""
+        return self._game
 
     def board_to_tensor(self, board):
-        def encode_piece_type(piece):
-            piece_type = piece.piece_type
-            color_offset = 0 if piece.color == chess.WHITE else 6
-            return color_offset + piece_type - 1
-        
-        state = np.zeros((8, 8, 16), dtype=np.float32)
+        return self._encoder.encode(board)
+
+    def encode_batch(self, boards):
+        """(N, 8, 8, 16) encoding of `boards`, a view of a buffer that the engine's next encoding overwrites."""
+        return self._encoder.encode_batch(boards)
+
+    def reset(self):
+        self._search.reset()
+
+    def set_stats(self, stats):
+        # a telemetry.SearchStats collecting phase timings, or None to turn profiling off
+        self._stats = stats
+        self._search.stats = stats
+
+    def best_move(self, board, simulations=100, C=1.41, batch_size=1): 
+        book_move = self._book_move(board)
+        if book_move is not None:
+            return book_move
+
+        action_probs = self._search.search(board, simulations, C, batch_size)
+        return self._choose_move(board, action_probs)
+
+    def timed_best_move(self, board, move_time, C=1.41, batch_size=1, max_simulations=None, stop_event=None):
+        """
+        Search until `move_time` seconds have passed (or `max_simulations` have run), stopping
+        earlier once the best move cannot be overtaken. Also returns the simulations completed.
+
+        With `move_time=None` the search only ends on `max_simulations` or when `stop_event` is set.
+        """
+        book_move = self._book_move(board)
+        if book_move is not None:
+            return (*book_move, 0)
+
+        deadline = time.perf_counter() + move_time if move_time is not None else None
+        action_probs = self._search.search(board, max_simulations, C, batch_size, deadline, stop_event)
+
+        move, action_probs, value = self._choose_move(board, action_probs)
+        return move, action_probs, value, self._search.simulations_done
+
+    def tree_stats(self):
+        """Nodes in the search tree after the last search, and how many the search pruned."""
+        return {"nodes": self._search.node_count, "pruned": self._search.nodes_pruned}
+
+    def principal_variation(self, max_length=10):
+        return [self._game.index_to_move(action) for action in self._search.principal_variation(max_length)]
+
+    def _book_move(self, board):
+        """A move sampled from the opening book's visit distribution, or None to search."""
+        if self._book is None or board.ply() >= self._book_plies:
+            return None
 
-        state[:, :, 12] = 1 if board.has_kingside_castling_rights(chess.WHITE) else 0
-        state[:, :, 13] = 1 if board.has_queenside_castling_rights(chess.WHITE) else 0
-        state[:, :, 14] = 1 if board.has_kingside_castling_rights(chess.BLACK) else 0
-        state[:, :, 15] = 1 if board.has_queenside_castling_rights(chess.BLACK) else 0
+        entry = self._book.probe(board)
+        if entry is None:
+            return None
 
-        for row in range(8):
-            for col in range(8):
-                piece = board.piece_at(chess.square(col, 7 - row))
-                if piece:
-                    state[row, col, encode_piece_type(piece)] = 1
+        actions, probs, value, _ = entry
+        moves = [self._game.index_to_move(action) for action in actions]
+        if not moves or not all(move in board.legal_moves for move in moves):
+            # a key collision with another position
+            return None
 
-        return state
+        if self._book_temperature > 0:
+            weights = probs.astype(np.float64) ** (1 / self._book_temperature)
+            choice = np.random.choice(len(moves), p=weights / weights.sum())
+        else:
+            choice = int(np.argmax(probs))
 
-    def best_move(self, board, simulations=100, C=1.41): 
-        action_probs = MCTS(self, self._game).search(board, simulations, C)
+        # the stored distribution doubles as the policy target of the book move
+        action_probs = np.zeros(self._game.action_size)
+        action_probs[actions] = probs
+        return moves[choice], action_probs, np.array([value], dtype=np.float32)
 
+    def _choose_move(self, board, action_probs):
         best_action = np.argmax(action_probs)
         move = self._game.index_to_move(best_action)
 
-        _, value = self._model.predict(self.board_to_tensor(board))
+        _, value = self._predict([board])[0]
         # value = np.random.uniform(-1, 1)
 
         return move, action_probs, value
     
     def evaluate(self, state, perspective):
         def predict_policy_and_value(state):
-            policy, value = self._model.predict(self.board_to_tensor(state))
-            print(policy.shape)
+            policy, value = self._predict([state])[0]
             return policy, value
         
         # def randomize_policy_and_value(state):
@@ -63,14 +142,9 @@ class ChessEngine:
         #     value = np.random.uniform(-1, 1)
         #     return policy, value
         
-        if state.is_game_over():
-            result = state.result()
-            if result == "1-0":
-                return True, 1, None  
-            elif result == "0-1":
-                return True, -1, None
-            else:
-                return True, 0, None 
+        terminal = self._evaluate_terminal(state)
+        if terminal is not None:
+            return terminal
 
         # policy, value = randomize_policy_and_value(state)
         policy, value = predict_policy_and_value(state)
@@ -79,3 +153,61 @@ class ChessEngine:
             value = -value
 
         return False, value, policy
+
+    def evaluate_batch(self, states, perspectives):
+        results = [self._evaluate_terminal(state) for state in states]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if pending:
+            predictions = self._predict([states[i] for i in pending])
+
+            for i, (policy, value) in zip(pending, predictions):
+                value = -value if perspectives[i] == 'black' else value
+                results[i] = (False, value, policy)
+
+        return results
+
+    def cache_stats(self):
+        return self._cache.stats() if self._cache is not None else None
+
+    def _predict(self, states):
+        predictions = [None] * len(states)
+        keys = None
+
+        if self._cache is not None:
+            keys = [self._cache.key(state) for state in states]
+            for i, key in enumerate(keys):
+                predictions[i] = self._cache.get(key)
+
+        missing = [i for i, prediction in enumerate(predictions) if prediction is None]
+        if missing:
+            if self._stats is not None:
+                started = time.perf_counter()
+
+            tensors = self._encoder.encode_batch([states[i] for i in missing])
+            policies, values = self._model.predict(tensors)
+
+            if self._stats is not None:
+                self._stats.add_time("network", time.perf_counter() - started)
+                self._stats.count("network_positions", len(missing))
+            policies = np.reshape(policies, (len(missing), -1))
+            values = np.reshape(values, (len(missing), -1))
+
+            for j, i in enumerate(missing):
+                predictions[i] = (policies[j], values[j])
+                if keys is not None:
+                    self._cache.put(keys[i], policies[j], values[j])
+
+        return predictions
+
+    def _evaluate_terminal(self, state):
+        if not state.is_game_over():
+            return None
+
+        result = state.result()
+        if result == "1-0":
+            return True, 1, None  
+        elif result == "0-1":
+            return True, -1, None
+        else:
+            return True, 0, None 
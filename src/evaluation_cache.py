@@ -0,0 +1,59 @@
+from collections import OrderedDict
+import chess.polyglot
+import numpy as np
+
+class EvaluationCache:
+    def __init__(self, max_size_mb=256):
+        self._max_bytes = int(max_size_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._size_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(state):
+        return chess.polyglot.zobrist_hash(state)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, policy, value):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+
+        # copies, so a cached row does not keep the whole prediction batch alive
+        policy = np.array(policy, dtype=np.float32)
+        value = np.array(value, dtype=np.float32)
+
+        self._entries[key] = (policy, value)
+        self._size_bytes += policy.nbytes + value.nbytes
+
+        while self._size_bytes > self._max_bytes and self._entries:
+            _, (old_policy, old_value) = self._entries.popitem(last=False)
+            self._size_bytes -= old_policy.nbytes + old_value.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "size_mb": self._size_bytes / (1024 * 1024),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._entries)
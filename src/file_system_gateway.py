@@ -0,0 +1,55 @@
+import os
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class FileSystemGateway:
+    """
+    Stand-in for BackblazeGateway that "uploads" into a local directory, for running the
+    cloud checkpoint path offline. Files are copied in parts by parallel threads like a large
+    file upload, and appear under their remote name only once complete, with the file info
+    stored next to them as <name>.info.json.
+    """
+    def __init__(self, root, part_size=8 * 1024 * 1024, upload_threads=4):
+        self.root = root
+        self.part_size = part_size
+        self.upload_threads = upload_threads
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, remote_path):
+        return os.path.join(self.root, remote_path)
+
+    def upload_file(self, local_path, remote_path, file_info=None):
+        if file_info is None:
+            file_info = {"source": "ml-model"}
+
+        target = self.path(remote_path)
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        temp_path = f"{target}.{uuid.uuid4().hex}.part"
+        size = os.path.getsize(local_path)
+
+        source_fd = os.open(local_path, os.O_RDONLY)
+        target_fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(target_fd, size)
+
+            def copy_part(offset):
+                length = min(self.part_size, size - offset)
+                data = os.pread(source_fd, length, offset)
+                if len(data) != length:
+                    raise IOError(f"Short read from {local_path} at {offset}.")
+                os.pwrite(target_fd, data, offset)
+
+            with ThreadPoolExecutor(max_workers=self.upload_threads) as executor:
+                list(executor.map(copy_part, range(0, size, self.part_size)))
+        except Exception:
+            os.close(target_fd)
+            os.remove(temp_path)
+            raise
+        finally:
+            os.close(source_fd)
+
+        os.close(target_fd)
+        with open(f"{target}.info.json", "w") as info_file:
+            json.dump(file_info, info_file)
+        os.replace(temp_path, target)
@@ -0,0 +1,158 @@
+import os
+import h5py
+import numpy as np
+
+COMPACT_FORMAT = "compact-v1"
+STATE_SHAPE = (8, 8, 16)
+ACTION_SIZE = 4672
+PACKED_STATE_SIZE = int(np.prod(STATE_SHAPE)) // 8
+
+def pack_states(states):
+    states = np.asarray(states).reshape(len(states), -1)
+    return np.packbits(states > 0, axis=1)
+
+def unpack_states(packed):
+    bits = np.unpackbits(packed, axis=1, count=int(np.prod(STATE_SHAPE)))
+    return bits.reshape((len(packed),) + STATE_SHAPE).astype(np.float32)
+
+def sparsify_policies(policies):
+    policies = np.asarray(policies, dtype=np.float32).reshape(len(policies), -1)
+    rows, indices = np.nonzero(policies)
+    counts = np.bincount(rows, minlength=len(policies)).astype(np.uint16)
+    return counts, indices.astype(np.uint16), policies[rows, indices]
+
+def densify_policies(counts, indices, probs):
+    policies = np.zeros((len(counts), ACTION_SIZE), dtype=np.float32)
+    rows = np.repeat(np.arange(len(counts)), counts)
+    policies[rows, indices] = probs
+    return policies
+
+def is_compact(h5_file):
+    return h5_file.attrs.get("format") == COMPACT_FORMAT
+
+class GameRecordWriter:
+    """
+    Appends games to a single HDF5 file of chunked datasets.
+
+    Positions of all games are stored back to back: states as bit-packed planes,
+    policies as (index, probability) pairs, and `game_offsets` marks where each game starts.
+    """
+    def __init__(self, path):
+        self._h5_file = h5py.File(path, "a")
+
+        if not is_compact(self._h5_file):
+            if len(self._h5_file.keys()):
+                raise ValueError(f"{path} is not a compact game record file.")
+            self._create_datasets()
+
+    def _create_datasets(self):
+        h5_file = self._h5_file
+        h5_file.attrs["format"] = COMPACT_FORMAT
+
+        def create(name, shape, dtype, chunk_rows):
+            h5_file.create_dataset(
+                name, shape=(0,) + shape, maxshape=(None,) + shape, dtype=dtype,
+                chunks=(chunk_rows,) + shape, compression="gzip"
+            )
+
+        create("states", (PACKED_STATE_SIZE,), np.uint8, 1024)
+        create("values", (), np.float32, 4096)
+        create("keys", (), np.uint64, 4096)
+        create("policy_counts", (), np.uint16, 4096)
+        create("policy_indices", (), np.uint16, 16384)
+        create("policy_probs", (), np.float32, 16384)
+        create("game_offsets", (), np.int64, 1024)
+        self._append("game_offsets", np.zeros(1, dtype=np.int64))
+
+    def _append(self, name, data):
+        dataset = self._h5_file[name]
+        size = dataset.shape[0]
+        dataset.resize(size + len(data), axis=0)
+        dataset[size:] = data
+
+    def append_game(self, game_data):
+        if not game_data:
+            return
+
+        states = np.array([step[0] for step in game_data], dtype=np.float32)
+        policies = np.array([step[1] for step in game_data], dtype=np.float32)
+        values = np.array([np.reshape(step[2], -1)[0] for step in game_data], dtype=np.float32)
+        keys = np.array([step[3] if len(step) > 3 else 0 for step in game_data], dtype=np.uint64)
+
+        counts, indices, probs = sparsify_policies(policies)
+
+        self._append("states", pack_states(states))
+        self._append("values", values)
+        self._append("keys", keys)
+        self._append("policy_counts", counts)
+        self._append("policy_indices", indices)
+        self._append("policy_probs", probs)
+
+        offsets = self._h5_file["game_offsets"]
+        self._append("game_offsets", np.array([offsets[-1] + len(states)], dtype=np.int64))
+
+    def append_games(self, games_data):
+        for game_data in games_data:
+            self.append_game(game_data)
+
+    def close(self):
+        self._h5_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_games(path):
+    """
+    Yield (states, policies, values, keys) per game with dense arrays, for both the compact
+    and the legacy one-group-per-game layout. Keys are 0 where the file does not store them.
+    """
+    with h5py.File(path, "r") as h5_file:
+        if not is_compact(h5_file):
+            for game_name in h5_file.keys():
+                game_group = h5_file[game_name]
+
+                states = game_group["states"][:]
+                values = np.reshape(game_group["values"][:], (len(states), -1))[:, 0]
+                yield states, game_group["policies"][:], values, np.zeros(len(states), dtype=np.uint64)
+            return
+
+        game_offsets = h5_file["game_offsets"][:]
+        counts = h5_file["policy_counts"][:]
+        policy_offsets = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)])
+
+        for start, end in zip(game_offsets[:-1], game_offsets[1:]):
+            policy_start, policy_end = policy_offsets[start], policy_offsets[end]
+
+            states = unpack_states(h5_file["states"][start:end])
+            policies = densify_policies(
+                counts[start:end],
+                h5_file["policy_indices"][policy_start:policy_end],
+                h5_file["policy_probs"][policy_start:policy_end]
+            )
+            yield states, policies, h5_file["values"][start:end], h5_file["keys"][start:end]
+
+def convert_games(load_path, save_path):
+    if os.path.isdir(load_path):
+        h5_files = [os.path.join(load_path, file) for file in os.listdir(load_path) if file.endswith(".h5")]
+    else:
+        h5_files = [load_path]
+
+    os.makedirs(save_path, exist_ok=True)
+    converted = []
+
+    for file in h5_files:
+        target = os.path.join(save_path, os.path.basename(file))
+        if os.path.abspath(target) == os.path.abspath(file):
+            raise ValueError("Converted files must be written to a different folder.")
+
+        with GameRecordWriter(target) as writer:
+            for states, policies, values, keys in read_games(file):
+                writer.append_game(list(zip(states, policies, values, keys)))
+
+        print(f"Converted {file} -> {target}")
+        converted.append(target)
+
+    return converted
@@ -0,0 +1,83 @@
+import os
+import h5py
+import numpy as np
+import tensorflow as tf
+
+from game_records import ACTION_SIZE, STATE_SHAPE, read_games
+from position_index import is_dedup_shard, read_shard
+
+def list_game_files(load_path):
+    if not load_path or not os.path.exists(load_path):
+        raise ValueError("Invalid path or folder does not exist.")
+
+    if os.path.isdir(load_path):
+        h5_files = sorted(os.path.join(load_path, file) for file in os.listdir(load_path) if file.endswith(".h5"))
+        if not h5_files:
+            raise ValueError("No .h5 files found in the specified directory.")
+    else:
+        h5_files = [load_path]
+
+    return h5_files
+
+def count_scale(h5_files):
+    """
+    Factor that turns the occurrence counts of deduplicated shards into sample weights averaging 1,
+    so the loss keeps the scale it had on the games the shards were built from.
+    """
+    rows, occurrences = 0, 0
+    for path in h5_files:
+        with h5py.File(path, "r") as h5_file:
+            if is_dedup_shard(h5_file):
+                counts = h5_file["counts"][:]
+                rows += len(counts)
+                occurrences += int(counts.sum())
+
+    return rows / occurrences if occurrences else 1.0
+
+def iter_game_file(path, scale=1.0):
+    if isinstance(path, bytes):
+        path = path.decode()
+
+    with h5py.File(path, "r") as h5_file:
+        dedup = is_dedup_shard(h5_file)
+
+    # one game (or shard chunk) at a time, so memory is bounded by the longest game, not the dataset
+    for states, policies, values, counts in read_shard(path) if dedup else read_games(path):
+        # a deduplicated position weighs as much as all the occurrences it stands for
+        weights = counts * scale if dedup else np.ones(len(states))
+        for i in range(len(states)):
+            yield states[i], policies[i], values[i], np.float32(weights[i])
+
+def build_games_dataset(load_path, batch_size=64, shuffle_buffer=10000, cycle_length=4, seed=None):
+    """
+    Batches of (states, (policies, values), sample_weights) streamed from game files or
+    deduplicated shards. Positions of game files weigh 1, deduplicated positions their
+    occurrence count (scaled by `count_scale`).
+    """
+    h5_files = list_game_files(load_path)
+    scale = count_scale(h5_files)
+
+    output_signature = (
+        tf.TensorSpec(shape=STATE_SHAPE, dtype=tf.float32),
+        tf.TensorSpec(shape=(ACTION_SIZE,), dtype=tf.float32),
+        tf.TensorSpec(shape=(), dtype=tf.float32),
+        tf.TensorSpec(shape=(), dtype=tf.float32),
+    )
+
+    def read_file(path):
+        return tf.data.Dataset.from_generator(iter_game_file, args=(path, scale), output_signature=output_signature)
+
+    dataset = tf.data.Dataset.from_tensor_slices(h5_files)
+    dataset = dataset.shuffle(len(h5_files), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.interleave(
+        read_file,
+        cycle_length=min(cycle_length, len(h5_files)),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=False
+    )
+
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    dataset = dataset.map(lambda state, policy, value, weight: (state, (policy, value), weight), num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,114 @@
+import time
+import queue
+import multiprocessing as mp
+import numpy as np
+
+def _serve(model_path, request_queue, response_queues, max_batch_size, max_wait):
+    from model.loader import load_model
+
+    model = load_model(model_path)
+    running = True
+
+    while running:
+        request = request_queue.get()
+        if request is None:
+            break
+
+        requests = [request]
+        batch_size = len(request[1])
+        deadline = time.monotonic() + max_wait
+
+        # gather whatever the other games send before the deadline into the same batch
+        while batch_size < max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = request_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                running = False
+                break
+            requests.append(request)
+            batch_size += len(request[1])
+
+        try:
+            states = np.concatenate([client_states for _, client_states in requests])
+            policies, values = model.predict(states)
+            policies = np.reshape(policies, (len(states), -1))
+            values = np.reshape(values, (len(states), -1))
+        except Exception as e:
+            for client_id, _ in requests:
+                response_queues[client_id].put(e)
+            continue
+
+        offset = 0
+        for client_id, client_states in requests:
+            size = len(client_states)
+            response_queues[client_id].put((policies[offset:offset + size], values[offset:offset + size]))
+            offset += size
+
+class InferenceClient:
+    def __init__(self, client_id, request_queue, response_queue):
+        self._client_id = client_id
+        self._request_queue = request_queue
+        self._response_queue = response_queue
+
+    def predict(self, states):
+        if len(states.shape) == 3:
+            states = np.expand_dims(states, axis=0)
+
+        self._request_queue.put((self._client_id, np.asarray(states, dtype=np.float32)))
+        response = self._response_queue.get()
+        if isinstance(response, Exception):
+            raise response
+
+        policy, value = response
+
+        if states.shape[0] == 1:
+            policy = np.squeeze(policy, axis=0)
+            value = np.squeeze(value, axis=0)
+
+        return policy, value
+
+class InferenceServer:
+    def __init__(self, model_path, num_clients, max_batch_size=256, max_wait=0.002):
+        self.num_clients = num_clients
+
+        # the server owns the only TensorFlow runtime, so it is spawned rather than forked
+        context = mp.get_context("spawn")
+        self._request_queue = context.Queue()
+        self._response_queues = [context.Queue() for _ in range(num_clients)]
+        self._free_clients = context.Queue()
+        for client_id in range(num_clients):
+            self._free_clients.put(client_id)
+
+        self._process = context.Process(
+            target=_serve,
+            args=(model_path, self._request_queue, self._response_queues, max_batch_size, max_wait),
+            daemon=True
+        )
+
+    def client_args(self):
+        return self._request_queue, self._response_queues, self._free_clients
+
+    def start(self):
+        self._process.start()
+        print(f"Inference server started (pid {self._process.pid})")
+
+    def stop(self):
+        if self._process.is_alive():
+            self._request_queue.put(None)
+            self._process.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def connect_client(request_queue, response_queues, free_clients):
+    client_id = free_clients.get()
+    return InferenceClient(client_id, request_queue, response_queues[client_id])
@@ -1,6 +1,21 @@
 import argparse
 from scripts.train import train as train_script
 from scripts.generate import generate as generate_script
+from scripts.benchmark import benchmark as benchmark_script
+from scripts.uci import uci as uci_script
+from scripts.analyze import analyze as analyze_script
+from scripts.loop import loop as loop_script
+from scripts.arena import arena as arena_script
+from scripts.compact import compact as compact_script
+from scripts.book import book as book_script
+from scripts.distributed import coordinate as coordinate_script, publish as publish_script, work as work_script
+from game_records import convert_games
+
+def simulation_cap(args):
+    # with a move time the clock decides, a simulation cap only applies when asked for
+    if args.max_simulations is not None:
+        return args.max_simulations
+    return None if args.move_time_ms else 100
 
 def main():
     parser = argparse.ArgumentParser(description="Train or generate with the GamingRLModel.")
@@ -8,21 +23,152 @@ def main():
 
     train_parser = subparsers.add_parser("train", help="Train the model")
     train_parser.add_argument("--model-path", type=str, default="gaming_model.keras", help="Path to the model file")
-    train_parser.add_argument("--games-data-path", type=str, default="games_data", help="Path to training data")
+    train_parser.add_argument("--games-data-path", type=str, default="games_data", help="Path to training data (game files or a compacted position directory)")
     train_parser.add_argument("--delete-games", type=bool, default=False, help="Delete games after training")
     train_parser.add_argument("--cloud-save", type=bool, default=False, help="Save trained model to cloud")
+    train_parser.add_argument("--cloud-path", type=str, default=None, help="Directory standing in for the cloud bucket (offline testing of --cloud-save)")
+    train_parser.add_argument("--batch-size", type=int, default=64, help="Training batch size")
+    train_parser.add_argument("--shuffle-buffer", type=int, default=10000, help="Positions held in the streaming shuffle buffer")
 
     generate_parser = subparsers.add_parser("generate", help="Generate self-play games")
     generate_parser.add_argument("--model-path", type=str, default="gaming_model.keras", help="Path to the model file")
     generate_parser.add_argument("--games-data-path", type=str, default="games_data", help="Directory to save generated games")
     generate_parser.add_argument("--num-games", type=int, default=10, help="Number of games to generate")
-    generate_parser.add_argument("--max-simulations", type=int, default=100, help="Maximum simulations per move")
+    generate_parser.add_argument("--max-simulations", type=int, default=None, help="Maximum simulations per move (100 by default, no cap with --move-time-ms)")
+    generate_parser.add_argument("--batch-size", type=int, default=1, help="Leaves evaluated per network call during search")
+    generate_parser.add_argument("--inference-server", action="store_true", help="Serve the model from one process shared by all self-play workers")
+    generate_parser.add_argument("--max-batch-size", type=int, default=256, help="Maximum positions per inference server batch")
+    generate_parser.add_argument("--max-wait-ms", type=float, default=2, help="Maximum time the inference server waits to fill a batch")
+    generate_parser.add_argument("--array-tree", action="store_true", help="Store the search tree in flat NumPy arrays")
+    generate_parser.add_argument("--transpositions", action="store_true", help="Share search nodes between transposed move orders")
+    generate_parser.add_argument("--path-replay", action="store_true", help="Keep only moves in search nodes and replay them on one board")
+    generate_parser.add_argument("--widening", type=float, default=0, help="Progressive widening rate: a node opens 10 + widening * sqrt(visits) moves (0 disables it)")
+    generate_parser.add_argument("--cache-mb", type=float, default=0, help="Memory cap of the per-worker evaluation cache (0 disables it)")
+    generate_parser.add_argument("--move-time-ms", type=float, default=None, help="Search each move for this long instead of a move-number based simulation count (--max-simulations still caps it)")
+    generate_parser.add_argument("--telemetry-path", type=str, default=None, help="JSON-lines file for per-move search profiling (off by default)")
+    generate_parser.add_argument("--book-path", type=str, default=None, help="Opening book to play the first plies from instead of searching")
+    generate_parser.add_argument("--book-plies", type=int, default=12, help="Plies played from the opening book while the position is in it")
+    generate_parser.add_argument("--max-nodes", type=int, default=None, help="Most nodes kept in the search tree, the least visited subtrees are pruned beyond it (unlimited by default)")
+    generate_parser.add_argument("--book-temperature", type=float, default=1.0, help="Temperature for sampling book moves (0 always plays the most visited one)")
+
+    book_parser = subparsers.add_parser("book", help="Build an opening book from stored games")
+    book_parser.add_argument("--games-data-path", type=str, default="games_data", help="Game file or directory of game files")
+    book_parser.add_argument("--book-path", type=str, default="opening_book.bin", help="Book file to write")
+    book_parser.add_argument("--max-plies", type=int, default=20, help="Plies of each game that go into the book")
+    book_parser.add_argument("--min-count", type=int, default=20, help="Games a position has to appear in to get an entry")
+    book_parser.add_argument("--width", type=int, default=16, help="Most visited moves kept per position")
+
+    convert_parser = subparsers.add_parser("convert", help="Convert stored games to the compact record format")
+    convert_parser.add_argument("--games-data-path", type=str, default="games_data", help="File or directory of games to convert")
+    convert_parser.add_argument("--output-path", type=str, default="games_data_compact", help="Directory for the converted files")
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Measure search, encoding and self-play throughput")
+    benchmark_parser.add_argument("--model", type=str, choices=["stub", "resnet"], default="stub", help="Deterministic stub or freshly built ResNet")
+    benchmark_parser.add_argument("--output-path", type=str, default=None, help="JSON file for the results")
+    benchmark_parser.add_argument("--simulations", type=int, default=200, help="Simulations per searched position")
+    benchmark_parser.add_argument("--batch-size", type=int, default=8, help="Batched search size to compare against batch size 1")
+    benchmark_parser.add_argument("--repeats", type=int, default=3, help="Repetitions per measurement (best is kept)")
+    benchmark_parser.add_argument("--num-games", type=int, default=0, help="Self-play games to time (0 skips self-play)")
+    benchmark_parser.add_argument("--max-simulations", type=int, default=50, help="Maximum simulations per move during self-play")
+
+    uci_parser = subparsers.add_parser("uci", help="Run as a UCI engine on stdin/stdout")
+    uci_parser.add_argument("--model-path", type=str, default="gaming_model.keras", help="Path to the model file (stub:// for the deterministic stub)")
+    uci_parser.add_argument("--batch-size", type=int, default=1, help="Leaves evaluated per network call during search")
+    uci_parser.add_argument("--cache-mb", type=float, default=0, help="Memory cap of the evaluation cache (0 disables it)")
+    uci_parser.add_argument("--path-replay", action="store_true", help="Keep only moves in search nodes and replay them on one board")
+    uci_parser.add_argument("--max-nodes", type=int, default=None, help="Most nodes kept in the search tree, the least visited subtrees are pruned beyond it (unlimited by default)")
+
+    analyze_parser = subparsers.add_parser("analyze", help="Evaluate every position of a FEN/EPD or PGN file")
+    analyze_parser.add_argument("--input-path", type=str, required=True, help="File with one FEN/EPD per line, or a .pgn file")
+    analyze_parser.add_argument("--output-path", type=str, default="analysis.h5", help="HDF5 file for the results (an existing one is resumed)")
+    analyze_parser.add_argument("--model-path", type=str, default="gaming_model.keras", help="Path to the model file (stub:// for the deterministic stub)")
+    analyze_parser.add_argument("--batch-size", type=int, default=256, help="Positions per worker task and network call")
+    analyze_parser.add_argument("--simulations", type=int, default=0, help="Search simulations per position (0 only runs the network)")
+    analyze_parser.add_argument("--search-batch-size", type=int, default=8, help="Leaves evaluated per network call when searching")
+    analyze_parser.add_argument("--num-workers", type=int, default=None, help="Worker processes (defaults to the CPU count)")
+    analyze_parser.add_argument("--max-nodes", type=int, default=None, help="Most nodes kept in the search tree, the least visited subtrees are pruned beyond it (unlimited by default)")
+
+    compact_parser = subparsers.add_parser("compact", help="Merge duplicate positions of the game files into a deduplicated training set")
+    compact_parser.add_argument("--games-data-path", type=str, default="games_data", help="Game file or directory of game files to merge")
+    compact_parser.add_argument("--output-path", type=str, default="positions", help="Directory of the deduplicated shards (an existing one is updated)")
+    compact_parser.add_argument("--shard-size", type=int, default=1_000_000, help="Positions per shard file")
+    compact_parser.add_argument("--policy-width", type=int, default=64, help="Most visited moves kept per position")
+
+    arena_parser = subparsers.add_parser("arena", help="Play two models against each other to gate a new checkpoint")
+    arena_parser.add_argument("--candidate-path", type=str, required=True, help="Model being tested (stub:// for the deterministic stub)")
+    arena_parser.add_argument("--baseline-path", type=str, default="gaming_model.keras", help="Model the candidate has to beat")
+    arena_parser.add_argument("--num-games", type=int, default=400, help="Maximum number of games, colors alternate on each opening")
+    arena_parser.add_argument("--simulations", type=int, default=100, help="Simulations per move for both sides")
+    arena_parser.add_argument("--games-per-task", type=int, default=16, help="Games played together by one worker, sharing network calls")
+    arena_parser.add_argument("--leaves-per-game", type=int, default=8, help="Leaves each game adds to a shared network call")
+    arena_parser.add_argument("--num-workers", type=int, default=None, help="Worker processes (defaults to the CPU count)")
+    arena_parser.add_argument("--opening-plies", type=int, default=4, help="Random plies played before the models take over")
+    arena_parser.add_argument("--max-plies", type=int, default=400, help="Games still running at this ply count are draws")
+    arena_parser.add_argument("--elo0", type=float, default=0, help="SPRT null hypothesis: the candidate is at most this much stronger")
+    arena_parser.add_argument("--elo1", type=float, default=10, help="SPRT alternative: the candidate is at least this much stronger")
+    arena_parser.add_argument("--alpha", type=float, default=0.05, help="SPRT false positive rate")
+    arena_parser.add_argument("--beta", type=float, default=0.05, help="SPRT false negative rate")
+    arena_parser.add_argument("--seed", type=int, default=None, help="Seed for the random openings")
+    arena_parser.add_argument("--output-path", type=str, default=None, help="JSON file for the result summary")
+
+    coordinate_parser = subparsers.add_parser("coordinate", help="Hand out self-play games to workers through a shared queue directory")
+    coordinate_parser.add_argument("--queue-path", type=str, required=True, help="Queue directory shared with the workers")
+    coordinate_parser.add_argument("--games-data-path", type=str, default="games_data", help="Directory to collect finished games in")
+    coordinate_parser.add_argument("--model-path", type=str, default=None, help="Model to publish before submitting (defaults to the current one)")
+    coordinate_parser.add_argument("--num-games", type=int, default=10, help="Number of games to submit")
+    coordinate_parser.add_argument("--max-simulations", type=int, default=None, help="Maximum simulations per move (100 by default, no cap with --move-time-ms)")
+    coordinate_parser.add_argument("--batch-size", type=int, default=1, help="Leaves evaluated per network call during search")
+    coordinate_parser.add_argument("--move-time-ms", type=float, default=None, help="Search time per move instead of a simulation count")
+    coordinate_parser.add_argument("--lease-seconds", type=float, default=600, help="Time without a worker heartbeat before a game is retried")
+    coordinate_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per game before it is given up")
+    coordinate_parser.add_argument("--stop-workers", action="store_true", help="Ask workers to exit once all games are in")
+
+    publish_parser = subparsers.add_parser("publish", help="Hot-swap the model played by queue workers")
+    publish_parser.add_argument("--queue-path", type=str, required=True, help="Queue directory shared with the workers")
+    publish_parser.add_argument("--model-path", type=str, required=True, help="Model file to publish")
+
+    worker_parser = subparsers.add_parser("worker", help="Play self-play games taken from a shared queue directory")
+    worker_parser.add_argument("--queue-path", type=str, required=True, help="Queue directory shared with the coordinator")
+    worker_parser.add_argument("--worker-id", type=str, default=None, help="Name of this worker (defaults to host-pid)")
+    worker_parser.add_argument("--array-tree", action="store_true", help="Store the search tree in flat NumPy arrays")
+    worker_parser.add_argument("--path-replay", action="store_true", help="Keep only moves in search nodes and replay them on one board")
+    worker_parser.add_argument("--cache-mb", type=float, default=0, help="Memory cap of the evaluation cache (0 disables it)")
+    worker_parser.add_argument("--max-tasks", type=int, default=None, help="Exit after this many games")
+    worker_parser.add_argument("--idle-timeout", type=float, default=None, help="Exit after this many seconds without work")
+
+    loop_parser = subparsers.add_parser("loop", help="Generate and train at the same time from a sliding replay window")
+    loop_parser.add_argument("--model-path", type=str, default="gaming_model.keras", help="Model to start from")
+    loop_parser.add_argument("--games-data-path", type=str, default="games_data", help="Directory the generated games are kept in")
+    loop_parser.add_argument("--checkpoint-path", type=str, default="checkpoints", help="Directory for the published checkpoints")
+    loop_parser.add_argument("--queue-path", type=str, default=None, help="Shared queue directory, so remote workers can join (a private one by default)")
+    loop_parser.add_argument("--num-workers", type=int, default=None, help="Local self-play processes (defaults to the CPU count minus one)")
+    loop_parser.add_argument("--max-simulations", type=int, default=None, help="Maximum simulations per move (100 by default, no cap with --move-time-ms)")
+    loop_parser.add_argument("--search-batch-size", type=int, default=1, help="Leaves evaluated per network call during search")
+    loop_parser.add_argument("--move-time-ms", type=float, default=None, help="Search time per move instead of a simulation count")
+    loop_parser.add_argument("--array-tree", action="store_true", help="Store the search tree in flat NumPy arrays")
+    loop_parser.add_argument("--cache-mb", type=float, default=0, help="Memory cap of the per-worker evaluation cache (0 disables it)")
+    loop_parser.add_argument("--buffer-size", type=int, default=1_000_000, help="Most recent positions kept for training")
+    loop_parser.add_argument("--batch-size", type=int, default=64, help="Training batch size")
+    loop_parser.add_argument("--min-positions", type=int, default=10000, help="Positions collected before training starts")
+    loop_parser.add_argument("--checkpoint-every", type=int, default=500, help="Training steps between published checkpoints")
+    loop_parser.add_argument("--max-sample-ratio", type=float, default=8, help="Maximum trained samples per generated position")
+    loop_parser.add_argument("--max-steps", type=int, default=None, help="Stop after this many training steps")
+    loop_parser.add_argument("--max-games", type=int, default=None, help="Stop after this many games")
+    loop_parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
 
     args = parser.parse_args()
 
     if args.mode == "train":
         print("Training mode selected.")
-        train_script(model_path=args.model_path, games_data_path=args.games_data_path, delete_games=args.delete_games, cloud_save=args.cloud_save)
+        train_script(
+            model_path=args.model_path,
+            games_data_path=args.games_data_path,
+            delete_games=args.delete_games,
+            cloud_save=args.cloud_save,
+            cloud_path=args.cloud_path,
+            batch_size=args.batch_size,
+            shuffle_buffer=args.shuffle_buffer
+        )
         print("Training completed.")
     elif args.mode == "generate":
         print("Generation mode selected.")
@@ -30,9 +176,152 @@ def main():
             model_path=args.model_path,
             games_data_path=args.games_data_path,
             num_games=args.num_games,
-            max_simulations=args.max_simulations
+            max_simulations=simulation_cap(args),
+            batch_size=args.batch_size,
+            inference_server=args.inference_server,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms,
+            array_tree=args.array_tree,
+            transpositions=args.transpositions,
+            cache_mb=args.cache_mb,
+            telemetry_path=args.telemetry_path,
+            path_replay=args.path_replay,
+            widening=args.widening,
+            move_time_ms=args.move_time_ms,
+            book_path=args.book_path,
+            book_plies=args.book_plies,
+            book_temperature=args.book_temperature,
+            max_nodes=args.max_nodes
         )
         print("Generation completed.")
+    elif args.mode == "book":
+        print("Book mode selected.")
+        book_script(
+            games_data_path=args.games_data_path,
+            book_path=args.book_path,
+            max_plies=args.max_plies,
+            min_count=args.min_count,
+            width=args.width
+        )
+        print("Book completed.")
+    elif args.mode == "convert":
+        print("Conversion mode selected.")
+        convert_games(args.games_data_path, args.output_path)
+        print("Conversion completed.")
+    elif args.mode == "benchmark":
+        print("Benchmark mode selected.")
+        benchmark_script(
+            model_name=args.model,
+            output_path=args.output_path,
+            simulations=args.simulations,
+            batch_size=args.batch_size,
+            repeats=args.repeats,
+            num_games=args.num_games,
+            max_simulations=args.max_simulations
+        )
+        print("Benchmark completed.")
+    elif args.mode == "analyze":
+        print("Analysis mode selected.")
+        analyze_script(
+            input_path=args.input_path,
+            output_path=args.output_path,
+            model_path=args.model_path,
+            batch_size=args.batch_size,
+            simulations=args.simulations,
+            search_batch_size=args.search_batch_size,
+            num_workers=args.num_workers,
+            max_nodes=args.max_nodes
+        )
+        print("Analysis completed.")
+    elif args.mode == "compact":
+        print("Compaction mode selected.")
+        compact_script(
+            games_data_path=args.games_data_path,
+            output_path=args.output_path,
+            shard_size=args.shard_size,
+            policy_width=args.policy_width
+        )
+        print("Compaction completed.")
+    elif args.mode == "arena":
+        print("Arena mode selected.")
+        arena_script(
+            candidate_path=args.candidate_path,
+            baseline_path=args.baseline_path,
+            num_games=args.num_games,
+            simulations=args.simulations,
+            openings_per_task=max(args.games_per_task // 2, 1),
+            leaves_per_game=args.leaves_per_game,
+            num_workers=args.num_workers,
+            opening_plies=args.opening_plies,
+            max_plies=args.max_plies,
+            elo0=args.elo0,
+            elo1=args.elo1,
+            alpha=args.alpha,
+            beta=args.beta,
+            seed=args.seed,
+            output_path=args.output_path
+        )
+        print("Arena completed.")
+    elif args.mode == "loop":
+        print("Loop mode selected.")
+        loop_script(
+            model_path=args.model_path,
+            games_data_path=args.games_data_path,
+            checkpoint_path=args.checkpoint_path,
+            queue_path=args.queue_path,
+            num_workers=args.num_workers,
+            max_simulations=simulation_cap(args),
+            search_batch_size=args.search_batch_size,
+            move_time_ms=args.move_time_ms,
+            array_tree=args.array_tree,
+            cache_mb=args.cache_mb,
+            buffer_size=args.buffer_size,
+            train_batch_size=args.batch_size,
+            min_positions=args.min_positions,
+            checkpoint_every=args.checkpoint_every,
+            max_sample_ratio=args.max_sample_ratio,
+            max_steps=args.max_steps,
+            max_games=args.max_games,
+            duration=args.duration
+        )
+        print("Loop completed.")
+    elif args.mode == "coordinate":
+        print("Coordinator mode selected.")
+        coordinate_script(
+            queue_path=args.queue_path,
+            games_data_path=args.games_data_path,
+            model_path=args.model_path,
+            num_games=args.num_games,
+            max_simulations=simulation_cap(args),
+            batch_size=args.batch_size,
+            move_time_ms=args.move_time_ms,
+            lease_seconds=args.lease_seconds,
+            max_attempts=args.max_attempts,
+            stop_workers=args.stop_workers
+        )
+        print("Coordination completed.")
+    elif args.mode == "publish":
+        publish_script(args.queue_path, args.model_path)
+    elif args.mode == "worker":
+        print("Worker mode selected.")
+        work_script(
+            queue_path=args.queue_path,
+            worker_id=args.worker_id,
+            array_tree=args.array_tree,
+            cache_mb=args.cache_mb,
+            path_replay=args.path_replay,
+            max_tasks=args.max_tasks,
+            idle_timeout=args.idle_timeout
+        )
+    elif args.mode == "uci":
+        # no status lines here, stdout belongs to the UCI protocol
+        uci_script(
+            model_path=args.model_path,
+            batch_size=args.batch_size,
+            cache_mb=args.cache_mb,
+            path_replay=args.path_replay,
+            max_nodes=args.max_nodes
+        )
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,14 @@
 import math
+import time
+import chess.polyglot
 import numpy as np
 
+from telemetry import phase_timer
+
+VIRTUAL_LOSS = 1
+# moves a node is expanded with (before any widening)
+K_TOP = 10
+
 def calculate_ucb(C, visit_count,  action_value_sum, action_visit_count, action_prior):
     if action_visit_count == 0:
         q_value = 0
@@ -9,8 +17,32 @@ def calculate_ucb(C, visit_count,  action_value_sum, action_visit_count, action_
 
     return q_value + C * (math.sqrt(visit_count) / (action_visit_count + 1)) * action_prior
 
+def select_top_policies(game, state, policy, k_top=K_TOP):
+    """
+    Legal actions with the highest priors, best first (all of them when k_top is None).
+
+    The policy head outputs logits, so priors are a softmax over the legal entries only.
+    """
+    # ascending action order keeps ties resolved the same way as a scan over all actions
+    legal_indices = np.sort(game.get_legal_indices(state))
+    if len(legal_indices) == 0:
+        return legal_indices, np.zeros(0, dtype=np.float32)
+
+    logits = policy[legal_indices]
+    priors = np.exp(logits - logits.max())
+    priors /= priors.sum()
+
+    if k_top is None or k_top >= len(legal_indices):
+        order = np.argsort(-priors, kind="stable")
+    else:
+        top = np.argpartition(-priors, k_top - 1)[:k_top]
+        top.sort()
+        order = top[np.argsort(-priors[top], kind="stable")]
+
+    return legal_indices[order], priors[order]
+
 class Node:
-    def __init__(self, game, state, C, parent=None, action_taken=None, prior=0):
+    def __init__(self, game, state, C, parent=None, action_taken=None, prior=0, perspective=None):
         self.game = game
         self.C = C
         self.state = state
@@ -19,13 +51,18 @@ class Node:
         self.prior = prior
         
         self.best_policies = {}
+        self.pending_policies = None
         self.children = {}
         self.visit_count = 0
         self.value_sum = 0
 
-        self.perspective = game.get_perspective(state)
+        # path-replay nodes keep no board, the side to move simply alternates down the tree
+        self.perspective = game.get_perspective(state) if state is not None else perspective
         
-    def select(self):
+    def select(self, virtual_loss=0, transpositions=None, stats=None, board=None):
+        if self.pending_policies is not None:
+            self._widen()
+
         best_action = None
         best_ucb = -np.inf
 
@@ -39,58 +76,461 @@ class Node:
                 best_action = action
                 best_ucb = ucb
 
+        if board is not None:
+            # the caller's board follows the selected path and is popped after evaluation
+            board.push(self.game.index_to_move(best_action))
+
         if best_action not in self.children:
-            next_state = self.game.get_next_state(self.state, self.game.index_to_move(best_action))
-            self.children[best_action] = Node(self.game, next_state, self.C, self, best_action, self.best_policies[best_action])
+            if board is None:
+                if stats is not None:
+                    copy_started = time.perf_counter()
 
-        return self.children[best_action]
+                next_state = self.game.get_next_state(self.state, self.game.index_to_move(best_action))
 
-    def expand(self, policy, k_top=10):
-        valid_moves = self.game.get_valid_moves(self.state)
-        masked_policy = policy * valid_moves
+                if stats is not None:
+                    stats.add_time("board_copy", time.perf_counter() - copy_started)
+                key_state = next_state
+            else:
+                next_state = None
+                key_state = board
 
-        top_policies = sorted(
-            [(i, masked_policy[i]) for i in range(len(masked_policy)) if masked_policy[i] > 0],
-            key=lambda x: x[1],
-            reverse=True
-        )[:k_top]
+            if stats is not None:
+                stats.count("nodes_created")
 
-        self.best_policies = {index: prob for index, prob in top_policies}
-        
-    def backpropagate(self, value):
-        self.value_sum += value
-        self.visit_count += 1
+            perspective = "black" if self.perspective == "white" else "white"
+            if transpositions is None:
+                self.children[best_action] = Node(self.game, next_state, self.C, self, best_action, self.best_policies[best_action], perspective)
+            else:
+                # keyed with the ply as well, so a shared node can never be its own ancestor
+                key = (chess.polyglot.zobrist_hash(key_state), key_state.ply())
+                if key not in transpositions:
+                    transpositions[key] = Node(self.game, next_state, self.C, self, best_action, self.best_policies[best_action], perspective)
+                self.children[best_action] = transpositions[key]
+
+        child = self.children[best_action]
+        # a pending leaf counts as a lost visit until its evaluation comes back,
+        # which steers the next selections of the same batch to other lines
+        child.visit_count += virtual_loss
+        child.value_sum += virtual_loss
+
+        return child
+
+    def expand(self, policy, k_top=K_TOP, state=None, widening=0):
+        state = self.state if state is None else state
+
+        if not widening:
+            indices, priors = select_top_policies(self.game, state, policy, k_top)
+            self.best_policies = dict(zip(indices.tolist(), priors))
+            return
+
+        # progressive widening: start from the k_top best moves and open the
+        # next best ones as the node gets visited, so no legal move is cut for good
+        indices, priors = select_top_policies(self.game, state, policy, None)
+        self.best_policies = dict(zip(indices[:k_top].tolist(), priors[:k_top]))
+        if len(indices) > k_top:
+            self.pending_policies = (indices.tolist(), priors, k_top, widening)
+
+    def _widen(self):
+        indices, priors, k_top, widening = self.pending_policies
+        width = min(len(indices), k_top + int(widening * math.sqrt(self.visit_count)))
+
+        for i in range(len(self.best_policies), width):
+            self.best_policies[indices[i]] = priors[i]
+
+        if width == len(indices):
+            self.pending_policies = None
+
+
+def backpropagate_path(path, value, virtual_loss=0):
+    # nodes can be shared between lines once transpositions are merged, so the
+    # value is carried along the path that was actually selected, not parent links
+    for i in range(len(path) - 1, -1, -1):
+        node = path[i]
+        loss = virtual_loss if i > 0 else 0
 
-        if self.parent is not None:
-            if self.parent.perspective != self.perspective:
-                value = -value
-            self.parent.backpropagate(value)
+        node.value_sum += value - loss
+        node.visit_count += 1 - loss
 
+        if i > 0 and path[i - 1].perspective != node.perspective:
+            value = -value
+
+def revert_virtual_loss(path, virtual_loss):
+    for node in path[1:]:
+        node.visit_count -= virtual_loss
+        node.value_sum -= virtual_loss
+
+def search_limit(simulations, deadline, stop_event=None):
+    if simulations is None and deadline is None and stop_event is None:
+        raise ValueError("A search needs a simulation count, a deadline or a stop event.")
+    return simulations if simulations is not None else math.inf
+
+def stop_requested(visit_counts, stop_event):
+    # an interrupted search still returns a move, so at least one root move gets visited
+    # (unless the root has none, then there is nothing to wait for)
+    return stop_event is not None and stop_event.is_set() and (len(visit_counts) == 0 or visit_counts.sum() > 0)
+
+def out_of_time(visit_counts, done, limit, started, deadline):
+    """
+    Whether a deadline-driven search should stop: the deadline has passed, or the most
+    visited root move can no longer be overtaken with the simulations that are left.
+    """
+    if deadline is None or (len(visit_counts) and visit_counts.sum() == 0):
+        # keep going until at least one root move has been visited
+        return False
+
+    now = time.perf_counter()
+    if now >= deadline or len(visit_counts) == 1:
+        return True
+    if len(visit_counts) == 0:
+        # a root without moves is terminal, nothing can change before the deadline
+        return True
+
+    # the remaining simulations are estimated from the rate reached so far
+    rate = done / max(now - started, 1e-9)
+    remaining = min(limit - done, rate * (deadline - now))
+
+    second, first = np.partition(visit_counts, -2)[-2:]
+    return first - second > remaining
+
+
+def subtree_sizes(root):
+    """
+    The distinct nodes under `root` (itself included), parents before children, and per node id
+    how many nodes are only reachable through it (itself included) and its immediate dominator.
+
+    With transpositions a node can have several parents, and collapsing one of them frees only
+    the nodes no other line leads to: the node's subtree in the dominator tree, not in `parent` links.
+    """
+    # depth-first postorder, reversed into a topological order of the DAG
+    order = []
+    seen = {id(root)}
+    stack = [(root, iter(root.children.values()))]
+    while stack:
+        node, children = stack[-1]
+        for child in children:
+            if id(child) not in seen:
+                seen.add(id(child))
+                stack.append((child, iter(child.children.values())))
+                break
+        else:
+            stack.pop()
+            order.append(node)
+    order.reverse()
+
+    # every parent comes first, so a node's dominator is final before its children are reached
+    position = {id(node): i for i, node in enumerate(order)}
+    dominators = {id(root): None}
+    for node in order:
+        for child in node.children.values():
+            dominator = dominators.get(id(child), node)
+            other = node
+            while dominator is not other:
+                while position[id(dominator)] > position[id(other)]:
+                    dominator = dominators[id(dominator)]
+                while position[id(other)] > position[id(dominator)]:
+                    other = dominators[id(other)]
+            dominators[id(child)] = dominator
+
+    sizes = {id(node): 1 for node in order}
+    for node in reversed(order):
+        if dominators[id(node)] is not None:
+            sizes[id(dominators[id(node)])] += sizes[id(node)]
+    return order, sizes, dominators
+
+def count_nodes(root):
+    return len(subtree_sizes(root)[0])
+
+def collapse_node(node):
+    """
+    Drop everything below `node` but keep its own statistics, so its parent still scores it
+    the same way. A later visit evaluates and expands it again.
+    """
+    node.children = {}
+    node.best_policies = {}
+    node.pending_policies = None
 
 class MCTS: 
-    def __init__(self, engine, game):
+    def __init__(self, engine, game, virtual_loss=VIRTUAL_LOSS, reuse_tree=False, transpositions=False, path_replay=False,
+                 widening=0, max_nodes=None):
         self._game = game
         self._evaluate = engine.evaluate
+        self._evaluate_batch = engine.evaluate_batch
+        self._virtual_loss = virtual_loss
+        self._reuse_tree = reuse_tree
+        self._root = None
+        self._transpositions = {} if transpositions else None
+        self._path_replay = path_replay
+        self._widening = widening
+        self._max_nodes = max_nodes
+        self.stats = None
+        self.simulations_done = 0
+        self.node_count = 0
+        self.nodes_pruned = 0
+        self._last_root = None
 
-    def search(self, state, simulations=100, C=1.41):
-        root = Node(self._game, state, C)
-        
-        for _ in range(simulations):
-            node = root
+    def reset(self):
+        self._root = None
+        self._last_root = None
+        if self._transpositions is not None:
+            self._transpositions.clear()
 
-            while node.best_policies:
-                node = node.select()
+    def search(self, state, simulations=100, C=1.41, batch_size=1, deadline=None, stop_event=None):
+        """
+        Run `simulations` simulations, or as many as fit before `deadline` (a time.perf_counter()
+        value) when one is given, with `simulations` then acting as an optional cap.
+        Setting `stop_event` (a threading.Event) ends the search early.
+        The number actually run is left in `simulations_done`.
+        """
+        limit = search_limit(simulations, deadline, stop_event)
+        started = time.perf_counter()
 
-            is_terminal, value, policy = self._evaluate(node.state, node.perspective)
+        root = self.start_search(state, C)
+        # with path replay only the root owns a board, every other position is replayed on this one
+        board = root.state.copy() if self._path_replay else None
 
-            if not is_terminal:
-                node.expand(policy)
+        done = 0
+        while done < limit:
+            if batch_size > 1:
+                done += self._search_batch(root, min(batch_size, limit - done), board)
+            else:
+                self._simulate(root, board)
+                self.enforce_node_budget(root)
+                done += 1
 
-            node.backpropagate(value)
+            if deadline is not None or stop_event is not None:
+                # children are created on their first visit, so unvisited moves count as 0
+                visit_counts = np.array([root.children[action].visit_count if action in root.children else 0
+                                         for action in root.best_policies])
+                if out_of_time(visit_counts, done, limit, started, deadline) or stop_requested(visit_counts, stop_event):
+                    break
+
+        return self.finish_search(root, done)
+
+    def start_search(self, state, C=1.41):
+        """
+        Root for a search driven from outside, in rounds of collect_leaves() and
+        apply_evaluations(), so leaves of several searches can share one network call.
+        """
+        self.nodes_pruned = 0
+        root = self._take_root(state, C)
+        # a reused subtree brings its nodes along
+        self.node_count = count_nodes(root) if root.children else 1
+        return root
+
+    def finish_search(self, root, simulations_done):
+        self.simulations_done = simulations_done
+        self._last_root = root
+
+        if self._reuse_tree:
+            self._root = root
 
         action_probs = np.zeros(self._game.action_size)
         for child in root.children.values():
             action_probs[child.action_taken] = child.visit_count
-        action_probs /= np.sum(action_probs)
+        if action_probs.sum() == 0:
+            # too short a search to visit any move: fall back to the priors of the expanded root
+            for action, prior in root.best_policies.items():
+                action_probs[action] = prior
+        if action_probs.sum() > 0:
+            # a terminal root has no moves to give probabilities to
+            action_probs /= action_probs.sum()
         return action_probs
-        
\ No newline at end of file
+
+    def principal_variation(self, max_length=10):
+        """Actions along the most visited line of the last search."""
+        actions = []
+        node = self._last_root
+
+        while node is not None and node.children and len(actions) < max_length:
+            action, node = max(node.children.items(), key=lambda item: item[1].visit_count)
+            actions.append(action)
+
+        return actions
+
+    def _simulate(self, root, board=None):
+        phase = phase_timer(self.stats)
+
+        with phase("select"):
+            path = self._descend(root, board=board)
+        node = path[-1]
+        leaf_state = node.state if board is None else board
+
+        with phase("evaluate"):
+            is_terminal, value, policy = self._evaluate(leaf_state, node.perspective)
+
+        if not is_terminal:
+            with phase("expand"):
+                node.expand(policy, state=leaf_state, widening=self._widening)
+
+        with phase("backpropagate"):
+            backpropagate_path(path, value)
+
+        if board is not None:
+            for _ in range(len(path) - 1):
+                board.pop()
+
+    def _take_root(self, state, C):
+        previous_root, self._root = self._root, None
+
+        root = self._find_descendant(previous_root, state) if previous_root is not None else None
+        if self._transpositions is not None:
+            self._transpositions.clear()
+
+        if root is None:
+            # the caller keeps pushing moves on its board, so the root owns a copy
+            return Node(self._game, state.copy(), C)
+
+        # detach the promoted subtree so the rest of the previous tree can be released
+        root.parent = None
+        root.action_taken = None
+        if root.state is None:
+            root.state = state.copy()
+        return root
+
+    def _find_descendant(self, node, state):
+        searched_moves = node.state.move_stack
+        played_moves = state.move_stack
+
+        if len(played_moves) < len(searched_moves) or played_moves[:len(searched_moves)] != searched_moves:
+            return None
+
+        for move in played_moves[len(searched_moves):]:
+            node = node.children.get(self._game.move_to_index(move))
+            if node is None:
+                return None
+
+        # replayed nodes have no board to compare, the moves walked from the root identify them
+        return node if node.state is None or node.state == state else None
+
+    def _descend(self, root, virtual_loss=0, board=None):
+        path = [root]
+        node = root
+
+        while node.best_policies:
+            # a shared transposition node is linked in without being created
+            known = len(node.children) if self._transpositions is None else len(self._transpositions)
+            parent, node = node, node.select(virtual_loss, self._transpositions, self.stats, board)
+            if (len(parent.children) if self._transpositions is None else len(self._transpositions)) > known:
+                self.node_count += 1
+            path.append(node)
+
+        return path
+
+    def enforce_node_budget(self, root):
+        """
+        Once the tree holds more than `max_nodes` nodes, collapse the least visited subtrees
+        until it is back under 90% of the budget (so pruning is not repeated on every node).
+        Only call this with no leaves pending, the collapsed nodes may be on their paths.
+        """
+        if self._max_nodes is None or self.node_count <= self._max_nodes:
+            return 0
+
+        phase = phase_timer(self.stats)
+        with phase("prune"):
+            target = int(self._max_nodes * 0.9)
+            nodes, sizes, dominators = subtree_sizes(root)
+
+            # least visited first, which in a tree puts descendants before their ancestors
+            candidates = sorted((node for node in nodes if node is not root and node.children), key=lambda node: node.visit_count)
+            collapsed = set()
+            excess = len(nodes) - target
+            for node in candidates:
+                if excess <= 0:
+                    break
+
+                freed = sizes[id(node)] - 1
+                dominator_chain = []
+                dominator = dominators[id(node)]
+                while dominator is not None:
+                    dominator_chain.append(dominator)
+                    dominator = dominators[id(dominator)]
+                if freed <= 0 or any(id(dominator) in collapsed for dominator in dominator_chain):
+                    # nothing to free, or already dropped with a collapsed dominator
+                    continue
+
+                collapse_node(node)
+                collapsed.add(id(node))
+                excess -= freed
+                sizes[id(node)] = 1
+                for dominator in dominator_chain:
+                    sizes[id(dominator)] -= freed
+
+            pruned = len(nodes) - count_nodes(root)
+            if self._transpositions is not None:
+                # entries of pruned nodes would keep them alive and link them back in
+                alive = {id(node) for node in subtree_sizes(root)[0]}
+                for key in [key for key, node in self._transpositions.items() if id(node) not in alive]:
+                    del self._transpositions[key]
+
+        self.node_count -= pruned
+        self.nodes_pruned += pruned
+        if self.stats is not None:
+            self.stats.count("nodes_pruned", pruned)
+        return pruned
+
+    def _search_batch(self, root, batch_size, board=None):
+        phase = phase_timer(self.stats)
+
+        with phase("select"):
+            paths = self.collect_leaves(root, batch_size, board)
+        leaves = [path[-1] for path in paths]
+
+        with phase("evaluate"):
+            results = self._evaluate_batch([leaf.state for leaf in leaves], [leaf.perspective for leaf in leaves])
+        self.apply_evaluations(paths, results)
+
+        if self.stats is not None:
+            self.stats.count("batch_leaves", len(paths))
+            self.stats.count("batch_capacity", batch_size)
+
+        return len(paths)
+
+    def collect_leaves(self, root, batch_size, board=None):
+        """Paths to up to `batch_size` distinct leaves, held apart by virtual loss until evaluated."""
+        if self._path_replay and board is None:
+            board = root.state.copy()
+
+        paths = []
+        collisions = []
+        leaves = set()
+        phase = phase_timer(self.stats)
+
+        for _ in range(batch_size):
+            path = self._descend(root, self._virtual_loss, board)
+            leaf = path[-1]
+
+            if leaf in leaves:
+                # a descent that ends on a pending leaf keeps its virtual loss until the batch is
+                # collected, so a strong prior cannot pull every descent back to the same leaf
+                collisions.append(path)
+            else:
+                if board is not None and leaf.state is None:
+                    # a pending leaf holds a copy of its position until the evaluation is applied
+                    with phase("board_copy"):
+                        leaf.state = board.copy()
+                paths.append(path)
+                leaves.add(leaf)
+
+            if board is not None:
+                for _ in range(len(path) - 1):
+                    board.pop()
+
+        for path in collisions:
+            revert_virtual_loss(path, self._virtual_loss)
+        return paths
+
+    def apply_evaluations(self, paths, results):
+        phase = phase_timer(self.stats)
+
+        for path, (is_terminal, value, policy) in zip(paths, results):
+            if not is_terminal:
+                with phase("expand"):
+                    path[-1].expand(policy, widening=self._widening)
+            with phase("backpropagate"):
+                backpropagate_path(path, value, self._virtual_loss)
+
+            if self._path_replay and len(path) > 1:
+                path[-1].state = None
+
+        if paths:
+            self.enforce_node_budget(paths[0][0])
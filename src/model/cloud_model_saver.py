@@ -1,26 +1,148 @@
 import os
-from backblaze_gateway import BackblazeGateway
+import time
+import hashlib
+import zipfile
+import tempfile
+import threading
+
+def checkpoint_digest(path):
+    """
+    SHA-256 of a saved model's content. A .keras archive also stores the time it was saved,
+    so its metadata.json is left out and the same weights always give the same digest.
+    """
+    digest = hashlib.sha256()
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in sorted(archive.namelist()):
+                if name == "metadata.json":
+                    continue
+                digest.update(name.encode())
+                with archive.open(name) as member:
+                    for block in iter(lambda: member.read(1 << 20), b""):
+                        digest.update(block)
+    else:
+        with open(path, "rb") as model_file:
+            for block in iter(lambda: model_file.read(1 << 20), b""):
+                digest.update(block)
+
+    return digest.hexdigest()
 
 class CloudModelSaver:
-    def __init__(self, save_path, gateway: BackblazeGateway):
+    """
+    Saves checkpoints to a gateway (BackblazeGateway, or FileSystemGateway offline) in the background.
+
+    `save` only writes the model to a private temp file and returns; a single upload thread sends
+    it with retries while training carries on. Every checkpoint goes to the same remote path, so a
+    checkpoint still waiting behind a running upload is replaced by a newer one, and a checkpoint
+    with the same content as the last one is skipped. Call `close` before exiting so the last
+    upload finishes.
+    """
+    def __init__(self, save_path, gateway, retries=3, retry_delay=2.0):
         self.save_path = save_path
         self.gateway = gateway
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self.uploaded = 0
+        self.skipped = 0
+        self.failed = 0
+
+        self._condition = threading.Condition()
+        self._pending = None
+        self._uploading = False
+        self._last_digest = None
+        self._closed = False
+        self._thread = None
 
     def save(self, model):
-        temp_path = "/tmp/model_file.keras"
+        fd, temp_path = tempfile.mkstemp(prefix="model_", suffix=".keras")
+        os.close(fd)
 
         try:
+            # written now, so later training steps cannot change what gets uploaded
             model.save(temp_path)
-
-            self.gateway.upload_file(temp_path, self.save_path)
-            print(f"Model uploaded to the cloud.")
-
+            digest = checkpoint_digest(temp_path)
         except Exception as e:
             print(f"Error saving model to cloud: {e}")
-            model = None
+            os.remove(temp_path)
+            return None
 
-        finally:
-            if os.path.exists(temp_path):
+        with self._condition:
+            if self._closed:
                 os.remove(temp_path)
+                raise ValueError("The model saver is closed.")
+
+            if digest == self._last_digest:
+                os.remove(temp_path)
+                self.skipped += 1
+                print("Model unchanged since the last checkpoint, upload skipped.")
+                return model
+
+            if self._pending is not None:
+                # superseded before its upload started
+                os.remove(self._pending[0])
+                self.skipped += 1
+
+            self._pending = (temp_path, digest)
+            self._last_digest = digest
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._upload_loop, daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
 
         return model
+
+    def flush(self, timeout=None):
+        """Wait until the queued checkpoint is uploaded. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._pending is None and not self._uploading, timeout)
+
+    def close(self, timeout=None):
+        self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _upload_loop(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+
+                (temp_path, digest), self._pending = self._pending, None
+                self._uploading = True
+
+            try:
+                uploaded = self._upload(temp_path, digest)
+            finally:
+                os.remove(temp_path)
+
+            with self._condition:
+                self._uploading = False
+                if not uploaded and self._last_digest == digest:
+                    # the same weights saved again are worth another attempt
+                    self._last_digest = None
+                self._condition.notify_all()
+
+    def _upload(self, temp_path, digest):
+        for attempt in range(self.retries + 1):
+            try:
+                started = time.perf_counter()
+                self.gateway.upload_file(temp_path, self.save_path, {"source": "ml-model", "sha256": digest})
+                self.uploaded += 1
+                print(f"Model uploaded to the cloud in {time.perf_counter() - started:.1f}s.")
+                return True
+            except Exception as e:
+                if attempt == self.retries:
+                    self.failed += 1
+                    print(f"Error uploading model to cloud, giving up after {attempt + 1} attempts: {e}")
+                    return False
+
+                delay = self.retry_delay * 2 ** attempt
+                print(f"Error uploading model to cloud, retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
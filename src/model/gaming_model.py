@@ -1,13 +1,21 @@
 import os
+import warnings
 import numpy as np
+import tensorflow as tf
 from tensorflow.config import list_physical_devices
 from tensorflow.keras import  mixed_precision, models
 
 from model.res_net import build_resnet
 
+INFERENCE_BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
 class GamingRLModel():
-    def __init__(self, model_saver, model_path=None):
+    def __init__(self, model_saver, model_path=None, inference_precision=None):
         self._model_saver = model_saver
+        self._inference_precision = inference_precision
+        self._inference_model = None
+        self._infer = None
+        self._input_buffers = {}
         if model_saver is None:
             raise Exception("Model saver not provided.")
 
@@ -30,6 +38,8 @@ class GamingRLModel():
 
         if list_physical_devices('GPU'):
             mixed_precision.set_global_policy('mixed_float16')
+
+        self.refresh_inference_model()
         
     def _load_model(self, model_path):
         try:
@@ -58,15 +68,43 @@ class GamingRLModel():
         policy_target = np.array([step[1] for step in train_data], dtype=np.float32)
         value_target = np.array([float(step[2]) if np.isscalar(step[2]) else float(step[2][0]) for step in train_data], dtype=np.float32)
         
-        self._model.compile(optimizer='adam', loss=['categorical_crossentropy', 'mean_squared_error'])
-
-        history = self._model.fit(
+        return self._fit(
             X_train, [policy_target, value_target],
+            callback,
             epochs=epochs,
             batch_size=batch_size,
             validation_data=validation_data
         )
 
+    def train_dataset(self, dataset, callback=None, epochs=100, validation_data=None):
+        """
+        Train the model from a streaming dataset.
+
+        dataset: batched tf.data.Dataset yielding (inputs, (policy_target, value_target)),
+        optionally with per-position sample weights as a third element.
+        """
+        return self._fit(dataset, None, callback, epochs=epochs, validation_data=validation_data)
+
+    def train_batch(self, states, policy_target, value_target):
+        """
+        One gradient step, for training loops that sample their own batches.
+        The inference model is not refreshed here; call refresh_inference_model() before serving.
+        """
+        self._compile()
+        return self._model.train_on_batch(states, [policy_target, value_target])
+
+    def _compile(self):
+        # compiled once, so the Adam moments carry over between training calls
+        # (a model saved after training is loaded already compiled, with its optimizer state)
+        if not getattr(self._model, "compiled", False):
+            self._model.compile(optimizer='adam', loss=['categorical_crossentropy', 'mean_squared_error'])
+
+    def _fit(self, x, y, callback, **fit_args):
+        self._compile()
+
+        history = self._model.fit(x, y, **fit_args)
+        self.refresh_inference_model()
+
         self._model_saver.save(self._model)
 
         if callback:
@@ -78,10 +116,61 @@ class GamingRLModel():
         if len(states.shape) == 3:  
             states = np.expand_dims(states, axis=0)  
 
-        policy, value = self._model.predict(states)
+        policies, values = [], []
+        largest_bucket = INFERENCE_BATCH_BUCKETS[-1]
+        for start in range(0, states.shape[0], largest_bucket):
+            policy, value = self._predict_bucket(states[start:start + largest_bucket])
+            policies.append(policy)
+            values.append(value)
+
+        policy = policies[0] if len(policies) == 1 else np.concatenate(policies)
+        value = values[0] if len(values) == 1 else np.concatenate(values)
 
         if states.shape[0] == 1:
             policy = np.squeeze(policy, axis=0)
             value = np.squeeze(value, axis=0)
 
         return policy, value
+
+    def _predict_bucket(self, states):
+        size = states.shape[0]
+        bucket = next(bucket for bucket in INFERENCE_BATCH_BUCKETS if bucket >= size)
+
+        # padding to a few fixed shapes keeps the traced graph count bounded
+        buffer = self._input_buffers.get(bucket)
+        if buffer is None:
+            buffer = self._input_buffers[bucket] = np.zeros((bucket, 8, 8, 16), dtype=np.float32)
+        buffer[:size] = states
+        buffer[size:] = 0
+
+        policy, value = self._infer(buffer)
+        return np.asarray(policy[:size], dtype=np.float32), np.asarray(value[:size], dtype=np.float32)
+
+    def refresh_inference_model(self):
+        """
+        Rebuild the traced inference function, and the reduced-precision copy if one is used.
+        Called after the weights change.
+        """
+        if self._model is None:
+            return
+
+        model = self._model
+        if self._inference_precision == "int8":
+            model = models.clone_model(self._model)
+            model.set_weights(self._model.get_weights())
+            with warnings.catch_warnings():
+                # only the Dense layers (mainly the policy head) have an int8 kernel
+                warnings.simplefilter("ignore", UserWarning)
+                model.quantize("int8")
+        elif self._inference_precision is not None:
+            raise ValueError(f"Unsupported inference precision: {self._inference_precision}")
+
+        self._inference_model = model
+        self._infer = tf.function(lambda states: model(states, training=False))
+
+    def warm_up(self, batch_sizes=(1,)):
+        for batch_size in batch_sizes:
+            self.predict(np.zeros((batch_size, 8, 8, 16), dtype=np.float32))
+
+    def save_to(self, path):
+        self._model.save(path)
@@ -0,0 +1,17 @@
+from model.stub_model import STUB_MODEL_PATH, StubModel
+
+def load_model(model_path, warm_up_batch_sizes=(1,)):
+    """
+    Load a model for inference only (no training saver), warmed up for the given batch sizes.
+    STUB_MODEL_PATH gives the deterministic stub instead of TensorFlow.
+    """
+    if model_path == STUB_MODEL_PATH:
+        model = StubModel()
+    else:
+        from model.gaming_model import GamingRLModel
+        from model.local_model_saver import LocalModelSaver
+
+        model = GamingRLModel(LocalModelSaver("placeholder"), model_path)
+
+    model.warm_up(warm_up_batch_sizes)
+    return model
@@ -13,3 +13,6 @@ class LocalModelSaver:
             model = None
         
         return model
+
+    def close(self):
+        pass
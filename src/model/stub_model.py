@@ -0,0 +1,32 @@
+import numpy as np
+
+STUB_MODEL_PATH = "stub://"
+
+class StubModel:
+    """
+    Deterministic stand-in for GamingRLModel with the same predict interface.
+
+    Outputs depend only on the input planes, through a fixed random projection, so searches
+    are reproducible and the cost of the network is reduced to one small matrix product.
+    """
+    def __init__(self, seed=0, action_size=4672):
+        rng = np.random.default_rng(seed)
+        self._policy_weights = rng.standard_normal((8 * 8 * 16, action_size)).astype(np.float32) * 0.1
+        self._value_weights = rng.standard_normal((8 * 8 * 16, 1)).astype(np.float32) * 0.05
+
+    def predict(self, states):
+        if len(states.shape) == 3:
+            states = np.expand_dims(states, axis=0)
+
+        flat_states = states.reshape(states.shape[0], -1)
+        policy = flat_states @ self._policy_weights
+        value = np.tanh(flat_states @ self._value_weights)
+
+        if states.shape[0] == 1:
+            policy = np.squeeze(policy, axis=0)
+            value = np.squeeze(value, axis=0)
+
+        return policy, value
+
+    def warm_up(self, batch_sizes=(1,)):
+        pass
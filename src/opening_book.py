@@ -0,0 +1,136 @@
+import os
+import time
+
+import chess.polyglot
+import numpy as np
+
+from game_records import read_games
+
+BOOK_MAGIC = b"CHESSBK1"
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("width", "<u4"), ("max_plies", "<u4"), ("capacity", "<u8"), ("entries", "<u8"), ("reserved", "<u8", (4,))
+])
+
+def entry_dtype(width):
+    return np.dtype([("key", "<u8"), ("count", "<u4"), ("value", "<f4"), ("actions", "<u2", (width,)), ("probs", "<f4", (width,))])
+
+class OpeningBook:
+    """
+    Read-only opening book: the aggregated root visit distributions of self-play games, per Zobrist key.
+
+    The file is an open-addressing hash table (linear probing, key 0 marks an empty slot) mapped
+    into memory, so a probe touches a slot or two without loading the book, and worker processes
+    that open the same file share its pages. Pickling only carries the path.
+    """
+    def __init__(self, path):
+        self.path = path
+
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header[0]["magic"] != BOOK_MAGIC:
+            raise ValueError(f"{path} is not an opening book.")
+
+        header = header[0]
+        self.width = int(header["width"])
+        self.max_plies = int(header["max_plies"])
+        self._entries = int(header["entries"])
+        self._mask = int(header["capacity"]) - 1
+        self._table = np.memmap(path, dtype=entry_dtype(self.width), mode="r", offset=HEADER_DTYPE.itemsize,
+                                shape=(int(header["capacity"]),))
+
+    def __len__(self):
+        return self._entries
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def probe(self, board):
+        """(actions, probs, value, count) stored for the position, or None if it is not in the book."""
+        key = chess.polyglot.zobrist_hash(board)
+        slot = key & self._mask
+
+        while True:
+            entry = self._table[slot]
+            if entry["key"] == key:
+                used = entry["probs"] > 0
+                return entry["actions"][used].astype(np.int64), entry["probs"][used], float(entry["value"]), int(entry["count"])
+            if entry["key"] == 0:
+                return None
+            slot = (slot + 1) & self._mask
+
+def write_book(path, keys, counts, values, actions, probs, max_plies):
+    width = actions.shape[1]
+    # at most half full, so probes stay short
+    capacity = 1 << max(int(np.ceil(np.log2(max(len(keys), 1) * 2))), 4)
+
+    table = np.zeros(capacity, dtype=entry_dtype(width))
+    for i, key in enumerate(keys):
+        slot = int(key) & (capacity - 1)
+        while table[slot]["key"] != 0:
+            slot = (slot + 1) & (capacity - 1)
+        table[slot] = (key, counts[i], values[i], actions[i], probs[i])
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header[0]["magic"] = BOOK_MAGIC
+    header[0]["width"] = width
+    header[0]["max_plies"] = max_plies
+    header[0]["capacity"] = capacity
+    header[0]["entries"] = len(keys)
+
+    # written aside and renamed, so workers that have the book open keep reading the old one
+    with open(f"{path}.tmp", "wb") as book_file:
+        book_file.write(header.tobytes())
+        book_file.write(table.tobytes())
+    os.replace(f"{path}.tmp", path)
+
+def build_book(games_path, book_path, max_plies=20, min_count=20, width=16):
+    """
+    Aggregate the first `max_plies` positions of every stored game into an opening book.
+    Only positions reached in at least `min_count` games get an entry, with the mean of their
+    search policies (the `width` most visited moves) and of their search values.
+    """
+    started = time.perf_counter()
+    if os.path.isdir(games_path):
+        h5_files = sorted(os.path.join(games_path, file) for file in os.listdir(games_path) if file.endswith(".h5"))
+    else:
+        h5_files = [games_path]
+
+    positions = {}
+    games = 0
+    for file in h5_files:
+        for states, policies, values, keys in read_games(file):
+            games += 1
+            for ply in range(min(max_plies, len(keys))):
+                key = int(keys[ply])
+                if key == 0:
+                    # files without stored keys cannot be matched against boards
+                    break
+
+                position = positions.setdefault(key, [0, 0.0, {}])
+                position[0] += 1
+                position[1] += float(values[ply])
+                for action in np.flatnonzero(policies[ply]):
+                    position[2][action] = position[2].get(action, 0.0) + float(policies[ply][action])
+
+    kept = sorted(key for key, position in positions.items() if position[0] >= min_count)
+    counts = np.zeros(len(kept), dtype=np.uint32)
+    values = np.zeros(len(kept), dtype=np.float32)
+    actions = np.zeros((len(kept), width), dtype=np.uint16)
+    probs = np.zeros((len(kept), width), dtype=np.float32)
+
+    for i, key in enumerate(kept):
+        count, value_sum, visits = positions[key]
+        top = sorted(visits.items(), key=lambda item: -item[1])[:width]
+        total = sum(weight for _, weight in top)
+
+        counts[i] = count
+        values[i] = value_sum / count
+        actions[i, :len(top)] = [action for action, _ in top]
+        probs[i, :len(top)] = [weight / total for _, weight in top]
+
+    write_book(book_path, np.array(kept, dtype=np.uint64), counts, values, actions, probs, max_plies)
+    print(f"Wrote {len(kept)} of {len(positions)} opening positions from {games} games to {book_path} "
+          f"in {time.perf_counter() - started:.1f}s")
+    return len(kept)
@@ -0,0 +1,216 @@
+import os
+import time
+import itertools
+import collections
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import h5py
+import chess
+import chess.pgn
+import numpy as np
+
+ANALYSIS_FORMAT = "analysis-v1"
+
+_worker_model = None
+_worker_engine = None
+_worker_encoder = None
+_worker_game = None
+
+def iter_positions(path):
+    """
+    Stream FENs from a .pgn file (every position of every game's mainline) or from a text
+    file with one FEN or EPD per line. The order is stable, which is what resuming relies on.
+    """
+    if path.endswith(".pgn"):
+        with open(path) as pgn_file:
+            while True:
+                game = chess.pgn.read_game(pgn_file)
+                if game is None:
+                    break
+
+                board = game.board()
+                yield board.fen()
+                for move in game.mainline_moves():
+                    board.push(move)
+                    yield board.fen()
+        return
+
+    with open(path) as fen_file:
+        for line in fen_file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            fields = line.split()
+            if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+                yield " ".join(fields[:6])
+            else:
+                # EPD lines carry operations instead of the move counters
+                board, _ = chess.Board.from_epd(line)
+                yield board.fen()
+
+def init_analysis_worker(model_path, simulations=0, batch_size=64, search_batch_size=8, max_nodes=None):
+    from engine import ChessEngine
+    from chess_game import ChessGame
+    from board_encoder import BoardEncoder
+    from model.loader import load_model
+
+    global _worker_model, _worker_engine, _worker_encoder, _worker_game
+    _worker_model = load_model(model_path, tuple(sorted({1, batch_size, search_batch_size})))
+    _worker_encoder = BoardEncoder(batch_size)
+    _worker_game = ChessGame()
+
+    if simulations > 0:
+        # the positions are unrelated, so nothing is gained from keeping the tree
+        _worker_engine = ChessEngine(_worker_model, reuse_tree=False, max_nodes=max_nodes)
+
+def analyze_chunk(fens, simulations=0, search_batch_size=8):
+    boards = [chess.Board(fen) for fen in fens]
+    values = np.zeros(len(boards), dtype=np.float32)
+    best_moves = [""] * len(boards)
+    best_probs = np.zeros(len(boards), dtype=np.float32)
+
+    live = [i for i, board in enumerate(boards) if not board.is_game_over()]
+    for i, board in enumerate(boards):
+        if board.is_game_over():
+            result = board.result()
+            values[i] = 1 if result == "1-0" else -1 if result == "0-1" else 0
+
+    if live and simulations > 0:
+        for i in live:
+            move, action_probs, value = _worker_engine.best_move(boards[i], simulations, 1.41, search_batch_size)
+            values[i] = np.reshape(value, -1)[0]
+            best_moves[i] = move.uci()
+            best_probs[i] = action_probs[_worker_game.move_to_index(move)]
+    elif live:
+        tensors = _worker_encoder.encode_batch([boards[i] for i in live])
+        policies, network_values = _worker_model.predict(tensors)
+        policies = np.reshape(policies, (len(live), -1))
+        network_values = np.reshape(network_values, (len(live), -1))
+
+        for j, i in enumerate(live):
+            # the policy head outputs logits, the move probabilities are a softmax over the legal ones
+            legal_indices = _worker_game.get_legal_indices(boards[i])
+            logits = policies[j][legal_indices]
+            priors = np.exp(logits - logits.max())
+            priors /= priors.sum()
+
+            best = int(np.argmax(priors))
+            values[i] = network_values[j, 0]
+            best_moves[i] = _worker_game.index_to_move(legal_indices[best]).uci()
+            best_probs[i] = priors[best]
+
+    return values, best_moves, best_probs
+
+class AnalysisWriter:
+    """
+    Columnar HDF5 output: one row per input position, in input order.
+
+    `value` is the network value from white's point of view, `best_move` the move with the
+    highest prior (or the searched move when simulations > 0) and `best_prob` its probability.
+    The `positions_done` attribute is updated with every flushed chunk, so a stopped run can resume.
+    """
+    def __init__(self, path, source_path, simulations):
+        self._h5_file = h5py.File(path, "a")
+        h5_file = self._h5_file
+
+        if h5_file.attrs.get("format") != ANALYSIS_FORMAT:
+            if len(h5_file.keys()):
+                raise ValueError(f"{path} is not an analysis file.")
+
+            h5_file.attrs["format"] = ANALYSIS_FORMAT
+            h5_file.attrs["source"] = os.path.abspath(source_path)
+            h5_file.attrs["simulations"] = simulations
+            h5_file.attrs["positions_done"] = 0
+
+            def create(name, dtype):
+                h5_file.create_dataset(name, shape=(0,), maxshape=(None,), dtype=dtype, chunks=(4096,), compression="gzip")
+
+            create("fen", h5py.string_dtype())
+            create("value", np.float32)
+            create("best_move", h5py.string_dtype())
+            create("best_prob", np.float32)
+        elif h5_file.attrs["source"] != os.path.abspath(source_path):
+            raise ValueError(f"{path} holds the analysis of {h5_file.attrs['source']}, not {source_path}.")
+        elif h5_file.attrs["simulations"] != simulations:
+            raise ValueError(f"{path} was analyzed with {h5_file.attrs['simulations']} simulations, not {simulations}.")
+
+    @property
+    def positions_done(self):
+        return int(self._h5_file.attrs["positions_done"])
+
+    def append(self, fens, values, best_moves, best_probs):
+        size = self.positions_done
+
+        for name, data in (("fen", fens), ("value", values), ("best_move", best_moves), ("best_prob", best_probs)):
+            dataset = self._h5_file[name]
+            # rows past positions_done are leftovers of an interrupted write and get overwritten
+            dataset.resize(size + len(data), axis=0)
+            dataset[size:] = data
+
+        self._h5_file.attrs["positions_done"] = size + len(fens)
+        self._h5_file.flush()
+
+    def close(self):
+        self._h5_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def analyze_positions(input_path, output_path, model_path, batch_size=256, simulations=0, search_batch_size=8,
+                      num_workers=None, progress_every=10000, max_nodes=None):
+    num_workers = num_workers or os.cpu_count()
+    started = time.perf_counter()
+
+    with AnalysisWriter(output_path, input_path, simulations) as writer:
+        skipped = writer.positions_done
+        if skipped:
+            print(f"Resuming after {skipped} analyzed positions")
+
+        positions = itertools.islice(iter_positions(input_path), skipped, None)
+        chunks = _chunks(positions, batch_size)
+        analyzed = 0
+        next_report = progress_every
+
+        executor = ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=init_analysis_worker,
+            initargs=(model_path, simulations, batch_size, search_batch_size, max_nodes)
+        )
+
+        with executor:
+            # a bounded window of chunks in flight keeps memory flat and the output in input order
+            pending = collections.deque()
+            for chunk in itertools.chain(chunks, [None]):
+                if chunk is not None:
+                    pending.append((chunk, executor.submit(analyze_chunk, chunk, simulations, search_batch_size)))
+                    if len(pending) < num_workers * 2:
+                        continue
+
+                while pending and (chunk is None or len(pending) >= num_workers * 2):
+                    fens, future = pending.popleft()
+                    writer.append(fens, *future.result())
+                    analyzed += len(fens)
+
+                    if analyzed >= next_report:
+                        rate = analyzed / (time.perf_counter() - started)
+                        print(f"Analyzed {skipped + analyzed} positions ({rate:.0f} positions/s)")
+                        next_report += progress_every
+
+        elapsed = time.perf_counter() - started
+        print(f"Analyzed {analyzed} positions in {elapsed:.1f}s, {writer.positions_done} in {output_path}")
+
+    return analyzed
@@ -0,0 +1,391 @@
+import os
+import time
+
+import chess
+import chess.polyglot
+import h5py
+import numpy as np
+
+from board_encoder import decode_board
+from game_records import ACTION_SIZE, PACKED_STATE_SIZE, pack_states, unpack_states, read_games
+
+DEDUP_FORMAT = "dedup-v1"
+INDEX_FORMAT = "dedup-index-v1"
+INDEX_NAME = "positions.idx"
+LOG_NAME = "positions.log"
+# rows are read and written in aligned blocks of this many, as contiguous slices
+IO_BLOCK_ROWS = 4096
+
+def _follow_move(board, target):
+    """The board after the legal move that leads to `target`'s pieces and castling rights, or None."""
+    moved_from = board.occupied_co[board.turn] & ~target.occupied_co[board.turn]
+    for move in board.legal_moves:
+        if not chess.BB_SQUARES[move.from_square] & moved_from:
+            continue
+        board.push(move)
+        if board.board_fen() == target.board_fen() and board.clean_castling_rights() == target.castling_rights:
+            return board
+        board.pop()
+    return None
+
+def legacy_keys(states):
+    """
+    Zobrist keys of the positions of a game stored without them (legacy files), matching the keys
+    stored by compact files. The planes lack the side to move and the en passant square, so the game
+    is replayed: each position is reached from the previous one by the legal move that produces it.
+    A position no move leads to starts over from its planes, with the side to move of its ply in a
+    game from the starting position.
+    """
+    keys = np.zeros(len(states), dtype=np.uint64)
+    board = None
+
+    for ply, planes in enumerate(states):
+        target = decode_board(planes, chess.WHITE if ply % 2 == 0 else chess.BLACK)
+        if board is not None:
+            board = _follow_move(board, target)
+        if board is None:
+            board = target
+        keys[ply] = chess.polyglot.zobrist_hash(board)
+
+    return keys
+
+def _blocks(rows):
+    """Split sorted row numbers into (block start, positions in `rows`) per aligned IO block."""
+    blocks = rows // IO_BLOCK_ROWS
+    for part in np.split(np.arange(len(rows)), np.flatnonzero(np.diff(blocks)) + 1):
+        if len(part):
+            yield int(blocks[part[0]]) * IO_BLOCK_ROWS, part
+
+def top_entries(slots, actions, weights, num_slots, width):
+    """
+    Reduce (slot, action, weight) triples to each slot's `width` heaviest actions, as fixed-width
+    (num_slots, width) index and probability arrays. Probabilities are renormalized per slot.
+    """
+    codes, inverse = np.unique(slots.astype(np.int64) * ACTION_SIZE + actions, return_inverse=True)
+    sums = np.bincount(inverse, weights, minlength=len(codes))
+    slots, actions = codes // ACTION_SIZE, codes % ACTION_SIZE
+
+    # heaviest first within each slot, then rank = position within the slot's run
+    order = np.lexsort((-sums, slots))
+    slots, actions, sums = slots[order], actions[order], sums[order]
+    starts = np.searchsorted(slots, slots, side="left")
+    ranks = np.arange(len(slots)) - starts
+    keep = ranks < width
+
+    indices = np.zeros((num_slots, width), dtype=np.uint16)
+    probs = np.zeros((num_slots, width), dtype=np.float32)
+    indices[slots[keep], ranks[keep]] = actions[keep]
+    probs[slots[keep], ranks[keep]] = sums[keep]
+
+    totals = probs.sum(axis=1, keepdims=True)
+    return indices, np.divide(probs, totals, out=np.zeros_like(probs), where=totals > 0)
+
+def is_dedup_shard(h5_file):
+    return h5_file.attrs.get("format") == DEDUP_FORMAT
+
+def read_shard(path, chunk_rows=4096):
+    """Yield (states, policies, values, counts) of a deduplicated shard in chunks, with dense arrays."""
+    with h5py.File(path, "r") as h5_file:
+        size = h5_file["keys"].shape[0]
+        for start in range(0, size, chunk_rows):
+            end = min(start + chunk_rows, size)
+            indices = h5_file["policy_indices"][start:end]
+            probs = h5_file["policy_probs"][start:end]
+
+            rows, columns = np.nonzero(probs)
+            policies = np.zeros((end - start, ACTION_SIZE), dtype=np.float32)
+            policies[rows, indices[rows, columns]] = probs[rows, columns]
+
+            yield unpack_states(h5_file["states"][start:end]), policies, h5_file["values"][start:end], h5_file["counts"][start:end]
+
+class PositionIndex:
+    """
+    Training positions deduplicated across game files, keyed by Zobrist hash.
+
+    Every distinct position is stored once in fixed-size HDF5 shards, with the mean of the value
+    targets and of the policy targets of all its occurrences (the policy kept as its
+    `policy_width` most visited moves) and the number of occurrences. `positions.idx` holds the
+    sorted keys with the location of each position, and how many games of each source file are
+    already merged, so new games are folded into the existing rows on the next update.
+
+    Each batch is first written to `positions.log` along with the index it leads to, then applied
+    to the shards. The rows in the log are final values, not increments, so a log left by an
+    interrupted update is simply applied again when the index is next opened.
+    """
+    def __init__(self, folder, shard_size=1_000_000, policy_width=64):
+        self.folder = folder
+        self.shard_size = shard_size
+        self.policy_width = policy_width
+
+        self._keys = np.zeros(0, dtype=np.uint64)
+        self._locations = np.zeros(0, dtype=np.int64)
+        self._sources = {}
+
+        os.makedirs(folder, exist_ok=True)
+        index_path = os.path.join(folder, INDEX_NAME)
+        if os.path.exists(index_path):
+            self._load(index_path)
+
+        log_path = os.path.join(folder, LOG_NAME)
+        if os.path.exists(log_path):
+            self._replay(log_path)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _load(self, index_path):
+        with h5py.File(index_path, "r") as h5_file:
+            if h5_file.attrs.get("format") != INDEX_FORMAT:
+                raise ValueError(f"{index_path} is not a position index.")
+            if h5_file.attrs["policy_width"] != self.policy_width or h5_file.attrs["shard_size"] != self.shard_size:
+                raise ValueError(
+                    f"{index_path} was built with shard_size={h5_file.attrs['shard_size']} "
+                    f"and policy_width={h5_file.attrs['policy_width']}."
+                )
+
+            self._keys = h5_file["keys"][:]
+            self._locations = h5_file["locations"][:]
+            sources = h5_file["sources"].asstr()[:]
+            self._sources = dict(zip(sources, h5_file["source_games"][:].tolist()))
+
+    def _replay(self, log_path):
+        print(f"Applying the batch left in {log_path} by an interrupted update")
+        self._load(log_path)
+        with h5py.File(log_path, "r") as h5_file:
+            rows = {name: data[:] for name, data in h5_file["rows"].items() if name != "locations"}
+            locations = h5_file["rows/locations"][:]
+
+        self._write_rows(locations, rows)
+        self.save()
+        os.remove(log_path)
+
+    def save(self):
+        self._write_index(os.path.join(self.folder, INDEX_NAME))
+
+    def _write_index(self, path, locations=None, rows=None):
+        # written aside and renamed, so an interrupted save leaves the previous file intact
+        with h5py.File(f"{path}.tmp", "w") as h5_file:
+            h5_file.attrs["format"] = INDEX_FORMAT
+            h5_file.attrs["shard_size"] = self.shard_size
+            h5_file.attrs["policy_width"] = self.policy_width
+            h5_file.create_dataset("keys", data=self._keys)
+            h5_file.create_dataset("locations", data=self._locations)
+            h5_file.create_dataset("sources", data=list(self._sources), dtype=h5py.string_dtype())
+            h5_file.create_dataset("source_games", data=np.array(list(self._sources.values()), dtype=np.int64))
+
+            if rows is not None:
+                h5_file.create_dataset("rows/locations", data=locations)
+                for name, data in rows.items():
+                    h5_file.create_dataset(f"rows/{name}", data=data)
+        os.replace(f"{path}.tmp", path)
+
+    def shard_paths(self):
+        num_shards = (len(self) + self.shard_size - 1) // self.shard_size
+        return [self._shard_path(shard) for shard in range(num_shards)]
+
+    def _shard_path(self, shard):
+        return os.path.join(self.folder, f"positions_{shard:05d}.h5")
+
+    def _open_shard(self, shard):
+        h5_file = h5py.File(self._shard_path(shard), "a")
+        if not is_dedup_shard(h5_file):
+            h5_file.attrs["format"] = DEDUP_FORMAT
+            width = self.policy_width
+
+            def create(name, shape, dtype, chunk_rows):
+                h5_file.create_dataset(
+                    name, shape=(0,) + shape, maxshape=(self.shard_size,) + shape, dtype=dtype,
+                    chunks=(min(chunk_rows, self.shard_size),) + shape, compression="gzip"
+                )
+
+            create("keys", (), np.uint64, 4096)
+            create("states", (PACKED_STATE_SIZE,), np.uint8, 1024)
+            create("values", (), np.float32, 4096)
+            create("counts", (), np.uint32, 4096)
+            create("policy_indices", (width,), np.uint16, 1024)
+            create("policy_probs", (width,), np.float32, 1024)
+        return h5_file
+
+    def _read_rows(self, locations):
+        count = len(locations)
+        rows = {
+            "states": np.zeros((count, PACKED_STATE_SIZE), dtype=np.uint8),
+            "values": np.zeros(count, dtype=np.float32),
+            "counts": np.zeros(count, dtype=np.uint32),
+            "policy_indices": np.zeros((count, self.policy_width), dtype=np.uint16),
+            "policy_probs": np.zeros((count, self.policy_width), dtype=np.float32),
+        }
+
+        shards = locations // self.shard_size
+        for shard in np.unique(shards):
+            selected = np.flatnonzero(shards == shard)
+            selected = selected[np.argsort(locations[selected])]
+            shard_rows = locations[selected] % self.shard_size
+
+            with h5py.File(self._shard_path(shard), "r") as h5_file:
+                for start, part in _blocks(shard_rows):
+                    for name, data in rows.items():
+                        block = h5_file[name][start:start + IO_BLOCK_ROWS]
+                        data[selected[part]] = block[shard_rows[part] - start]
+
+        return rows
+
+    def _write_rows(self, locations, rows):
+        shards = locations // self.shard_size
+        for shard in np.unique(shards):
+            selected = np.flatnonzero(shards == shard)
+            selected = selected[np.argsort(locations[selected])]
+            shard_rows = locations[selected] % self.shard_size
+
+            with self._open_shard(shard) as h5_file:
+                size = h5_file["keys"].shape[0]
+                if shard_rows[-1] >= size:
+                    size = int(shard_rows[-1]) + 1
+                    for name in rows:
+                        h5_file[name].resize(size, axis=0)
+
+                # blocks are read, updated and written back whole: whole compressed chunks change anyway
+                for start, part in _blocks(shard_rows):
+                    end = min(start + IO_BLOCK_ROWS, size)
+                    for name, data in rows.items():
+                        block = h5_file[name][start:end]
+                        block[shard_rows[part] - start] = data[selected[part]]
+                        h5_file[name][start:end] = block
+
+    def add_positions(self, keys, states, policies, values):
+        """
+        Merge a batch of positions (Zobrist keys, dense states and policies) into the shards and save
+        the index. Returns the number of new positions.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        if len(keys) == 0:
+            return 0
+        if not keys.all():
+            raise ValueError("Every position needs its Zobrist key, see legacy_keys for games stored without them.")
+
+        packed = pack_states(states)
+        policies = np.asarray(policies, dtype=np.float32).reshape(len(keys), -1)
+        values = np.asarray(values, dtype=np.float32).reshape(len(keys), -1)[:, 0]
+
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(unique_keys))
+        value_sums = np.bincount(inverse, values, minlength=len(unique_keys))
+
+        positions = np.searchsorted(self._keys, unique_keys)
+        found = positions < len(self._keys)
+        found[found] = self._keys[positions[found]] == unique_keys[found]
+
+        locations = np.empty(len(unique_keys), dtype=np.int64)
+        locations[found] = self._locations[positions[found]]
+        locations[~found] = len(self._keys) + np.arange(np.count_nonzero(~found))
+
+        rows, actions = np.nonzero(policies)
+        slots, weights = [inverse[rows]], [policies[rows, actions]]
+        actions = [actions]
+
+        # planes of known positions are kept, new ones take their first occurrence
+        unique_states = packed[first]
+        old_counts = np.zeros(len(unique_keys), dtype=np.int64)
+        old_values = np.zeros(len(unique_keys), dtype=np.float64)
+        if found.any():
+            # existing rows count with the weight of all the occurrences they already average
+            existing = self._read_rows(locations[found])
+            old_counts[found] = existing["counts"]
+            old_values[found] = existing["values"]
+            unique_states[found] = existing["states"]
+
+            found_slots = np.flatnonzero(found)
+            old_rows, old_columns = np.nonzero(existing["policy_probs"])
+            slots.append(found_slots[old_rows])
+            actions.append(existing["policy_indices"][old_rows, old_columns])
+            weights.append(existing["policy_probs"][old_rows, old_columns] * old_counts[found_slots[old_rows]])
+
+        policy_indices, policy_probs = top_entries(
+            np.concatenate(slots), np.concatenate(actions).astype(np.int64), np.concatenate(weights),
+            len(unique_keys), self.policy_width
+        )
+        total_counts = old_counts + counts
+
+        new = ~found
+        rows = {
+            "keys": unique_keys,
+            "states": unique_states,
+            "values": ((old_values * old_counts + value_sums) / total_counts).astype(np.float32),
+            "counts": total_counts.astype(np.uint32),
+            "policy_indices": policy_indices,
+            "policy_probs": policy_probs,
+        }
+
+        # unique_keys is sorted, so inserting at the search positions keeps the index sorted
+        self._keys = np.insert(self._keys, positions[new], unique_keys[new])
+        self._locations = np.insert(self._locations, positions[new], locations[new])
+
+        # once the log is in place the batch counts as merged, whatever happens to the shards next
+        log_path = os.path.join(self.folder, LOG_NAME)
+        self._write_index(log_path, locations, rows)
+        self._write_rows(locations, rows)
+        self.save()
+        os.remove(log_path)
+        return int(np.count_nonzero(new))
+
+    def update(self, games_path, batch_positions=100_000):
+        """
+        Merge the games of `games_path` (a .h5 file or a folder of them) not merged yet.
+        Returns (positions read, new distinct positions).
+        """
+        if os.path.isdir(games_path):
+            h5_files = sorted(os.path.join(games_path, file) for file in os.listdir(games_path) if file.endswith(".h5"))
+        else:
+            h5_files = [games_path]
+
+        batch, done_sources = [], {}
+        read, added = 0, 0
+
+        def flush():
+            nonlocal added
+            # the sources go into the same log as the batch, so its games are never merged twice
+            self._sources.update(done_sources)
+            done_sources.clear()
+            if batch:
+                added += self.add_positions(*(np.concatenate(column) for column in zip(*batch)))
+                batch.clear()
+            else:
+                self.save()
+
+        for file in h5_files:
+            source = os.path.abspath(file)
+            merged_games = self._sources.get(source, 0)
+            games = merged_games
+
+            for game_index, (states, policies, values, keys) in enumerate(read_games(file)):
+                if game_index < merged_games:
+                    continue
+
+                if not keys.any():
+                    keys = legacy_keys(states)
+                batch.append((keys, states, policies, values))
+                read += len(states)
+                games = game_index + 1
+
+                if sum(len(item[0]) for item in batch) >= batch_positions:
+                    # the games of this file read so far are merged with this batch
+                    done_sources[source] = games
+                    flush()
+
+            if games != merged_games:
+                done_sources[source] = games
+
+        flush()
+        return read, added
+
+def compact_games(games_path, output_path, shard_size=1_000_000, policy_width=64, batch_positions=100_000):
+    started = time.perf_counter()
+    index = PositionIndex(output_path, shard_size, policy_width)
+    known = len(index)
+
+    read, added = index.update(games_path, batch_positions)
+
+    elapsed = time.perf_counter() - started
+    print(f"Merged {read} positions into {output_path}: {added} new, {read - added} duplicates, "
+          f"{len(index)} distinct positions (was {known}) in {elapsed:.1f}s")
+    return read, added
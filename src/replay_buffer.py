@@ -0,0 +1,68 @@
+import threading
+import numpy as np
+
+from game_records import ACTION_SIZE, PACKED_STATE_SIZE, pack_states, unpack_states
+
+class ReplayBuffer:
+    """
+    Sliding window over the most recent `capacity` positions, overwritten oldest first.
+
+    States are kept bit-packed and policies as their `policy_width` largest entries
+    (renormalized), so a million positions fit in a few hundred MB. Adding and sampling
+    can happen from different threads.
+    """
+    def __init__(self, capacity=1_000_000, policy_width=64, seed=None):
+        self.capacity = capacity
+        self.policy_width = policy_width
+        self.positions_added = 0
+
+        self._states = np.zeros((capacity, PACKED_STATE_SIZE), dtype=np.uint8)
+        self._policy_indices = np.zeros((capacity, policy_width), dtype=np.uint16)
+        self._policy_probs = np.zeros((capacity, policy_width), dtype=np.float16)
+        self._values = np.zeros(capacity, dtype=np.float32)
+
+        self._lock = threading.Lock()
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self):
+        return min(self.positions_added, self.capacity)
+
+    def add(self, states, policies, values):
+        count = len(states)
+        if count == 0:
+            return
+
+        policies = np.asarray(policies, dtype=np.float32).reshape(count, ACTION_SIZE)
+        top = np.argpartition(-policies, self.policy_width - 1, axis=1)[:, :self.policy_width]
+        probs = np.take_along_axis(policies, top, axis=1)
+        totals = probs.sum(axis=1, keepdims=True)
+        probs = np.divide(probs, totals, out=np.zeros_like(probs), where=totals > 0)
+
+        packed = pack_states(states)
+        values = np.asarray(values, dtype=np.float32).reshape(count, -1)[:, 0]
+
+        with self._lock:
+            rows = (self.positions_added + np.arange(count)) % self.capacity
+            self._states[rows] = packed
+            self._policy_indices[rows] = top
+            self._policy_probs[rows] = probs
+            self._values[rows] = values
+            self.positions_added += count
+
+    def add_games(self, games):
+        for states, policies, values, _ in games:
+            self.add(states, policies, values)
+
+    def sample(self, batch_size):
+        with self._lock:
+            if len(self) == 0:
+                raise ValueError("Cannot sample from an empty replay buffer.")
+            rows = self._rng.integers(0, len(self), size=batch_size)
+            packed = self._states[rows]
+            indices = self._policy_indices[rows]
+            probs = self._policy_probs[rows].astype(np.float32)
+            values = self._values[rows]
+
+        policies = np.zeros((batch_size, ACTION_SIZE), dtype=np.float32)
+        np.put_along_axis(policies, indices.astype(np.int64), probs, axis=1)
+        return unpack_states(packed), policies, values
@@ -0,0 +1,15 @@
+from position_analysis import analyze_positions
+
+def analyze(input_path, output_path=None, model_path=None, batch_size=256, simulations=0, search_batch_size=8,
+            num_workers=None, max_nodes=None):
+    model_path = model_path if model_path else "../gaming_model.keras"
+    output_path = output_path if output_path else "../analysis.h5"
+
+    return analyze_positions(
+        input_path, output_path, model_path,
+        batch_size=batch_size,
+        simulations=simulations,
+        search_batch_size=search_batch_size,
+        num_workers=num_workers,
+        max_nodes=max_nodes
+    )
@@ -0,0 +1,30 @@
+import json
+
+from arena import run_arena
+
+def arena(candidate_path, baseline_path=None, num_games=400, simulations=100, openings_per_task=8, leaves_per_game=8,
+          num_workers=None, opening_plies=4, max_plies=400, elo0=0, elo1=10, alpha=0.05, beta=0.05, seed=None,
+          output_path=None):
+    baseline_path = baseline_path if baseline_path else "../gaming_model.keras"
+
+    summary = run_arena(
+        candidate_path, baseline_path,
+        num_games=num_games,
+        simulations=simulations,
+        openings_per_task=openings_per_task,
+        leaves_per_game=leaves_per_game,
+        num_workers=num_workers,
+        opening_plies=opening_plies,
+        max_plies=max_plies,
+        elo0=elo0,
+        elo1=elo1,
+        alpha=alpha,
+        beta=beta,
+        seed=seed
+    )
+
+    if output_path:
+        with open(output_path, "w") as output_file:
+            json.dump(dict(summary, candidate=candidate_path, baseline=baseline_path), output_file, indent=2)
+
+    return summary
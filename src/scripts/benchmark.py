@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import shutil
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+
+import chess
+import numpy as np
+
+from engine import ChessEngine
+from mcts import MCTS
+from array_mcts import ArrayMCTS
+from chess_trainer import ChessTrainer
+from model.stub_model import STUB_MODEL_PATH, StubModel
+
+BENCHMARK_FENS = [
+    chess.STARTING_FEN,
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP2BPPP/R2QKB1R w KQ - 0 8",
+    "r2q1rk1/1b2bppp/p1n1pn2/1p6/3P4/P1NBPN2/1P1B1PPP/R2Q1RK1 w - - 1 13",
+    "2r2rk1/pp1b1ppp/4pn2/q2p4/3P4/P1PB1N2/4QPPP/R4RK1 b - - 2 17",
+    "8/5pk1/6p1/3P4/1p3P2/1P4P1/6K1/8 w - - 0 45",
+    "4k3/1P6/8/8/8/8/6p1/4K3 w - - 0 60",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+]
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _best_time(func, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _build_model(model_name, model_folder):
+    if model_name == "stub":
+        return StubModel(), STUB_MODEL_PATH
+
+    import tensorflow as tf
+    from model.gaming_model import GamingRLModel
+    from model.local_model_saver import LocalModelSaver
+
+    # fixed seed so every run benchmarks the same weights; saved for the self-play workers
+    tf.keras.utils.set_random_seed(0)
+    model = GamingRLModel(LocalModelSaver("placeholder"))
+    model_path = os.path.join(model_folder, "benchmark_model.keras")
+    model.save_to(model_path)
+    return model, model_path
+
+def benchmark_encoding(engine, boards, repeats):
+    single = _best_time(lambda: [engine.board_to_tensor(board) for board in boards], repeats)
+    batch = _best_time(lambda: engine.encode_batch(boards), repeats)
+
+    return {
+        "board_to_tensor_positions_per_sec": len(boards) / single,
+        "encode_batch_positions_per_sec": len(boards) / batch,
+    }
+
+def benchmark_valid_moves(game, boards, repeats):
+    dense = _best_time(lambda: [game.get_valid_moves(board) for board in boards], repeats)
+    sparse = _best_time(lambda: [game.get_legal_indices(board) for board in boards], repeats)
+
+    return {
+        "get_valid_moves_per_sec": len(boards) / dense,
+        "get_legal_indices_per_sec": len(boards) / sparse,
+    }
+
+def benchmark_search(engine, game, boards, simulations, batch_sizes, repeats):
+    results = {}
+
+    searches = (
+        ("nodes", lambda: MCTS(engine, game)),
+        ("replay", lambda: MCTS(engine, game, path_replay=True)),
+        ("array", lambda: ArrayMCTS(engine, game)),
+    )
+
+    for name, build_search in searches:
+        for batch_size in batch_sizes:
+            def run():
+                for board in boards:
+                    build_search().search(board, simulations, 1.41, batch_size)
+
+            elapsed = _best_time(run, repeats)
+            results[f"{name}_batch_{batch_size}_simulations_per_sec"] = simulations * len(boards) / elapsed
+
+    return results
+
+def benchmark_self_play(model_path, num_games, max_simulations, batch_size):
+    trainer = ChessTrainer(None)
+    save_folder = tempfile.mkdtemp()
+
+    try:
+        start = time.perf_counter()
+        trainer.generate_games(save_folder, num_games, max_simulations, batch_size, model_path=model_path, seed=0)
+        elapsed = time.perf_counter() - start
+    finally:
+        trainer.close()
+        shutil.rmtree(save_folder, ignore_errors=True)
+
+    return {
+        "games": num_games,
+        "seconds": elapsed,
+        "games_per_hour": num_games * 3600 / elapsed,
+    }
+
+def benchmark(model_name="stub", output_path=None, simulations=200, batch_size=8, repeats=3,
+              num_games=0, max_simulations=50):
+    boards = [chess.Board(fen) for fen in BENCHMARK_FENS]
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "model": model_name,
+            "positions": len(boards),
+            "simulations": simulations,
+            "batch_size": batch_size,
+            "repeats": repeats,
+        },
+    }
+
+    # the saved model is only needed until the self-play workers have loaded it
+    with tempfile.TemporaryDirectory() as model_folder:
+        model, model_path = _build_model(model_name, model_folder)
+        engine = ChessEngine(model)
+        game = engine.game
+
+        print("Benchmarking encoding...")
+        results["encoding"] = benchmark_encoding(engine, boards, repeats)
+        print("Benchmarking move generation...")
+        results["valid_moves"] = benchmark_valid_moves(game, boards, repeats)
+        print("Benchmarking search...")
+        results["search"] = benchmark_search(engine, game, boards, simulations, sorted({1, batch_size}), repeats)
+
+        if num_games > 0:
+            print("Benchmarking self-play...")
+            results["self_play"] = benchmark_self_play(model_path, num_games, max_simulations, batch_size)
+
+    output = json.dumps(results, indent=2)
+    print(output)
+
+    if output_path:
+        with open(output_path, "w") as output_file:
+            output_file.write(output + "\n")
+        print(f"Benchmark results saved in: {output_path}")
+
+    return results
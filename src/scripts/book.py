@@ -0,0 +1,7 @@
+from opening_book import build_book
+
+def book(games_data_path=None, book_path=None, max_plies=20, min_count=20, width=16):
+    games_data_path = games_data_path if games_data_path else "../games_data"
+    book_path = book_path if book_path else "../opening_book.bin"
+
+    return build_book(games_data_path, book_path, max_plies=max_plies, min_count=min_count, width=width)
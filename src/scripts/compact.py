@@ -0,0 +1,7 @@
+from position_index import compact_games
+
+def compact(games_data_path=None, output_path=None, shard_size=1_000_000, policy_width=64):
+    games_data_path = games_data_path if games_data_path else "../games_data"
+    output_path = output_path if output_path else "../positions"
+
+    return compact_games(games_data_path, output_path, shard_size=shard_size, policy_width=policy_width)
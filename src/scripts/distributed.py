@@ -0,0 +1,40 @@
+from self_play_queue import SelfPlayCoordinator, SelfPlayWorker
+from evaluation_cache import EvaluationCache
+
+def coordinate(queue_path, games_data_path=None, model_path=None, num_games=10, max_simulations=100, batch_size=1,
+               move_time_ms=None, lease_seconds=600, max_attempts=3, poll_interval=1.0, stop_workers=False):
+    games_data_path = games_data_path if games_data_path else "../games_data"
+
+    coordinator = SelfPlayCoordinator(queue_path, lease_seconds, max_attempts)
+    if model_path:
+        coordinator.publish_model(model_path)
+    elif coordinator.queue.current_model_version() is None:
+        raise ValueError("No model has been published to the queue yet, pass a model path.")
+
+    task_ids = coordinator.submit_games(
+        num_games, max_simulations, batch_size,
+        move_time=move_time_ms / 1000 if move_time_ms else None
+    )
+    print(f"Submitted {len(task_ids)} games to {queue_path}")
+
+    try:
+        return coordinator.run(task_ids, games_data_path, poll_interval)
+    finally:
+        if stop_workers:
+            coordinator.queue.request_stop()
+
+def publish(queue_path, model_path):
+    return SelfPlayCoordinator(queue_path).publish_model(model_path)
+
+def work(queue_path, worker_id=None, array_tree=False, cache_mb=0, path_replay=False, poll_interval=1.0,
+         max_tasks=None, idle_timeout=None):
+    engine_options = {
+        "array_tree": array_tree,
+        "path_replay": path_replay,
+        "cache": EvaluationCache(cache_mb) if cache_mb > 0 else None,
+    }
+
+    worker = SelfPlayWorker(queue_path, worker_id, engine_options)
+    played = worker.run(poll_interval, max_tasks, idle_timeout)
+    print(f"Worker {worker.worker_id} played {played} games")
+    return played
@@ -1,17 +1,69 @@
+import os
+import shutil
+import tempfile
+
 from model.gaming_model import GamingRLModel
 from chess_trainer import ChessTrainer
-from engine import ChessEngine
 from model.local_model_saver import LocalModelSaver
+from evaluation_cache import EvaluationCache
+from opening_book import OpeningBook
+from engine import check_search_options
 
-def generate(model_path=None, games_data_path=None, num_games=10, max_simulations=100):
+def generate(model_path=None, games_data_path=None, num_games=10, max_simulations=100, batch_size=1,
+             inference_server=False, max_batch_size=256, max_wait_ms=2, array_tree=False,
+             transpositions=False, cache_mb=0, telemetry_path=None, path_replay=False,
+             widening=0, move_time_ms=None, book_path=None, book_plies=12, book_temperature=1.0, max_nodes=None):
     model_path = model_path if model_path else "../gaming_model.keras"
     games_data_path = games_data_path if games_data_path else "../games_data"
-  
-    model_saver = LocalModelSaver("placeholder")
-    model = GamingRLModel(model_saver, model_path)
-    engine = ChessEngine(model)
-    trainer = ChessTrainer(engine)
 
-    results = trainer.generate_games("../games_data", num_games, max_simulations)
+    # checked here, an engine failing in every worker's initializer only shows up as a broken pool
+    check_search_options(array_tree, widening, max_nodes)
+
+    engine_options = {
+        "array_tree": array_tree,
+        "transpositions": transpositions,
+        "path_replay": path_replay,
+        "widening": widening,
+        "cache": EvaluationCache(cache_mb) if cache_mb > 0 else None,
+        "max_nodes": max_nodes,
+        # only the path is sent to the workers, each maps the same file
+        "book": OpeningBook(book_path) if book_path else None,
+        "book_plies": book_plies,
+        "book_temperature": book_temperature,
+    }
+
+    model_folder = None
+    if not os.path.exists(model_path):
+        # all workers have to play with the same weights, so a fresh model is written once for them to load
+        model_folder = tempfile.mkdtemp()
+        model_path = os.path.join(model_folder, "initial_model.keras")
+        GamingRLModel(LocalModelSaver("placeholder")).save_to(model_path)
+
+    try:
+        server = None
+        if inference_server:
+            from inference_server import InferenceServer
+
+            # the model only lives in the server process; workers just hold a client
+            server = InferenceServer(model_path, os.cpu_count(), max_batch_size, max_wait_ms / 1000)
+            server.start()
+
+        trainer = ChessTrainer(None)
+        try:
+            results = trainer.generate_games(
+                "../games_data", num_games, max_simulations, batch_size,
+                inference_server=server,
+                engine_options=engine_options,
+                model_path=model_path,
+                telemetry_path=telemetry_path,
+                move_time=move_time_ms / 1000 if move_time_ms else None
+            )
+        finally:
+            trainer.close()
+            if server is not None:
+                server.stop()
+    finally:
+        if model_folder is not None:
+            shutil.rmtree(model_folder, ignore_errors=True)
 
-    return results
\ No newline at end of file
+    return results
@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+from model.gaming_model import GamingRLModel
+from model.local_model_saver import LocalModelSaver
+from continuous_training import ContinuousTrainer
+from replay_buffer import ReplayBuffer
+from evaluation_cache import EvaluationCache
+
+def loop(model_path=None, games_data_path=None, checkpoint_path=None, queue_path=None, num_workers=None,
+         max_simulations=100, search_batch_size=1, move_time_ms=None, array_tree=False, cache_mb=0,
+         buffer_size=1_000_000, train_batch_size=64, min_positions=10000, checkpoint_every=500,
+         max_sample_ratio=8, max_steps=None, max_games=None, duration=None):
+    model_path = model_path if model_path else "../gaming_model.keras"
+    games_data_path = games_data_path if games_data_path else "../games_data"
+    checkpoint_path = checkpoint_path if checkpoint_path else "../checkpoints"
+    # a local queue unless remote workers are meant to join through a shared one
+    queue_path = queue_path if queue_path else tempfile.mkdtemp(prefix="self_play_queue_")
+
+    model = GamingRLModel(LocalModelSaver(os.path.join(checkpoint_path, "final_model.keras")), model_path)
+    trainer = ContinuousTrainer(model, ReplayBuffer(buffer_size), queue_path, games_data_path, checkpoint_path)
+
+    engine_options = {
+        "array_tree": array_tree,
+        "cache": EvaluationCache(cache_mb) if cache_mb > 0 else None,
+    }
+
+    return trainer.run(
+        num_workers=num_workers,
+        engine_options=engine_options,
+        max_simulations=max_simulations,
+        search_batch_size=search_batch_size,
+        move_time=move_time_ms / 1000 if move_time_ms else None,
+        train_batch_size=train_batch_size,
+        min_positions=min_positions,
+        checkpoint_every=checkpoint_every,
+        max_sample_ratio=max_sample_ratio,
+        max_steps=max_steps,
+        max_games=max_games,
+        duration=duration
+    )
@@ -5,8 +5,10 @@ from dotenv import load_dotenv
 from model.gaming_model import GamingRLModel
 from chess_trainer import ChessTrainer
 from engine import ChessEngine
+from games_dataset import build_games_dataset
 
-def train(model_path=None, games_data_path=None, delete_games=False, cloud_save=False):
+def train(model_path=None, games_data_path=None, delete_games=False, cloud_save=False, batch_size=64, shuffle_buffer=10000,
+          cloud_path=None):
     load_dotenv() 
 
     model_path = model_path if model_path else "../gaming_model.keras"
@@ -15,7 +17,13 @@ def train(model_path=None, games_data_path=None, delete_games=False, cloud_save=
     timestamp = datetime.now().strftime("%Y-%m-%dT%H-%M-%S")
     filename = f"gaming_model_{timestamp}.keras"
     model_saver = None
-    if cloud_save:
+    if cloud_path:
+        from file_system_gateway import FileSystemGateway
+        from model.cloud_model_saver import CloudModelSaver
+
+        # the cloud upload path against a local directory, without credentials
+        model_saver = CloudModelSaver(filename, FileSystemGateway(cloud_path))
+    elif cloud_save:
         from backblaze_gateway import BackblazeGateway  
         from model.cloud_model_saver import CloudModelSaver
 
@@ -36,13 +44,15 @@ def train(model_path=None, games_data_path=None, delete_games=False, cloud_save=
     engine = ChessEngine(model)
     trainer = ChessTrainer(engine)
 
-    results = trainer.load_games(games_data_path)
-
-    flat_results = [step for game in results for step in game]
+    dataset = build_games_dataset(games_data_path, batch_size, shuffle_buffer)
 
     def callback():
         if delete_games:
             print("Deleting used games...")
             trainer.delete_games(games_data_path)
 
-    model.train(flat_results, callback)
+    try:
+        model.train_dataset(dataset, callback)
+    finally:
+        # uploads run in the background, the last one has to finish before the process exits
+        model_saver.close()
@@ -0,0 +1,23 @@
+import sys
+import contextlib
+
+from engine import ChessEngine
+from evaluation_cache import EvaluationCache
+from model.loader import load_model
+from uci import UCIEngine
+
+def uci(model_path=None, batch_size=1, cache_mb=0, path_replay=False, max_nodes=None):
+    model_path = model_path if model_path else "../gaming_model.keras"
+
+    # stdout is the protocol channel, so the model loading messages go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        model = load_model(model_path, tuple(sorted({1, batch_size})))
+
+    engine = ChessEngine(
+        model,
+        reuse_tree=True,
+        cache=EvaluationCache(cache_mb) if cache_mb > 0 else None,
+        path_replay=path_replay,
+        max_nodes=max_nodes
+    )
+    UCIEngine(engine, batch_size=batch_size).run()
@@ -0,0 +1,389 @@
+import os
+import json
+import time
+import uuid
+import random
+import shutil
+import socket
+import threading
+
+import chess
+import numpy as np
+
+from game_records import GameRecordWriter
+from model.stub_model import STUB_MODEL_PATH
+
+STUB_MODEL_VERSION = "stub"
+
+def _write_json(path, data):
+    # written aside and renamed, so readers on other hosts never see a partial file
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "w") as json_file:
+        json.dump(data, json_file)
+    os.replace(temp_path, path)
+
+def _read_json(path):
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+class WorkQueue:
+    """
+    Self-play task queue in a directory shared by every host (e.g. over NFS).
+
+    A task moves pending/ -> claimed/ -> done/ (or failed/) through renames, which are atomic,
+    so exactly one worker wins each claim. Task files are named after the task and its attempt,
+    so a retried task is claimed under a new path and the worker that lost the earlier claim
+    can neither renew nor complete it. The claim file records the worker and host holding it
+    and a heartbeat counter the worker bumps while playing. The coordinator notes on its own clock
+    when it last saw the counter change, so hosts with skewed clocks never expire live claims;
+    a claim whose counter stands still for longer than the lease is treated as failed and retried.
+    Game files are written to games/ and the models workers play with are published in models/.
+    """
+    STATES = ("pending", "claimed", "done", "failed", "dead", "collected")
+
+    def __init__(self, root):
+        self.root = root
+        # claim name -> (heartbeats, time.monotonic() when that count was first seen)
+        self._lease_seen = {}
+        for directory in self.STATES + ("games", "models"):
+            os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+    def _path(self, state, name):
+        return os.path.join(self.root, state, name)
+
+    def _list(self, state):
+        return sorted(name for name in os.listdir(os.path.join(self.root, state)) if name.endswith(".json"))
+
+    def counts(self):
+        return {state: len(self._list(state)) for state in self.STATES}
+
+    @staticmethod
+    def _task_name(task):
+        return f"{task['task_id']}.{task['attempts']}.json"
+
+    def submit(self, task):
+        task = dict(task, task_id=task.get("task_id") or uuid.uuid4().hex, attempts=task.get("attempts", 0))
+        _write_json(self._path("pending", self._task_name(task)), task)
+        return task["task_id"]
+
+    def claim(self, worker_id):
+        for name in self._list("pending"):
+            pending_path = self._path("pending", name)
+            claim_path = self._path("claimed", name)
+            try:
+                os.rename(pending_path, claim_path)
+            except FileNotFoundError:
+                # another worker got there first
+                continue
+
+            task = _read_json(claim_path)
+            if task is None:
+                continue
+            task["worker_id"] = worker_id
+            task["lease"] = {"host": socket.gethostname(), "worker_id": worker_id, "heartbeats": 0, "renewed": time.time()}
+            if not self._write_claim(claim_path, task):
+                continue
+            return task, claim_path
+
+        return None
+
+    def _write_claim(self, claim_path, task):
+        # rewritten in place: a new file renamed over the claim would bring it back
+        # if the coordinator expired it in the meantime
+        try:
+            with open(claim_path, "r+") as claim_file:
+                json.dump(task, claim_file)
+                claim_file.truncate()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def heartbeat(self, claim_path, task):
+        """Renew the lease of a claim. Returns False once the claim was taken away."""
+        task["lease"] = dict(task["lease"], heartbeats=task["lease"]["heartbeats"] + 1, renewed=time.time())
+        return self._write_claim(claim_path, task)
+
+    def complete(self, claim_path, task, games_path):
+        task_id = task["task_id"]
+        result_path = self._path("games", f"{task_id}.h5")
+        partial_path = self._path("done", f"{task_id}.json.partial")
+
+        try:
+            # the claim is taken away first, so a worker whose lease expired cannot report,
+            # even once the task was claimed again under its next attempt
+            os.rename(claim_path, partial_path)
+        except FileNotFoundError:
+            os.remove(games_path)
+            return False
+
+        os.replace(games_path, result_path)
+        _write_json(self._path("done", f"{task_id}.json"), dict(task, games_path=result_path, finished=time.time()))
+        os.remove(partial_path)
+        return True
+
+    def fail(self, claim_path, task, error):
+        failed_path = self._path("failed", os.path.basename(claim_path))
+        try:
+            os.rename(claim_path, failed_path)
+        except FileNotFoundError:
+            return False
+
+        _write_json(failed_path, dict(task, error=error))
+        return True
+
+    def requeue_expired(self, lease_seconds):
+        """
+        Fail the claims whose heartbeat counter has not changed for `lease_seconds`.
+        Only this process's monotonic clock is compared, never the time written by a worker host;
+        a claim seen for the first time (e.g. after a coordinator restart) gets a full lease.
+        """
+        requeued = []
+        now = time.monotonic()
+        claimed = self._list("claimed")
+
+        for name in claimed:
+            claim_path = self._path("claimed", name)
+            task = _read_json(claim_path)
+            if task is None:
+                # gone, or caught halfway through a heartbeat
+                continue
+
+            heartbeats = task.get("lease", {}).get("heartbeats")
+            seen = self._lease_seen.get(name)
+            if seen is None or seen[0] != heartbeats:
+                self._lease_seen[name] = (heartbeats, now)
+                continue
+            if now - seen[1] <= lease_seconds:
+                continue
+
+            try:
+                os.rename(claim_path, self._path("failed", name))
+            except FileNotFoundError:
+                continue
+
+            lease = task.get("lease", {})
+            _write_json(self._path("failed", name),
+                        dict(task, error=f"lease expired (worker {lease.get('worker_id')} on {lease.get('host')})"))
+            requeued.append(task["task_id"])
+
+        self._lease_seen = {name: seen for name, seen in self._lease_seen.items() if name in claimed}
+        return requeued
+
+    def retry_failed(self, max_attempts):
+        retried, dead = [], []
+
+        for name in self._list("failed"):
+            failed_path = self._path("failed", name)
+            task = _read_json(failed_path)
+            if task is None:
+                continue
+
+            task["attempts"] = task.get("attempts", 0) + 1
+            task.pop("worker_id", None)
+            task.pop("lease", None)
+            if task["attempts"] < max_attempts:
+                _write_json(self._path("pending", self._task_name(task)), task)
+                retried.append(task["task_id"])
+            else:
+                _write_json(self._path("dead", self._task_name(task)), task)
+                dead.append(task["task_id"])
+            os.remove(failed_path)
+
+        return retried, dead
+
+    def finished(self):
+        return [task for task in (_read_json(self._path("done", name)) for name in self._list("done")) if task]
+
+    def mark_collected(self, task):
+        os.replace(self._path("done", f"{task['task_id']}.json"), self._path("collected", f"{task['task_id']}.json"))
+
+    def publish_model(self, model_path):
+        """Make `model_path` the model played by every task claimed from now on. Returns its version."""
+        if model_path == STUB_MODEL_PATH:
+            version = STUB_MODEL_VERSION
+        else:
+            version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            target = self.model_path(version)
+            shutil.copyfile(model_path, f"{target}.tmp")
+            os.replace(f"{target}.tmp", target)
+
+        _write_json(os.path.join(self.root, "models", "current.json"), {"version": version, "published": time.time()})
+        return version
+
+    def current_model_version(self):
+        current = _read_json(os.path.join(self.root, "models", "current.json"))
+        return current["version"] if current else None
+
+    def model_path(self, version):
+        if version == STUB_MODEL_VERSION:
+            return STUB_MODEL_PATH
+        return os.path.join(self.root, "models", f"{version}.keras")
+
+    def request_stop(self):
+        open(os.path.join(self.root, "stop"), "w").close()
+
+    def clear_stop(self):
+        if self.stop_requested():
+            os.remove(os.path.join(self.root, "stop"))
+
+    def stop_requested(self):
+        return os.path.exists(os.path.join(self.root, "stop"))
+
+class SelfPlayCoordinator:
+    def __init__(self, queue_root, lease_seconds=600, max_attempts=3):
+        self.queue = WorkQueue(queue_root)
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+
+    def publish_model(self, model_path):
+        version = self.queue.publish_model(model_path)
+        print(f"Published model version {version}")
+        return version
+
+    def submit_games(self, num_games, max_simulations=100, batch_size=1, move_time=None, seed=None,
+                     model_version=None):
+        # without a pinned version a task is played with whatever model is current when it is claimed
+        rng = random.Random(seed)
+        return [
+            self.queue.submit({
+                "seed": rng.getrandbits(32),
+                "fen": chess.STARTING_FEN,
+                "max_simulations": max_simulations,
+                "batch_size": batch_size,
+                "move_time": move_time,
+                "model_version": model_version,
+            })
+            for _ in range(num_games)
+        ]
+
+    def poll(self, save_folder):
+        """One round of bookkeeping: recover expired and failed tasks, collect finished games."""
+        for task_id in self.queue.requeue_expired(self._lease_seconds):
+            print(f"Task {task_id} lost its worker, retrying")
+
+        retried, dead = self.queue.retry_failed(self._max_attempts)
+        for task_id in dead:
+            print(f"Task {task_id} failed {self._max_attempts} times, giving up")
+
+        collected = []
+        for task in self.queue.finished():
+            target = os.path.join(save_folder, os.path.basename(task["games_path"]))
+            shutil.move(task["games_path"], target)
+            self.queue.mark_collected(task)
+            collected.append(task)
+
+        return collected, dead
+
+    def run(self, task_ids, save_folder, poll_interval=1.0, timeout=None):
+        os.makedirs(save_folder, exist_ok=True)
+        remaining = set(task_ids)
+        num_collected = 0
+        started = time.time()
+
+        while remaining:
+            collected, dead = self.poll(save_folder)
+            for task in collected:
+                remaining.discard(task["task_id"])
+                num_collected += 1
+                print(f"Collected game {task['task_id']} ({task['plies']} plies, model {task['model_version']}, "
+                      f"worker {task['worker_id']}), {len(remaining)} left")
+            remaining.difference_update(dead)
+
+            if timeout is not None and time.time() - started > timeout:
+                print(f"Timed out with {len(remaining)} tasks left")
+                break
+            if remaining:
+                time.sleep(poll_interval)
+
+        return num_collected
+
+class SelfPlayWorker:
+    def __init__(self, queue_root, worker_id=None, engine_options=None, heartbeat_seconds=10):
+        self.queue = WorkQueue(queue_root)
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._engine_options = engine_options or {}
+        self._heartbeat_seconds = heartbeat_seconds
+        self._model_version = None
+        self._trainer = None
+
+    def _trainer_for(self, version):
+        if version != self._model_version:
+            from chess_trainer import ChessTrainer
+            from engine import ChessEngine
+            from model.loader import load_model
+
+            # hot swap: the previous model is dropped once the new one is loaded,
+            # and evaluations cached from it are no longer valid
+            model = load_model(self.queue.model_path(version))
+            if self._engine_options.get("cache") is not None:
+                self._engine_options["cache"].clear()
+            self._trainer = ChessTrainer(ChessEngine(model, **self._engine_options))
+            self._model_version = version
+            print(f"Worker {self.worker_id} playing with model {version}")
+
+        return self._trainer
+
+    def run(self, poll_interval=1.0, max_tasks=None, idle_timeout=None):
+        played = 0
+        idle_since = time.time()
+
+        while max_tasks is None or played < max_tasks:
+            if self.queue.stop_requested():
+                break
+
+            claimed = self.queue.claim(self.worker_id)
+            if claimed is None:
+                if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            self.run_task(*claimed)
+            played += 1
+            idle_since = time.time()
+
+        return played
+
+    def run_task(self, task, claim_path):
+        stop_heartbeat = threading.Event()
+
+        def heartbeat():
+            while not stop_heartbeat.wait(self._heartbeat_seconds):
+                if not self.queue.heartbeat(claim_path, task):
+                    return
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+
+        try:
+            version = task.get("model_version") or self.queue.current_model_version()
+            if version is None:
+                raise ValueError("No model has been published to the queue.")
+            trainer = self._trainer_for(version)
+
+            random.seed(task["seed"])
+            np.random.seed(task["seed"])
+            game_data = trainer.play_game(
+                chess.Board(task["fen"]), task["max_simulations"], task["batch_size"], move_time=task.get("move_time")
+            )
+
+            games_path = os.path.join(self.queue.root, "games", f"{task['task_id']}.{self.worker_id}.tmp")
+            with GameRecordWriter(games_path) as writer:
+                writer.append_game(game_data)
+        except Exception as e:
+            stop_heartbeat.set()
+            print(f"Worker {self.worker_id} failed task {task['task_id']}: {e}")
+            self.queue.fail(claim_path, task, repr(e))
+            return False
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+        return self.queue.complete(claim_path, dict(task, model_version=version, plies=len(game_data)), games_path)
+
+def run_local_worker(queue_root, worker_id=None, engine_options=None, poll_interval=1.0):
+    # process entry point for workers started by the host that also coordinates
+    SelfPlayWorker(queue_root, worker_id, engine_options).run(poll_interval)
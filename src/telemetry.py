@@ -0,0 +1,150 @@
+import json
+import time
+from collections import defaultdict
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+def _null_phase(name):
+    return _NULL_PHASE
+
+class _Phase:
+    __slots__ = ("_stats", "_name", "_started")
+
+    def __init__(self, stats, name):
+        self._stats = stats
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._stats.add_time(self._name, time.perf_counter() - self._started)
+        return False
+
+class SearchStats:
+    """
+    Cumulative phase timers and counters of a search.
+
+    Phases nest: `select` includes `board_copy`, and `evaluate` includes `network`.
+    """
+    def __init__(self):
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds):
+        self.times[name] += seconds
+        self.counts[f"{name}_calls"] += 1
+
+    def count(self, name, amount=1):
+        self.counts[name] += amount
+
+    def snapshot(self):
+        return {"times": dict(self.times), "counts": dict(self.counts)}
+
+    def reset(self):
+        self.times.clear()
+        self.counts.clear()
+
+def phase_timer(stats):
+    # with telemetry disabled every phase is the same shared no-op context manager
+    return stats.phase if stats is not None else _null_phase
+
+def _difference(after, before):
+    return {key: value - before.get(key, 0) for key, value in after.items()}
+
+class GameTelemetry:
+    def __init__(self, engine, stats):
+        self._engine = engine
+        self._stats = stats
+        self._started = time.perf_counter()
+        self._last = stats.snapshot()
+        self._last_cache = engine.cache_stats()
+
+        self.moves = []
+        self.game = None
+
+    def record_move(self, board, move, simulations, elapsed):
+        snapshot = self._stats.snapshot()
+        times = _difference(snapshot["times"], self._last["times"])
+        counts = _difference(snapshot["counts"], self._last["counts"])
+        self._last = snapshot
+
+        record = {
+            "event": "move",
+            "ply": board.ply(),
+            "move": move.uci(),
+            "simulations": simulations,
+            "seconds": elapsed,
+            "nodes_created": counts.get("nodes_created", 0),
+            # nodes created undercounts a reused or pruned tree, this is its actual size
+            "tree_nodes": self._engine.tree_stats()["nodes"] if simulations else 0,
+            "times": times,
+            "counts": counts,
+        }
+
+        if counts.get("batch_capacity"):
+            record["batch_fill"] = counts.get("batch_leaves", 0) / counts["batch_capacity"]
+
+        cache = self._engine.cache_stats()
+        if cache is not None:
+            record["cache_hits"] = cache["hits"] - self._last_cache["hits"]
+            record["cache_misses"] = cache["misses"] - self._last_cache["misses"]
+            self._last_cache = cache
+
+        self.moves.append(record)
+
+    def summary(self, board):
+        times = defaultdict(float)
+        counts = defaultdict(int)
+        for record in self.moves:
+            for name, seconds in record["times"].items():
+                times[name] += seconds
+            for name, amount in record["counts"].items():
+                counts[name] += amount
+
+        summary = {
+            "event": "game",
+            "plies": len(self.moves),
+            "result": board.result(),
+            "seconds": time.perf_counter() - self._started,
+            "simulations": sum(record["simulations"] for record in self.moves),
+            "nodes_created": counts.get("nodes_created", 0),
+            "max_tree_nodes": max((record["tree_nodes"] for record in self.moves), default=0),
+            "mean_tree_nodes": sum(record["tree_nodes"] for record in self.moves) / max(len(self.moves), 1),
+            "times": dict(times),
+            "counts": dict(counts),
+        }
+
+        if counts.get("batch_capacity"):
+            summary["batch_fill"] = counts.get("batch_leaves", 0) / counts["batch_capacity"]
+        if self._engine.cache_stats() is not None:
+            summary["cache_hits"] = sum(record["cache_hits"] for record in self.moves)
+            summary["cache_misses"] = sum(record["cache_misses"] for record in self.moves)
+
+        return summary
+
+    def finish(self, board):
+        self.game = self.summary(board)
+        return self.game
+
+class TelemetryLog:
+    def __init__(self, path):
+        self._file = open(path, "a")
+
+    def write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
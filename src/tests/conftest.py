@@ -0,0 +1,12 @@
+import os
+import sys
+
+import pytest
+
+# the modules live flat in src/ and import each other by name, as when run from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture
+def stub_model():
+    from model.stub_model import StubModel
+    return StubModel()
@@ -0,0 +1,40 @@
+import threading
+
+import arena
+from arena import play_arena_games, random_opening, run_arena, sprt_bounds, sprt_llr
+from engine import ChessEngine
+
+def test_sprt_llr_moves_with_one_sided_results():
+    assert sprt_llr(0, 0, 0, 0, 10) == 0.0
+    # all wins, all losses and all draws each carry evidence
+    assert 0 < sprt_llr(5, 0, 0, 0, 10) < sprt_llr(50, 0, 0, 0, 10)
+    assert sprt_llr(0, 0, 50, 0, 10) < sprt_llr(0, 0, 5, 0, 10) < 0
+    assert sprt_llr(0, 500, 0, 0, 10) < 0
+
+    lower, upper = sprt_bounds(0.05, 0.05)
+    assert sprt_llr(200, 0, 0, 0, 10) > upper
+    assert sprt_llr(0, 0, 200, 0, 10) < lower
+
+def task(plies):
+    return {"openings": [random_opening(2, 0)], "simulations": 4, "leaves_per_game": 2, "max_plies": plies, "C": 1.41}
+
+def test_games_are_played_in_pairs_with_both_colors(stub_model, monkeypatch):
+    monkeypatch.setattr(arena, "_worker_engines", [ChessEngine(stub_model), ChessEngine(stub_model)])
+    monkeypatch.setattr(arena, "_stop_event", None)
+
+    results = play_arena_games(task(8))
+    assert len(results) == 2
+    assert all(result in (-1, 0, 1) for result in results)
+
+def test_running_games_are_abandoned_once_the_arena_decided(stub_model, monkeypatch):
+    stop_event = threading.Event()
+    stop_event.set()
+    monkeypatch.setattr(arena, "_worker_engines", [ChessEngine(stub_model), ChessEngine(stub_model)])
+    monkeypatch.setattr(arena, "_stop_event", stop_event)
+
+    assert play_arena_games(task(400)) == [None, None]
+
+def test_run_arena_with_worker_processes():
+    summary = run_arena("stub://", "stub://", num_games=2, simulations=2, num_workers=1, max_plies=6, seed=0)
+    assert summary["games"] == 2
+    assert summary["decision"] is None
@@ -0,0 +1,31 @@
+import chess
+import numpy as np
+import pytest
+
+from array_mcts import ArrayMCTS, ArrayTree
+from engine import ChessEngine
+from mcts import MCTS
+
+# a position with a mate in one on the board
+SCHOLARS_MATE = "r1bqkbnr/pppp1ppp/2n5/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 2 4"
+
+@pytest.mark.parametrize("fen", [chess.STARTING_FEN, SCHOLARS_MATE])
+@pytest.mark.parametrize("batch_size", [1, 8])
+def test_array_tree_searches_like_the_node_tree(stub_model, fen, batch_size):
+    engine = ChessEngine(stub_model)
+    board = chess.Board(fen)
+
+    node_probs = MCTS(engine, engine.game).search(board, 300, batch_size=batch_size)
+    array_probs = ArrayMCTS(engine, engine.game).search(board, 300, batch_size=batch_size)
+    assert np.array_equal(node_probs, array_probs)
+
+def test_array_tree_grows_past_its_capacity():
+    tree = ArrayTree(capacity=4)
+    root = tree.add_root()
+    tree.add_children(root, np.arange(10), np.full(10, 0.1))
+    tree.backpropagate(root + 3, 1.0)
+
+    assert tree.capacity >= 11
+    assert tree.children(root) == (1, 11)
+    assert tree.visit_count[3] == 1 and tree.value_sum[3] == 1.0
+    assert tree.visit_count[root] == 1 and tree.value_sum[root] == -1.0
@@ -0,0 +1,50 @@
+import chess
+
+from engine import ChessEngine
+from mcts import MCTS, count_nodes, subtree_sizes
+
+def assert_visits_add_up(root):
+    # every visit of a node went on to one of its children, except the one that expanded it
+    for node in subtree_sizes(root)[0]:
+        if node.children:
+            assert node.visit_count == 1 + sum(child.visit_count for child in node.children.values())
+        assert abs(node.value_sum) <= node.visit_count
+
+def test_batched_search_spends_every_simulation(stub_model):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game)
+
+    action_probs = search.search(chess.Board(), 200, batch_size=8)
+
+    root = search._last_root
+    assert root.visit_count == search.simulations_done == 200
+    assert action_probs.sum() == 1.0
+    assert_visits_add_up(root)
+
+def test_collected_leaves_are_distinct_until_evaluated(stub_model):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game)
+    root = search.start_search(chess.Board())
+
+    # an unexpanded root is the only leaf there is
+    paths = search.collect_leaves(root, 8)
+    assert len(paths) == 1
+    search.apply_evaluations(paths, engine.evaluate_batch([root.state], [root.perspective]))
+
+    # descents that run into a pending leaf push the next ones to other moves
+    paths = search.collect_leaves(root, 8)
+    leaves = [path[-1] for path in paths]
+    assert 1 < len(paths) == len(set(leaves)) == count_nodes(root) - 1
+    # each pending leaf carries one virtual loss, the ones of the collisions are gone
+    assert all(leaf.visit_count == leaf.value_sum == 1 for leaf in leaves)
+
+    search.apply_evaluations(paths, engine.evaluate_batch([leaf.state for leaf in leaves], [leaf.perspective for leaf in leaves]))
+    assert root.visit_count == 1 + len(paths)
+    assert_visits_add_up(root)
+
+def test_best_move_with_batches_is_legal(stub_model):
+    engine = ChessEngine(stub_model)
+    board = chess.Board()
+    move, policy, _ = engine.best_move(board, 64, batch_size=16)
+    assert move in board.legal_moves
+    assert policy[engine.game.move_to_index(move)] == policy.max()
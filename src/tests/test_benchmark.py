@@ -0,0 +1,41 @@
+import json
+import os
+import tempfile
+
+import chess
+import numpy as np
+
+from engine import ChessEngine
+from scripts.benchmark import BENCHMARK_FENS, benchmark
+
+def rates(results):
+    for value in results.values():
+        if isinstance(value, dict):
+            yield from rates(value)
+        else:
+            yield value
+
+def test_benchmark_measures_every_stage_and_saves_the_results(tmp_path, monkeypatch):
+    (tmp_path / "temp").mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path / "temp"))
+    output_path = str(tmp_path / "results.json")
+    results = benchmark("stub", output_path, simulations=16, batch_size=4, repeats=1, num_games=1, max_simulations=4)
+
+    assert set(results) >= {"revision", "machine", "config", "encoding", "valid_moves", "search", "self_play"}
+    assert set(results["search"]) == {
+        f"{tree}_batch_{batch_size}_simulations_per_sec" for tree in ("nodes", "replay", "array") for batch_size in (1, 4)
+    }
+    measured = {name: results[name] for name in ("encoding", "valid_moves", "search", "self_play")}
+    assert all(rate > 0 for rate in rates(measured))
+
+    with open(output_path) as results_file:
+        assert json.load(results_file)["config"] == results["config"]
+    assert sorted(os.listdir(tmp_path)) == ["results.json", "temp"]
+    # the model and game folders are removed
+    assert os.listdir(tmp_path / "temp") == []
+
+def test_engine_batch_encoding_matches_single_boards(stub_model):
+    engine = ChessEngine(stub_model)
+    boards = [chess.Board(fen) for fen in BENCHMARK_FENS]
+    batch = engine.encode_batch(boards).copy()
+    assert np.array_equal(batch, np.array([engine.board_to_tensor(board) for board in boards]))
@@ -0,0 +1,54 @@
+import random
+
+import chess
+import numpy as np
+
+from board_encoder import BoardEncoder, decode_board
+
+def reference_encoding(board):
+    # the original square by square encoding
+    state = np.zeros((8, 8, 16), dtype=np.float32)
+    state[:, :, 12] = board.has_kingside_castling_rights(chess.WHITE)
+    state[:, :, 13] = board.has_queenside_castling_rights(chess.WHITE)
+    state[:, :, 14] = board.has_kingside_castling_rights(chess.BLACK)
+    state[:, :, 15] = board.has_queenside_castling_rights(chess.BLACK)
+
+    for row in range(8):
+        for col in range(8):
+            piece = board.piece_at(chess.square(col, 7 - row))
+            if piece:
+                state[row, col, (0 if piece.color == chess.WHITE else 6) + piece.piece_type - 1] = 1
+    return state
+
+def random_boards(count, seed=0):
+    rng = random.Random(seed)
+    board = chess.Board()
+    boards = []
+    while len(boards) < count:
+        if board.is_game_over():
+            board = chess.Board()
+        board.push(rng.choice(list(board.legal_moves)))
+        boards.append(board.copy())
+    return boards
+
+def test_batches_match_the_square_by_square_encoding():
+    boards = random_boards(200)
+    # a small buffer has to grow to the batch
+    encoded = BoardEncoder(max_batch_size=4).encode_batch(boards)
+    assert encoded.shape == (200, 8, 8, 16)
+    for board, planes in zip(boards, encoded):
+        assert np.array_equal(planes, reference_encoding(board))
+
+def test_encode_returns_its_own_copy():
+    encoder = BoardEncoder()
+    first = encoder.encode(chess.Board())
+    encoder.encode(random_boards(1)[0])
+    assert np.array_equal(first, reference_encoding(chess.Board()))
+
+def test_decode_board_inverts_the_encoding():
+    encoder = BoardEncoder()
+    for board in random_boards(50, seed=1):
+        decoded = decode_board(encoder.encode(board), board.turn)
+        assert decoded.board_fen() == board.board_fen()
+        assert decoded.castling_rights == board.clean_castling_rights()
+        assert decoded.turn == board.turn
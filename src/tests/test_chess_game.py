@@ -0,0 +1,45 @@
+import random
+
+import chess
+import numpy as np
+
+from chess_game import ChessGame
+
+def positions(count, seed=0):
+    rng = random.Random(seed)
+    board = chess.Board()
+    for _ in range(count):
+        if board.is_game_over():
+            board = chess.Board()
+        yield board.copy()
+        board.push(rng.choice(list(board.legal_moves)))
+
+def test_every_legal_move_has_its_own_index():
+    game = ChessGame()
+    # promotions and castling both ways included
+    boards = list(positions(300)) + [chess.Board("4k3/1P6/8/8/8/8/6p1/R3K2R w KQ - 0 1"), chess.Board("r3k2r/8/8/8/8/8/1p4P1/4K3 b kq - 0 1")]
+
+    for board in boards:
+        moves = list(board.legal_moves)
+        indices = game.get_legal_indices(board)
+
+        assert len(set(indices.tolist())) == len(moves)
+        assert (indices >= 0).all()
+        for move, index in zip(moves, indices):
+            assert game.move_to_index(move) == index == game._move_to_index_map[move.uci()]
+            assert game.index_to_move(index) == move
+
+        valid = game.get_valid_moves(board)
+        assert valid.sum() == len(moves)
+        assert valid[indices].all()
+
+def test_moves_without_an_action_have_no_index():
+    game = ChessGame()
+    assert game.move_to_index(chess.Move.from_uci("a1b3")) is not None
+    assert game.move_to_index(chess.Move.from_uci("a1c4")) is None
+
+def test_valid_moves_reuse_the_output_buffer():
+    game = ChessGame()
+    out = np.ones(game.action_size, dtype=np.uint8)
+    assert game.get_valid_moves(chess.Board(), out) is out
+    assert out.sum() == 20
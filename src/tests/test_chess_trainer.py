@@ -0,0 +1,29 @@
+import os
+
+from chess_trainer import ChessTrainer
+from game_records import read_games
+from model.stub_model import STUB_MODEL_PATH
+
+def played_games(folder):
+    games = []
+    for name in os.listdir(folder):
+        games.extend(tuple(keys.tolist()) for _, _, _, keys in read_games(os.path.join(folder, name)))
+    return sorted(games)
+
+def test_workers_play_reproducible_games_and_are_kept_between_runs(tmp_path):
+    trainer = ChessTrainer(None)
+    try:
+        trainer.generate_games(str(tmp_path / "first"), num_games=3, max_simulations=4, model_path=STUB_MODEL_PATH, seed=7)
+        executor = trainer._executor
+        trainer.generate_games(str(tmp_path / "second"), num_games=3, max_simulations=4, model_path=STUB_MODEL_PATH, seed=7)
+        assert trainer._executor is executor
+    finally:
+        trainer.close()
+    assert trainer._executor is None
+
+    first = played_games(tmp_path / "first")
+    assert len(first) == 3
+    # every game starts from the initial position and ends when the game is over
+    assert all(len(game) > 1 and game[0] == first[0][0] for game in first)
+    # the seed fixes the games, whichever worker plays which task
+    assert first == played_games(tmp_path / "second")
@@ -0,0 +1,133 @@
+import os
+import json
+import threading
+
+from file_system_gateway import FileSystemGateway
+from model.cloud_model_saver import CloudModelSaver, checkpoint_digest
+
+class FakeModel:
+    def __init__(self, weights):
+        self.weights = weights
+
+    def save(self, path):
+        with open(path, "wb") as model_file:
+            model_file.write(self.weights)
+
+class FakeGateway:
+    def __init__(self, failures=0, release=None):
+        self.failures = failures
+        self.release = release
+        self.uploads = []
+        self.attempts = 0
+
+    def upload_file(self, local_path, remote_path, metadata):
+        self.attempts += 1
+        if self.release is not None:
+            self.release.wait(5)
+        if self.attempts <= self.failures:
+            raise ConnectionError("upload failed")
+        with open(local_path, "rb") as model_file:
+            self.uploads.append((remote_path, model_file.read(), metadata["sha256"]))
+
+def test_identical_checkpoints_are_uploaded_once():
+    gateway = FakeGateway()
+    saver = CloudModelSaver("models/latest.keras", gateway)
+
+    saver.save(FakeModel(b"weights"))
+    assert saver.flush(5)
+    saver.save(FakeModel(b"weights"))
+    saver.close(5)
+
+    assert [upload[1] for upload in gateway.uploads] == [b"weights"]
+    assert (saver.uploaded, saver.skipped) == (1, 1)
+
+def test_a_checkpoint_superseded_before_its_upload_is_dropped():
+    release = threading.Event()
+    gateway = FakeGateway(release=release)
+    saver = CloudModelSaver("models/latest.keras", gateway)
+
+    # the first upload blocks, the second checkpoint waits behind it and is replaced by the third
+    saver.save(FakeModel(b"first"))
+    saver.save(FakeModel(b"second"))
+    saver.save(FakeModel(b"third"))
+    release.set()
+    saver.close(5)
+
+    assert [upload[1] for upload in gateway.uploads] in ([b"first", b"third"], [b"third"])
+    assert saver.uploaded + saver.skipped == 3
+
+def test_failed_uploads_are_retried_then_given_up():
+    gateway = FakeGateway(failures=2)
+    saver = CloudModelSaver("models/latest.keras", gateway, retries=2, retry_delay=0.01)
+    saver.save(FakeModel(b"weights"))
+    saver.close(5)
+    assert (gateway.attempts, saver.uploaded, saver.failed) == (3, 1, 0)
+
+    gateway = FakeGateway(failures=10)
+    saver = CloudModelSaver("models/latest.keras", gateway, retries=2, retry_delay=0.01)
+    saver.save(FakeModel(b"weights"))
+    assert saver.flush(5)
+    assert (gateway.attempts, saver.uploaded, saver.failed) == (3, 0, 1)
+
+    # the same weights are tried again after a failure instead of being skipped as unchanged
+    saver.save(FakeModel(b"weights"))
+    saver.close(5)
+    assert gateway.attempts == 6
+
+def test_close_waits_for_the_last_upload():
+    release = threading.Event()
+    gateway = FakeGateway(release=release)
+    saver = CloudModelSaver("models/latest.keras", gateway)
+    saver.save(FakeModel(b"weights"))
+
+    closing = threading.Thread(target=saver.close)
+    closing.start()
+    closing.join(0.2)
+    assert closing.is_alive()
+
+    release.set()
+    closing.join(5)
+    assert not closing.is_alive()
+    assert [upload[1] for upload in gateway.uploads] == [b"weights"]
+
+def test_checkpoints_land_in_a_file_system_gateway(tmp_path):
+    weights = os.urandom(10_500)
+    gateway = FileSystemGateway(str(tmp_path / "bucket"), part_size=1000, upload_threads=4)
+    saver = CloudModelSaver("models/latest.keras", gateway)
+
+    saver.save(FakeModel(weights))
+    assert saver.flush(5)
+    saver.save(FakeModel(weights))
+    saver.close(5)
+
+    assert (saver.uploaded, saver.skipped) == (1, 1)
+    with open(gateway.path("models/latest.keras"), "rb") as model_file:
+        assert model_file.read() == weights
+    with open(gateway.path("models/latest.keras.info.json")) as info_file:
+        info = json.load(info_file)
+    assert info["sha256"] == checkpoint_digest(gateway.path("models/latest.keras"))
+    assert sorted(os.listdir(tmp_path / "bucket" / "models")) == ["latest.keras", "latest.keras.info.json"]
+
+def test_a_failed_part_leaves_nothing_behind_and_is_retried(tmp_path, monkeypatch):
+    writes = []
+    pwrite = os.pwrite
+
+    def failing_pwrite(fd, data, offset):
+        writes.append(offset)
+        if len(writes) == 2:
+            raise OSError("disk went away")
+        return pwrite(fd, data, offset)
+
+    monkeypatch.setattr(os, "pwrite", failing_pwrite)
+    gateway = FileSystemGateway(str(tmp_path / "bucket"), part_size=1000, upload_threads=1)
+    saver = CloudModelSaver("models/latest.keras", gateway, retries=1, retry_delay=0.01)
+
+    saver.save(FakeModel(b"w" * 3000))
+    saver.close(5)
+
+    assert (saver.uploaded, saver.failed) == (1, 0)
+    # the second part of the first attempt failed, the retry copied all three again
+    assert writes[-3:] == [0, 1000, 2000] and len(writes) > 3
+    with open(gateway.path("models/latest.keras"), "rb") as model_file:
+        assert model_file.read() == b"w" * 3000
+    assert not [name for name in os.listdir(tmp_path / "bucket" / "models") if name.endswith(".part")]
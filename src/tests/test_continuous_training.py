@@ -0,0 +1,41 @@
+import numpy as np
+
+from continuous_training import ContinuousTrainer
+from model.stub_model import STUB_MODEL_PATH
+from replay_buffer import ReplayBuffer
+
+class RecordingModel:
+    def __init__(self):
+        self.batches = []
+
+    def train_batch(self, states, policies, values):
+        self.batches.append((states, policies, values))
+        return 0.0
+
+class StubTrainer(ContinuousTrainer):
+    """Publishes the stub instead of saved weights, so the worker processes can load it."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.published_at = []
+
+    def publish_checkpoint(self):
+        self.published_at.append(self.steps)
+        return self._coordinator.publish_model(STUB_MODEL_PATH)
+
+def test_training_runs_on_games_played_meanwhile(tmp_path):
+    model = RecordingModel()
+    buffer = ReplayBuffer(capacity=10_000, policy_width=8, seed=0)
+    trainer = StubTrainer(model, buffer, str(tmp_path / "queue"), str(tmp_path / "games"), str(tmp_path / "checkpoints"))
+
+    trainer.run(num_workers=1, max_simulations=2, train_batch_size=4, min_positions=1, checkpoint_every=2,
+                max_steps=5, poll_interval=0.1, seed=0)
+
+    assert trainer.steps == len(model.batches) == 5
+    assert trainer.games_collected >= 1 and len(buffer) > 0
+    # the first weights, every `checkpoint_every` steps, and the last ones
+    assert trainer.published_at == [0, 2, 4, 5]
+
+    states, policies, values = model.batches[0]
+    assert len(states) == 4
+    # the buffer stores probabilities as float16
+    assert np.allclose(policies.sum(axis=1), 1.0, atol=1e-3)
@@ -0,0 +1,60 @@
+from collections import Counter
+
+import chess
+import chess.polyglot
+import numpy as np
+
+from engine import ChessEngine
+from evaluation_cache import EvaluationCache
+from mcts import MCTS, subtree_sizes
+
+class CountingModel:
+    def __init__(self, model):
+        self.model = model
+        self.positions = 0
+
+    def predict(self, states):
+        self.positions += len(states)
+        return self.model.predict(states)
+
+def test_cached_evaluations_give_the_same_search(stub_model):
+    board = chess.Board()
+    plain = ChessEngine(stub_model, reuse_tree=False)
+    model = CountingModel(stub_model)
+    cache = EvaluationCache(16)
+    cached = ChessEngine(model, reuse_tree=False, cache=cache)
+
+    expected = plain.best_move(board, 200)[1]
+    assert np.array_equal(cached.best_move(board, 200)[1], expected)
+    evaluated = model.positions
+
+    # the second search of the same position is answered from the cache
+    assert np.array_equal(cached.best_move(board, 200)[1], expected)
+    assert model.positions == evaluated
+    assert cache.stats()["hits"] >= 200
+
+def test_the_least_recently_used_entries_are_evicted():
+    policy = np.zeros(4672, dtype=np.float32)
+    entry_mb = (policy.nbytes + 4) / (1024 * 1024)
+    cache = EvaluationCache(entry_mb * 2.5)
+
+    cache.put(1, policy, 0.0)
+    cache.put(2, policy, 0.0)
+    assert cache.get(1) is not None
+    cache.put(3, policy, 0.0)
+
+    assert len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.get(1) is not None and cache.get(3) is not None
+
+def test_transpositions_share_nodes(stub_model):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game, transpositions=True)
+    search.search(chess.Board(), 2000)
+
+    nodes = subtree_sizes(search._last_root)[0]
+    parents = Counter(id(child) for node in nodes for child in node.children.values())
+    assert max(parents.values()) > 1
+    # one node per position and ply
+    keys = [(chess.polyglot.zobrist_hash(node.state), node.state.ply()) for node in nodes]
+    assert len(set(keys)) == len(keys)
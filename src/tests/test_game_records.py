@@ -0,0 +1,55 @@
+import h5py
+import numpy as np
+import pytest
+
+from game_records import ACTION_SIZE, STATE_SHAPE, GameRecordWriter, convert_games, read_games
+
+def random_game(rng, length):
+    game = []
+    for _ in range(length):
+        policy = np.zeros(ACTION_SIZE, dtype=np.float32)
+        moves = rng.choice(ACTION_SIZE, size=3, replace=False)
+        policy[moves] = rng.dirichlet(np.ones(3))
+        game.append((rng.integers(0, 2, STATE_SHAPE).astype(np.float32), policy, np.array([rng.uniform(-1, 1)]), int(rng.integers(1, 2**63))))
+    return game
+
+def assert_same_games(read, written):
+    assert len(read) == len(written)
+    for (states, policies, values, keys), game in zip(read, written):
+        assert np.array_equal(states, [step[0] for step in game])
+        assert np.allclose(policies, [step[1] for step in game])
+        assert np.allclose(values, [step[2][0] for step in game])
+        assert keys.tolist() == [step[3] for step in game]
+
+def test_games_round_trip_and_files_can_be_appended_to(tmp_path):
+    rng = np.random.default_rng(0)
+    games = [random_game(rng, length) for length in (3, 1, 5)]
+    path = str(tmp_path / "games.h5")
+
+    with GameRecordWriter(path) as writer:
+        writer.append_games(games[:2])
+        writer.append_game([])
+    with GameRecordWriter(path) as writer:
+        writer.append_game(games[2])
+
+    assert_same_games(list(read_games(path)), games)
+
+def test_legacy_files_are_converted(tmp_path):
+    rng = np.random.default_rng(1)
+    games = [random_game(rng, length) for length in (2, 4)]
+    with h5py.File(tmp_path / "legacy.h5", "w") as h5_file:
+        for i, game in enumerate(games):
+            group = h5_file.create_group(f"game_{i}")
+            group.create_dataset("states", data=np.array([step[0] for step in game]))
+            group.create_dataset("policies", data=np.array([step[1] for step in game]))
+            group.create_dataset("values", data=np.array([step[2] for step in game]))
+
+    # legacy files store no keys
+    games = [[step[:3] + (0,) for step in game] for game in games]
+    assert_same_games(list(read_games(str(tmp_path / "legacy.h5"))), games)
+
+    converted = convert_games(str(tmp_path / "legacy.h5"), str(tmp_path / "compact"))
+    assert_same_games(list(read_games(converted[0])), games)
+
+    with pytest.raises(ValueError):
+        GameRecordWriter(str(tmp_path / "legacy.h5"))
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from game_records import ACTION_SIZE, STATE_SHAPE, GameRecordWriter
+from games_dataset import build_games_dataset, list_game_files
+from position_index import PositionIndex
+
+def write_games(path, game_lengths, first_key=1):
+    rng = np.random.default_rng(0)
+    key = first_key
+    with GameRecordWriter(str(path)) as writer:
+        for length in game_lengths:
+            game = []
+            for _ in range(length):
+                policy = np.zeros(ACTION_SIZE, dtype=np.float32)
+                policy[rng.integers(ACTION_SIZE)] = 1
+                game.append((rng.integers(0, 2, STATE_SHAPE).astype(np.float32), policy, float(key), key))
+                key += 1
+            writer.append_game(game)
+
+def collect(dataset, with_weights=False):
+    rows = []
+    for states, (policies, batch_values), weights in dataset:
+        assert states.shape[1:] == STATE_SHAPE
+        assert np.allclose(policies.numpy().sum(axis=1), 1.0)
+        rows.extend(zip(batch_values.numpy().tolist(), weights.numpy().tolist()))
+    return sorted(rows) if with_weights else sorted(value for value, _ in rows)
+
+def test_every_position_of_every_file_is_streamed_once(tmp_path):
+    write_games(tmp_path / "a.h5", [5, 7])
+    write_games(tmp_path / "b.h5", [4], first_key=100)
+
+    values = collect(build_games_dataset(str(tmp_path), batch_size=4, shuffle_buffer=8, seed=0))
+    assert values == [float(key) for key in list(range(1, 13)) + list(range(100, 104))]
+
+def test_deduplicated_shards_are_read_too(tmp_path):
+    write_games(tmp_path / "games.h5", [6, 6])
+    index = PositionIndex(str(tmp_path / "index"), shard_size=5, policy_width=4)
+    index.update(str(tmp_path / "games.h5"))
+
+    values = collect(build_games_dataset(str(tmp_path / "index"), batch_size=4))
+    assert values == [float(key) for key in range(1, 13)]
+
+def test_deduplicated_positions_weigh_as_much_as_their_occurrences(tmp_path):
+    (tmp_path / "games").mkdir()
+    write_games(tmp_path / "games" / "a.h5", [3])
+    write_games(tmp_path / "games" / "b.h5", [3])
+    write_games(tmp_path / "games" / "c.h5", [2], first_key=10)
+    index = PositionIndex(str(tmp_path / "index"), shard_size=4, policy_width=4)
+    index.update(str(tmp_path / "games"))
+
+    # 8 positions stored as 5 rows, the weights average 1 over the rows
+    rows = collect(build_games_dataset(str(tmp_path / "index"), batch_size=4), with_weights=True)
+    assert rows == pytest.approx([(1.0, 10 / 8), (2.0, 10 / 8), (3.0, 10 / 8), (10.0, 5 / 8), (11.0, 5 / 8)])
+
+    # game files are not deduplicated, every position weighs 1
+    assert {weight for _, weight in collect(build_games_dataset(str(tmp_path / "games"), batch_size=4), True)} == {1.0}
+
+def test_a_model_trains_on_weighted_batches(tmp_path):
+    from model.gaming_model import GamingRLModel
+
+    class DiscardingSaver:
+        def save(self, model):
+            pass
+
+    write_games(tmp_path / "games.h5", [4, 4])
+    index = PositionIndex(str(tmp_path / "index"), shard_size=8, policy_width=4)
+    index.update(str(tmp_path / "games.h5"))
+
+    model = GamingRLModel(DiscardingSaver())
+    model.train_dataset(build_games_dataset(str(tmp_path / "index"), batch_size=4), epochs=1)
+
+def test_a_folder_without_game_files_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        list_game_files(str(tmp_path))
+    with pytest.raises(ValueError):
+        list_game_files(str(tmp_path / "missing"))
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from model.gaming_model import GamingRLModel
+from model.local_model_saver import LocalModelSaver
+
+@pytest.fixture(scope="module")
+def model():
+    return GamingRLModel(LocalModelSaver("unused.keras"))
+
+def test_traced_predictions_match_the_keras_model(model):
+    states = np.random.default_rng(0).integers(0, 2, size=(300, 8, 8, 16)).astype(np.float32)
+    expected_policies, expected_values = (np.asarray(output) for output in model._model(states, training=False))
+
+    # 300 positions go through the traced function in two padded buckets
+    policies, values = model.predict(states)
+    assert policies.shape == (300, 4672) and values.shape == (300, 1)
+    assert np.allclose(policies, expected_policies, atol=1e-4)
+    assert np.allclose(values, expected_values, atol=1e-4)
+
+    policy, value = model.predict(states[0])
+    assert policy.shape == (4672,) and value.shape == (1,)
+    assert np.allclose(policy, expected_policies[0], atol=1e-4)
+
+def test_new_weights_reach_the_traced_function(model):
+    state = np.ones((1, 8, 8, 16), dtype=np.float32)
+    before = model.predict(state)[1]
+
+    model._model.set_weights([weights * 1.5 for weights in model._model.get_weights()])
+    model.refresh_inference_model()
+    after = model.predict(state)[1]
+
+    assert np.allclose(after, np.asarray(model._model(state, training=False)[1])[0], atol=1e-4)
+    assert not np.allclose(before, after)
+
+def test_int8_inference_stays_close_to_float():
+    model = GamingRLModel(LocalModelSaver("unused.keras"), inference_precision="int8")
+    states = np.random.default_rng(1).integers(0, 2, size=(4, 8, 8, 16)).astype(np.float32)
+    expected_policies, expected_values = (np.asarray(output) for output in model._model(states, training=False))
+
+    policies, values = model.predict(states)
+    assert np.allclose(policies, expected_policies, atol=0.05)
+    assert np.allclose(values, expected_values, atol=0.05)
+
+def test_unknown_precisions_are_rejected():
+    with pytest.raises(ValueError):
+        GamingRLModel(LocalModelSaver("unused.keras"), inference_precision="int4")
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import scripts.generate
+from scripts.generate import generate
+
+class FakeModel:
+    def __init__(self, model_saver):
+        pass
+
+    def save_to(self, path):
+        with open(path, "wb") as model_file:
+            model_file.write(b"weights")
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_the_initial_model_is_removed_after_generating(tmp_path, monkeypatch, fail):
+    used = []
+
+    def generate_games(self, save_folder, num_games, max_simulations, batch_size, model_path=None, **kwargs):
+        # the workers load the model while the games are played
+        assert os.path.exists(model_path)
+        used.append(model_path)
+        if fail:
+            raise RuntimeError("worker crashed")
+        return "games"
+
+    monkeypatch.setattr(scripts.generate, "GamingRLModel", FakeModel)
+    monkeypatch.setattr(scripts.generate.ChessTrainer, "generate_games", generate_games)
+
+    if fail:
+        with pytest.raises(RuntimeError):
+            generate(str(tmp_path / "missing.keras"), num_games=1)
+    else:
+        assert generate(str(tmp_path / "missing.keras"), num_games=1) == "games"
+
+    assert not os.path.exists(os.path.dirname(used[0]))
+
+def test_a_given_model_is_kept(tmp_path, monkeypatch):
+    model_path = tmp_path / "model.keras"
+    model_path.write_bytes(b"weights")
+    monkeypatch.setattr(scripts.generate.ChessTrainer, "generate_games", lambda self, *args, **kwargs: "games")
+
+    assert generate(str(model_path), num_games=1) == "games"
+    assert model_path.exists()
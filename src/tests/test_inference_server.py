@@ -0,0 +1,44 @@
+import os
+import threading
+
+import numpy as np
+
+from chess_trainer import ChessTrainer
+from game_records import read_games
+from inference_server import InferenceServer, connect_client
+from model.stub_model import STUB_MODEL_PATH, StubModel
+
+def test_clients_get_their_own_rows_of_a_shared_batch():
+    states = np.random.default_rng(0).integers(0, 2, size=(6, 8, 8, 16)).astype(np.float32)
+    expected_policies, expected_values = StubModel().predict(states)
+    results = {}
+
+    with InferenceServer(STUB_MODEL_PATH, num_clients=2, max_wait=0.2) as server:
+        clients = [connect_client(*server.client_args()) for _ in range(2)]
+
+        def predict(i, rows):
+            results[i] = clients[i].predict(states[rows])
+
+        threads = [threading.Thread(target=predict, args=(0, slice(0, 4))), threading.Thread(target=predict, args=(1, slice(4, 5)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+    assert np.allclose(results[0][0], expected_policies[:4], atol=1e-5)
+    assert np.allclose(results[0][1], expected_values[:4], atol=1e-5)
+    # a single position comes back without its batch axis, as from the model itself
+    assert results[1][0].shape == expected_policies[4].shape
+    assert np.allclose(results[1][0], expected_policies[4], atol=1e-5)
+
+def test_self_play_workers_evaluate_through_the_server(tmp_path):
+    trainer = ChessTrainer(None)
+    with InferenceServer(STUB_MODEL_PATH, num_clients=2) as server:
+        try:
+            trainer.generate_games(str(tmp_path), num_games=2, max_simulations=2, inference_server=server, seed=0)
+        finally:
+            trainer.close()
+
+    files = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    assert len(files) == 1
+    assert len(list(read_games(files[0]))) == 2
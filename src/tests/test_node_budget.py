@@ -0,0 +1,41 @@
+import chess
+import pytest
+
+from engine import ChessEngine
+from mcts import MCTS, Node, count_nodes, subtree_sizes
+
+def node(*children):
+    parent = Node(None, None, 1.41, perspective="white")
+    for action, child in enumerate(children):
+        parent.children[action] = child
+    return parent
+
+def test_shared_nodes_count_toward_their_dominator():
+    d = node()
+    c = node(d)
+    a, b = node(c), node(c)
+    root = node(a, b)
+
+    nodes, sizes, dominators = subtree_sizes(root)
+    assert len(nodes) == count_nodes(root) == 5
+    # c is reached through a and through b: collapsing either one frees nothing
+    assert [sizes[id(n)] for n in (root, a, b, c, d)] == [5, 1, 1, 2, 1]
+    assert dominators[id(c)] is root
+    assert nodes.index(c) > max(nodes.index(a), nodes.index(b))
+
+@pytest.mark.parametrize("transpositions", [False, True])
+def test_the_tree_stays_within_the_budget(stub_model, transpositions):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game, transpositions=transpositions, max_nodes=60)
+    board = chess.Board()
+
+    for batch_size in (1, 8):
+        search.search(board, 2000, batch_size=batch_size)
+        root = search._last_root
+        assert search.nodes_pruned > 0
+        assert search.node_count == count_nodes(root) <= 60
+
+def test_a_budget_smaller_than_the_root_fan_out_is_rejected(stub_model):
+    with pytest.raises(ValueError):
+        ChessEngine(stub_model, max_nodes=5)
+    ChessEngine(stub_model, max_nodes=11)
@@ -0,0 +1,106 @@
+import pickle
+
+import chess
+import chess.polyglot
+import numpy as np
+import pytest
+
+from board_encoder import BoardEncoder
+from chess_game import ChessGame
+from engine import ChessEngine
+from game_records import GameRecordWriter
+from opening_book import OpeningBook, build_book, write_book
+
+def record_game(moves, replies):
+    """A game along `moves`, whose stored policy at every ply splits between the move and its entry in `replies`."""
+    encoder, game = BoardEncoder(), ChessGame()
+    board = chess.Board()
+    positions = []
+
+    for move, reply in zip(moves, replies):
+        policy = np.zeros(game.action_size, dtype=np.float32)
+        policy[game.move_to_index(chess.Move.from_uci(move))] = 0.75
+        policy[game.move_to_index(chess.Move.from_uci(reply))] = 0.25
+        positions.append((encoder.encode(board), policy, 0.5, chess.polyglot.zobrist_hash(board)))
+        board.push_uci(move)
+
+    return positions
+
+def write_games(path, games):
+    with GameRecordWriter(str(path)) as writer:
+        for positions in games:
+            writer.append_game(positions)
+    return str(path)
+
+def book_for(path, board, moves, probs):
+    game = ChessGame()
+    actions = np.zeros((1, 4), dtype=np.uint16)
+    weights = np.zeros((1, 4), dtype=np.float32)
+    actions[0, :len(moves)] = [game.move_to_index(chess.Move.from_uci(move)) for move in moves]
+    weights[0, :len(moves)] = probs
+
+    key = np.array([chess.polyglot.zobrist_hash(board)], dtype=np.uint64)
+    write_book(str(path), key, np.array([5], dtype=np.uint32), np.array([0.1], dtype=np.float32), actions, weights, 4)
+    return OpeningBook(str(path))
+
+def test_positions_shared_by_enough_games_are_booked(tmp_path):
+    games_path = write_games(tmp_path / "games.h5", [
+        record_game(["e2e4", "e7e5", "g1f3"], ["d2d4", "c7c5", "b1c3"]),
+        record_game(["e2e4", "e7e5", "f1c4"], ["d2d4", "c7c5", "b1c3"]),
+        record_game(["d2d4", "d7d5"], ["e2e4", "g8f6"]),
+    ])
+
+    assert build_book(games_path, str(tmp_path / "book.bin"), max_plies=3, min_count=2, width=4) == 3
+    book = OpeningBook(str(tmp_path / "book.bin"))
+    assert len(book) == 3 and book.max_plies == 3
+
+    actions, probs, value, count = book.probe(chess.Board())
+    game = ChessGame()
+    moves = {game.index_to_move(action).uci(): prob for action, prob in zip(actions, probs)}
+    # the mean of 0.75/0.25, 0.75/0.25 and 0.25/0.75 over the two first moves
+    assert moves == pytest.approx({"e2e4": 7 / 12, "d2d4": 5 / 12})
+    assert (value, count) == (pytest.approx(0.5), 3)
+
+    board = chess.Board()
+    board.push_uci("d2d4")
+    assert book.probe(board) is None
+
+def test_a_book_pickles_as_its_path_and_survives_a_rebuild(tmp_path):
+    book = book_for(tmp_path / "book.bin", chess.Board(), ["e2e4"], [1.0])
+    copy = pickle.loads(pickle.dumps(book))
+    assert copy.path == book.path and len(copy) == 1
+
+    # an open book keeps reading the file it mapped while a new one replaces it
+    board = chess.Board()
+    board.push_uci("e2e4")
+    book_for(tmp_path / "book.bin", board, ["e7e5"], [1.0])
+    assert book.probe(chess.Board()) is not None
+    assert OpeningBook(str(tmp_path / "book.bin")).probe(chess.Board()) is None
+
+def test_the_engine_plays_book_moves_within_its_plies(stub_model, tmp_path):
+    book = book_for(tmp_path / "book.bin", chess.Board(), ["d2d4", "e2e4"], [0.4, 0.6])
+    engine = ChessEngine(stub_model, book=book, book_plies=1, book_temperature=0)
+
+    move, action_probs, value = engine.best_move(chess.Board(), 4)
+    assert move == chess.Move.from_uci("e2e4")
+    assert action_probs.sum() == pytest.approx(1.0) and value[0] == pytest.approx(0.1)
+    assert engine.timed_best_move(chess.Board(), None, max_simulations=4)[3] == 0
+
+    # with no plies left for the book the engine searches
+    engine = ChessEngine(stub_model, book=book, book_plies=0)
+    assert engine.timed_best_move(chess.Board(), None, max_simulations=4)[3] == 4
+
+def test_book_moves_are_sampled_by_temperature(stub_model, tmp_path):
+    book = book_for(tmp_path / "book.bin", chess.Board(), ["d2d4", "e2e4"], [0.4, 0.6])
+    engine = ChessEngine(stub_model, book=book, book_temperature=1.0)
+
+    np.random.seed(0)
+    played = {engine.best_move(chess.Board(), 4)[0].uci() for _ in range(50)}
+    assert played == {"d2d4", "e2e4"}
+
+def test_an_entry_with_illegal_moves_is_ignored(stub_model, tmp_path):
+    # a key collision would hand the engine moves of another position
+    book = book_for(tmp_path / "book.bin", chess.Board(), ["e2e5"], [1.0])
+    engine = ChessEngine(stub_model, book=book)
+
+    assert engine.timed_best_move(chess.Board(), None, max_simulations=4)[3] == 4
@@ -0,0 +1,23 @@
+import chess
+import numpy as np
+import pytest
+
+from engine import ChessEngine
+from mcts import MCTS, subtree_sizes
+
+BOARD_AFTER_OPENING = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+
+@pytest.mark.parametrize("batch_size", [1, 8])
+def test_path_replay_searches_like_stored_boards(stub_model, batch_size):
+    engine = ChessEngine(stub_model)
+    board = chess.Board(BOARD_AFTER_OPENING)
+
+    stored = MCTS(engine, engine.game).search(board, 300, batch_size=batch_size)
+    search = MCTS(engine, engine.game, path_replay=True)
+    replayed = search.search(board, 300, batch_size=batch_size)
+    assert np.array_equal(stored, replayed)
+
+    # only the root keeps a board, and the caller's board is left as it was
+    root = search._last_root
+    assert all(node.state is None for node in subtree_sizes(root)[0] if node is not root)
+    assert root.state == board and board.fen() == BOARD_AFTER_OPENING
@@ -0,0 +1,77 @@
+import h5py
+import chess
+import numpy as np
+import pytest
+
+from model.stub_model import STUB_MODEL_PATH
+from position_analysis import AnalysisWriter, analyze_chunk, analyze_positions, init_analysis_worker, iter_positions
+
+FOOLS_MATE = "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+
+def write_fens(path, fens):
+    path.write_text("\n".join(fens) + "\n")
+    return str(path)
+
+def test_positions_are_read_from_pgn_fen_and_epd(tmp_path):
+    pgn_path = tmp_path / "games.pgn"
+    pgn_path.write_text('[Event "?"]\n\n1. e4 e5 2. Nf3 *\n\n[Event "?"]\n\n1. d4 *\n')
+    expected = []
+    for moves in (["e2e4", "e7e5", "g1f3"], ["d2d4"]):
+        board = chess.Board()
+        expected.append(board.fen())
+        for move in moves:
+            board.push_uci(move)
+            expected.append(board.fen())
+    assert list(iter_positions(str(pgn_path))) == expected
+
+    fen_path = write_fens(tmp_path / "positions.txt", [
+        "# a comment", "", FOOLS_MATE, "4k3/8/8/8/8/8/8/4K3 w - - bm Kd2; id \"bare kings\";"
+    ])
+    assert list(iter_positions(fen_path)) == [FOOLS_MATE, "4k3/8/8/8/8/8/8/4K3 w - - 0 1"]
+
+@pytest.mark.parametrize("simulations", [0, 8])
+def test_chunks_score_live_and_finished_positions(simulations):
+    init_analysis_worker(STUB_MODEL_PATH, simulations, batch_size=4, search_batch_size=2)
+    fens = [chess.STARTING_FEN, FOOLS_MATE, "4k3/8/8/8/8/8/8/4K3 w - - 0 1"]
+
+    values, best_moves, best_probs = analyze_chunk(fens, simulations, search_batch_size=2)
+
+    # a checkmate and a dead draw are scored from their result, without a move
+    assert values[1] == -1 and values[2] == 0
+    assert best_moves[1:] == ["", ""]
+    assert chess.Move.from_uci(best_moves[0]) in chess.Board().legal_moves
+    assert 0 < best_probs[0] <= 1
+
+def test_writer_refuses_another_source_or_budget(tmp_path):
+    output = str(tmp_path / "analysis.h5")
+    with AnalysisWriter(output, "a.txt", 0) as writer:
+        writer.append([chess.STARTING_FEN], [0.1], ["e2e4"], [0.5])
+
+    with pytest.raises(ValueError):
+        AnalysisWriter(output, "b.txt", 0)
+    with pytest.raises(ValueError):
+        AnalysisWriter(output, "a.txt", 8)
+
+def test_an_existing_output_is_resumed(tmp_path):
+    board = chess.Board()
+    fens = [board.fen()]
+    for move in ["e2e4", "e7e5", "g1f3", "b8c6", "f1b5"]:
+        board.push_uci(move)
+        fens.append(board.fen())
+    input_path = write_fens(tmp_path / "positions.txt", fens)
+    output = str(tmp_path / "analysis.h5")
+
+    # an earlier run stopped after two positions, and left part of a third chunk behind
+    with AnalysisWriter(output, input_path, 0) as writer:
+        writer.append(fens[:2], [0.25, 0.25], ["a2a3", "a7a6"], [1.0, 1.0])
+    with h5py.File(output, "a") as h5_file:
+        h5_file["fen"].resize(3, axis=0)
+        h5_file["fen"][2] = "garbage"
+
+    assert analyze_positions(input_path, output, STUB_MODEL_PATH, batch_size=2, num_workers=1) == len(fens) - 2
+
+    with h5py.File(output, "r") as h5_file:
+        assert h5_file.attrs["positions_done"] == len(fens)
+        assert [fen.decode() for fen in h5_file["fen"][:]] == fens
+        assert h5_file["best_move"][0] == b"a2a3"
+        assert np.all(h5_file["best_prob"][2:] > 0)
@@ -0,0 +1,111 @@
+import random
+from collections import Counter
+
+import chess
+import chess.polyglot
+import h5py
+import numpy as np
+import pytest
+
+from board_encoder import BoardEncoder
+from chess_game import ChessGame
+from game_records import GameRecordWriter
+from position_index import PositionIndex, legacy_keys, read_shard
+
+# white's e-pawn can take en passant after the last move
+OPENING = ["e2e4", "a7a6", "e4e5", "d7d5"]
+
+def play_game(seed, plies=30):
+    rng = random.Random(seed)
+    encoder, game = BoardEncoder(), ChessGame()
+    board = chess.Board()
+    positions = []
+
+    for ply in range(plies):
+        moves = list(board.legal_moves)
+        if not moves:
+            break
+        move = chess.Move.from_uci(OPENING[ply]) if ply < len(OPENING) else rng.choice(moves)
+
+        policy = np.zeros(game.action_size, dtype=np.float32)
+        policy[game.move_to_index(move)] = 1
+        positions.append((encoder.encode(board), policy, rng.uniform(-1, 1), chess.polyglot.zobrist_hash(board)))
+        board.push(move)
+
+    return positions
+
+def write_compact(path, games):
+    with GameRecordWriter(str(path)) as writer:
+        for positions in games:
+            writer.append_game(positions)
+
+def write_legacy(path, games):
+    with h5py.File(path, "w") as h5_file:
+        for i, positions in enumerate(games):
+            group = h5_file.create_group(f"game_{i}")
+            group.create_dataset("states", data=np.array([position[0] for position in positions]))
+            group.create_dataset("policies", data=np.array([position[1] for position in positions]))
+            group.create_dataset("values", data=np.array([[position[2]] for position in positions]))
+
+def stored_counts(index):
+    counts = Counter()
+    for path in index.shard_paths():
+        with h5py.File(path, "r") as h5_file:
+            counts.update(dict(zip(h5_file["keys"][:].tolist(), h5_file["counts"][:].tolist())))
+    return counts
+
+def test_legacy_keys_replay_the_game():
+    positions = play_game(0)
+    states = np.array([position[0] for position in positions])
+    assert legacy_keys(states).tolist() == [position[3] for position in positions]
+
+def test_legacy_and_compact_copies_of_a_game_merge(tmp_path):
+    games = [play_game(seed) for seed in range(3)]
+    write_legacy(tmp_path / "legacy.h5", games)
+    write_compact(tmp_path / "compact.h5", games)
+    expected = Counter(position[3] for positions in games for position in positions)
+
+    index = PositionIndex(str(tmp_path / "index"), shard_size=16, policy_width=8)
+    read, added = index.update(str(tmp_path / "legacy.h5"), batch_positions=20)
+    assert (read, added) == (sum(expected.values()), len(expected))
+
+    read, added = index.update(str(tmp_path / "compact.h5"), batch_positions=20)
+    assert added == 0
+    assert stored_counts(index) == Counter({key: 2 * count for key, count in expected.items()})
+
+    # merged sources are remembered across runs
+    assert PositionIndex(str(tmp_path / "index"), shard_size=16, policy_width=8).update(str(tmp_path)) == (0, 0)
+
+    states, policies, values, counts = next(read_shard(index.shard_paths()[0]))
+    assert np.allclose(policies.sum(axis=1), 1.0)
+
+def test_an_interrupted_batch_is_applied_once(tmp_path, monkeypatch):
+    games = [play_game(seed) for seed in range(3)]
+    (tmp_path / "games").mkdir()
+    write_compact(tmp_path / "games" / "first.h5", games)
+    expected = Counter(position[3] for positions in games for position in positions)
+
+    def crash(self):
+        raise RuntimeError("killed")
+
+    index = PositionIndex(str(tmp_path / "index"), shard_size=16, policy_width=8)
+    index.update(str(tmp_path / "games"))
+
+    # the same games again, merged into rows that already exist, and the process dies once the
+    # shards are updated but before the index is
+    write_compact(tmp_path / "games" / "second.h5", games)
+    with monkeypatch.context() as patch:
+        patch.setattr(PositionIndex, "save", crash)
+        with pytest.raises(RuntimeError):
+            index.update(str(tmp_path / "games"))
+
+    # opening the folder again applies the logged batch, and the rerun finds nothing left to merge
+    rerun = PositionIndex(str(tmp_path / "index"), shard_size=16, policy_width=8)
+    assert rerun.update(str(tmp_path / "games")) == (0, 0)
+    assert stored_counts(rerun) == Counter({key: 2 * count for key, count in expected.items()})
+
+def test_positions_without_keys_are_rejected(tmp_path):
+    positions = play_game(0, plies=2)
+    index = PositionIndex(str(tmp_path), shard_size=16, policy_width=8)
+    with pytest.raises(ValueError):
+        index.add_positions(np.zeros(2, dtype=np.uint64), *(np.array(column) for column in list(zip(*positions))[:3]))
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from game_records import ACTION_SIZE, STATE_SHAPE
+from replay_buffer import ReplayBuffer
+
+def positions(count, first_value):
+    states = np.zeros((count,) + STATE_SHAPE, dtype=np.float32)
+    policies = np.zeros((count, ACTION_SIZE), dtype=np.float32)
+    for i in range(count):
+        states[i].flat[i] = 1
+        policies[i, i] = 1
+    return states, policies, np.arange(first_value, first_value + count, dtype=np.float32)
+
+def test_sampling_an_empty_buffer_is_refused():
+    with pytest.raises(ValueError):
+        ReplayBuffer(capacity=8, policy_width=4).sample(2)
+
+def test_the_window_keeps_the_latest_positions():
+    buffer = ReplayBuffer(capacity=4, policy_width=4, seed=0)
+    buffer.add(*positions(3, 0))
+    buffer.add(*positions(3, 10))
+
+    assert len(buffer) == 4
+    assert buffer.positions_added == 6
+    states, policies, values = buffer.sample(64)
+    assert set(values.tolist()) <= {2.0, 10.0, 11.0, 12.0}
+    assert states.shape == (64,) + STATE_SHAPE
+    assert np.allclose(policies.sum(axis=1), 1.0)
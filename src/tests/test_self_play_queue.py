@@ -0,0 +1,98 @@
+import os
+import json
+import time
+import socket
+
+from self_play_queue import WorkQueue
+
+def read_claim(claim_path):
+    with open(claim_path) as claim_file:
+        return json.load(claim_file)
+
+def test_claim_records_the_lease_holder(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.submit({"seed": 1})
+
+    task, claim_path = queue.claim("worker-a")
+
+    lease = read_claim(claim_path)["lease"]
+    assert lease["worker_id"] == "worker-a"
+    assert lease["host"] == socket.gethostname()
+    assert lease["heartbeats"] == 0
+    assert queue.claim("worker-b") is None
+
+def test_heartbeats_keep_a_claim_alive_whatever_its_file_times(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.submit({"seed": 1})
+    task, claim_path = queue.claim("worker-a")
+
+    assert queue.requeue_expired(0.05) == []
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.heartbeat(claim_path, task)
+        # a worker host whose clock runs a day behind
+        os.utime(claim_path, (time.time() - 86400, time.time() - 86400))
+        assert queue.requeue_expired(0.05) == []
+
+    assert read_claim(claim_path)["lease"]["heartbeats"] == 3
+
+def test_a_claim_without_heartbeats_expires_and_is_retried(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.submit({"seed": 1})
+    task, claim_path = queue.claim("worker-a")
+
+    # the first sighting starts the lease on the coordinator's clock
+    assert queue.requeue_expired(0.05) == []
+    time.sleep(0.1)
+    assert queue.requeue_expired(0.05) == [task["task_id"]]
+
+    # the worker learns it lost the claim, and its heartbeat does not bring the claim back
+    assert not queue.heartbeat(claim_path, task)
+    assert not os.path.exists(claim_path)
+
+    retried, dead = queue.retry_failed(max_attempts=3)
+    assert retried == [task["task_id"]]
+    retried_task, _ = queue.claim("worker-b")
+    assert retried_task["attempts"] == 1
+    assert retried_task["lease"]["worker_id"] == "worker-b"
+
+def test_worker_plays_a_claimed_game_for_the_coordinator(tmp_path):
+    from self_play_queue import SelfPlayCoordinator, SelfPlayWorker
+    from model.stub_model import STUB_MODEL_PATH
+
+    coordinator = SelfPlayCoordinator(str(tmp_path / "queue"), lease_seconds=60)
+    coordinator.publish_model(STUB_MODEL_PATH)
+    task_ids = coordinator.submit_games(1, max_simulations=2, seed=0)
+
+    worker = SelfPlayWorker(str(tmp_path / "queue"), "worker-a", heartbeat_seconds=0.01)
+    assert worker.run(poll_interval=0.01, max_tasks=1) == 1
+
+    assert coordinator.run(task_ids, str(tmp_path / "games"), poll_interval=0.01, timeout=5) == 1
+    assert os.listdir(tmp_path / "games") == [f"{task_ids[0]}.h5"]
+
+def test_a_stale_worker_cannot_report_a_reclaimed_task(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.submit({"seed": 1})
+    stale_task, stale_path = queue.claim("worker-a")
+
+    queue.requeue_expired(0.05)
+    time.sleep(0.1)
+    assert queue.requeue_expired(0.05) == [stale_task["task_id"]]
+    queue.retry_failed(max_attempts=3)
+    live_task, live_path = queue.claim("worker-b")
+    assert live_path != stale_path
+
+    stale_games, live_games = tmp_path / "stale.tmp", tmp_path / "live.tmp"
+    stale_games.write_bytes(b"stale")
+    live_games.write_bytes(b"live")
+
+    assert not queue.heartbeat(stale_path, stale_task)
+    assert not queue.complete(stale_path, stale_task, str(stale_games))
+    assert not stale_games.exists()
+
+    assert queue.heartbeat(live_path, live_task)
+    assert queue.complete(live_path, live_task, str(live_games))
+    [done] = queue.finished()
+    assert done["lease"]["worker_id"] == "worker-b"
+    with open(done["games_path"], "rb") as games_file:
+        assert games_file.read() == b"live"
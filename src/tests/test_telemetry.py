@@ -0,0 +1,47 @@
+import chess
+
+from engine import ChessEngine
+from mcts import count_nodes
+from telemetry import GameTelemetry, SearchStats
+
+def test_tree_nodes_counts_the_reused_tree(stub_model):
+    engine = ChessEngine(stub_model, reuse_tree=True)
+    stats = SearchStats()
+    engine.set_stats(stats)
+    telemetry = GameTelemetry(engine, stats)
+
+    board = chess.Board()
+    for _ in range(2):
+        move, _, _ = engine.best_move(board, 200)
+        telemetry.record_move(board, move, 200, 0.0)
+        board.push(move)
+
+    first, second = telemetry.moves
+    assert first["tree_nodes"] == first["nodes_created"] + 1
+    # the second search starts from the subtree kept from the first one
+    assert second["tree_nodes"] > second["nodes_created"] + 1
+    assert second["tree_nodes"] == count_nodes(engine._search._last_root)
+
+    summary = telemetry.summary(board)
+    assert summary["max_tree_nodes"] == max(first["tree_nodes"], second["tree_nodes"])
+    assert summary["mean_tree_nodes"] == (first["tree_nodes"] + second["tree_nodes"]) / 2
+
+def test_tree_nodes_after_pruning(stub_model):
+    engine = ChessEngine(stub_model, max_nodes=100)
+    stats = SearchStats()
+    engine.set_stats(stats)
+    telemetry = GameTelemetry(engine, stats)
+
+    board = chess.Board()
+    move, _, _ = engine.best_move(board, 500)
+    telemetry.record_move(board, move, 500, 0.0)
+
+    record = telemetry.moves[0]
+    assert record["counts"]["nodes_pruned"] > 0
+    assert record["tree_nodes"] <= 100
+    assert record["tree_nodes"] < record["nodes_created"]
+
+def test_array_tree_reports_its_size(stub_model):
+    engine = ChessEngine(stub_model, array_tree=True)
+    engine.best_move(chess.Board(), 50)
+    assert engine.tree_stats()["nodes"] > 50
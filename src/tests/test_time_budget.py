@@ -0,0 +1,56 @@
+import threading
+import time
+
+import chess
+import numpy as np
+
+from engine import ChessEngine
+from mcts import MCTS, out_of_time, stop_requested
+
+STALEMATE = "7k/5Q2/6K1/8/8/8/8/8 b - - 0 1"
+
+def test_out_of_time_rules():
+    now = time.perf_counter()
+    # nothing visited yet: keep going even past the deadline
+    assert not out_of_time(np.array([0, 0]), 0, 100, now - 1, now - 0.5)
+    assert out_of_time(np.array([3, 1]), 4, 100, now - 1, now - 0.5)
+    # a single legal move needs no search
+    assert out_of_time(np.array([1]), 1, 100, now, now + 10)
+    # a root without moves has nothing to search
+    assert out_of_time(np.array([]), 1, 100, now, now + 10)
+    # the leader is 90 ahead with at most 10 simulations left
+    assert out_of_time(np.array([95, 5]), 100, 110, now - 1, now + 10)
+    assert not out_of_time(np.array([50, 45]), 95, 1000, now - 1, now + 10)
+
+def test_stop_requested_needs_a_visited_move():
+    event = threading.Event()
+    assert not stop_requested(np.array([0, 0]), event)
+    event.set()
+    assert not stop_requested(np.array([0, 0]), event)
+    assert stop_requested(np.array([0, 1]), event)
+    assert stop_requested(np.array([]), event)
+
+def test_deadline_search_on_a_terminal_root_returns_at_once(stub_model):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game)
+
+    started = time.perf_counter()
+    search.search(chess.Board(STALEMATE), None, deadline=time.perf_counter() + 5)
+    assert time.perf_counter() - started < 1
+
+def test_timed_move_without_a_cap_runs_until_the_deadline(stub_model):
+    engine = ChessEngine(stub_model)
+    started = time.perf_counter()
+    move, _, _, simulations = engine.timed_best_move(chess.Board(), 0.3)
+
+    assert move in chess.Board().legal_moves
+    assert simulations > 100
+    assert time.perf_counter() - started < 1
+
+def test_a_search_too_short_to_visit_a_move_still_plays_a_legal_one(stub_model):
+    board = chess.Board()
+    for array_tree in (False, True):
+        engine = ChessEngine(stub_model, array_tree=array_tree)
+        move, policy, _ = engine.best_move(board, 1)
+        assert move in board.legal_moves
+        assert np.isclose(policy.sum(), 1.0)
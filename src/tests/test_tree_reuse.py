@@ -0,0 +1,51 @@
+import chess
+import numpy as np
+import pytest
+
+from engine import ChessEngine
+from mcts import MCTS
+
+def most_visited(node):
+    return max(node.children.items(), key=lambda item: item[1].visit_count)
+
+@pytest.mark.parametrize("path_replay", [False, True])
+def test_the_subtree_of_the_played_moves_is_searched_on(stub_model, path_replay):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game, reuse_tree=True, path_replay=path_replay)
+    board = chess.Board()
+
+    search.search(board, 300)
+    move, child = most_visited(search._last_root)
+    reply, grandchild = most_visited(child)
+    visits = grandchild.visit_count
+    assert visits > 0
+
+    board.push(engine.game.index_to_move(move))
+    board.push(engine.game.index_to_move(reply))
+    search.search(board, 100)
+
+    root = search._last_root
+    assert root is grandchild
+    assert root.parent is None and root.state == board
+    assert root.visit_count == visits + 100
+
+def test_an_unrelated_position_starts_a_new_tree(stub_model):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game, reuse_tree=True)
+    search.search(chess.Board(), 100)
+
+    board = chess.Board()
+    board.push_uci("a2a3")
+    board.push_uci("h7h6")
+    # a board set up from a FEN has no moves to follow down the old tree
+    other = chess.Board(board.fen())
+    assert search.start_search(other).visit_count == 0
+
+    search.reset()
+    assert search.start_search(chess.Board()).visit_count == 0
+
+def test_engine_moves_are_unchanged_by_reuse_on_a_fresh_tree(stub_model):
+    board = chess.Board()
+    fresh = ChessEngine(stub_model, reuse_tree=False).best_move(board, 100)[1]
+    reused = ChessEngine(stub_model, reuse_tree=True).best_move(board, 100)[1]
+    assert np.array_equal(fresh, reused)
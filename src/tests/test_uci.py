@@ -0,0 +1,79 @@
+import io
+import time
+
+import chess
+
+from engine import ChessEngine
+from uci import UCIEngine, value_to_centipawns
+
+def start(stub_model):
+    output = io.StringIO()
+    return UCIEngine(ChessEngine(stub_model, reuse_tree=True), output_stream=output), output
+
+def lines(output):
+    return output.getvalue().splitlines()
+
+def wait_for_search(uci):
+    uci._thread.join(timeout=30)
+    assert not uci._thread.is_alive()
+
+def test_centipawns_follow_the_value():
+    assert value_to_centipawns(0) == 0
+    assert value_to_centipawns(0.5) == -value_to_centipawns(-0.5) > 0
+    assert value_to_centipawns(0.5) < value_to_centipawns(0.9) < value_to_centipawns(1.5)
+
+def test_handshake_and_options(stub_model):
+    uci, output = start(stub_model)
+    uci.handle("uci")
+    uci.handle("setoption name MoveOverhead value 10")
+    uci.handle("setoption name Ponder value true")
+    uci.handle("isready")
+
+    assert lines(output)[-2:] == ["uciok", "readyok"]
+    assert uci._options["MoveOverhead"] == 10 and uci._options["Ponder"] is True
+    assert not uci.handle("quit")
+
+def test_go_nodes_plays_a_legal_move(stub_model):
+    uci, output = start(stub_model)
+    uci.handle("position startpos moves e2e4 e7e5")
+    uci.handle("go nodes 20")
+    wait_for_search(uci)
+
+    board = chess.Board()
+    board.push_uci("e2e4")
+    board.push_uci("e7e5")
+    info, bestmove = lines(output)[-2:]
+    assert info.startswith("info depth ") and " nodes 20 " in info
+    assert chess.Move.from_uci(bestmove.split()[1]) in board.legal_moves
+
+def test_a_mated_position_answers_0000(stub_model):
+    uci, output = start(stub_model)
+    uci.handle("position fen rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3")
+    uci.handle("go nodes 10")
+    wait_for_search(uci)
+
+    assert lines(output) == ["bestmove 0000"]
+
+def test_infinite_search_waits_for_stop(stub_model):
+    uci, output = start(stub_model)
+    uci.handle("position startpos")
+    uci.handle("go infinite")
+    time.sleep(0.3)
+    uci.handle("isready")
+    assert lines(output) == ["readyok"]
+
+    uci.handle("stop")
+    assert uci._thread is None
+    assert lines(output)[-1].startswith("bestmove ")
+
+def test_ponderhit_switches_to_the_clock(stub_model):
+    uci, output = start(stub_model)
+    uci.handle("position startpos moves e2e4")
+    uci.handle("go ponder wtime 1000 btime 1000")
+    time.sleep(0.3)
+    # no move may be sent while pondering
+    assert not [line for line in lines(output) if line.startswith("bestmove")]
+
+    uci.handle("ponderhit")
+    wait_for_search(uci)
+    assert lines(output)[-1].startswith("bestmove ")
@@ -0,0 +1,41 @@
+import chess
+import numpy as np
+import pytest
+
+from chess_game import ChessGame
+from engine import ChessEngine
+from mcts import MCTS, select_top_policies
+
+def test_priors_are_a_softmax_over_legal_moves():
+    game = ChessGame()
+    board = chess.Board()
+    policy = np.random.default_rng(0).standard_normal(game.action_size).astype(np.float32)
+    # a huge logit on an illegal move must not leak into the priors
+    policy[game.move_to_index(chess.Move.from_uci("a1a8"))] = 100
+
+    indices, priors = select_top_policies(game, board, policy, k_top=None)
+    legal = {game.move_to_index(move) for move in board.legal_moves}
+    assert set(indices.tolist()) == legal
+    assert np.isclose(priors.sum(), 1)
+    assert np.all(np.diff(priors) <= 0)
+
+    top_indices, top_priors = select_top_policies(game, board, policy, k_top=5)
+    assert top_indices.tolist() == indices[:5].tolist()
+    assert np.allclose(top_priors, priors[:5])
+
+def test_widening_opens_moves_with_visits(stub_model):
+    engine = ChessEngine(stub_model)
+    search = MCTS(engine, engine.game, widening=2)
+    board = chess.Board()
+
+    search.search(board, 400)
+    root = search._last_root
+    assert len(root.best_policies) == min(20, 10 + int(2 * np.sqrt(root.visit_count)))
+
+    fixed = MCTS(engine, engine.game)
+    fixed.search(board, 400)
+    assert len(fixed._last_root.best_policies) == 10
+
+def test_widening_is_rejected_with_the_array_tree(stub_model):
+    with pytest.raises(ValueError):
+        ChessEngine(stub_model, array_tree=True, widening=1)
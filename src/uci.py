@@ -0,0 +1,232 @@
+import sys
+import math
+import time
+import threading
+import chess
+
+ENGINE_NAME = "chess-ai"
+ENGINE_AUTHOR = "mb4ndeira"
+GO_FLAGS = ("infinite", "ponder")
+GO_LIMITS = ("wtime", "btime", "winc", "binc", "movestogo", "movetime", "nodes", "depth")
+
+def value_to_centipawns(value):
+    # maps the [-1, 1] value head onto a pawn scale, steep near the ends
+    value = max(-0.999, min(0.999, float(value)))
+    return int(round(111.714640912 * math.tan(1.5620688421 * value)))
+
+class UCIEngine:
+    """
+    UCI front end around a ChessEngine that stays loaded for the whole session.
+
+    Searches run in a background thread so `stop`, `ponderhit` and `isready` are answered
+    while searching. The engine keeps its search tree between `position`/`go` commands.
+    """
+    def __init__(self, engine, input_stream=None, output_stream=None, batch_size=1, C=1.41):
+        self._engine = engine
+        self._input = input_stream or sys.stdin
+        self._output = output_stream or sys.stdout
+        self._output_lock = threading.Lock()
+
+        self._board = chess.Board()
+        self._base_fen = chess.STARTING_FEN
+        self._options = {"Ponder": False, "MoveOverhead": 50, "BatchSize": batch_size}
+        self._C = C
+
+        self._state_lock = threading.Lock()
+        self._thread = None
+        self._interrupt = threading.Event()
+        self._pondering = False
+        self._stopped = False
+
+    def run(self):
+        for line in self._input:
+            if not self.handle(line):
+                break
+
+        self._stop_search()
+
+    def send(self, line):
+        with self._output_lock:
+            self._output.write(line + "\n")
+            self._output.flush()
+
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+
+        command, args = tokens[0], tokens[1:]
+
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send("option name Ponder type check default false")
+            self.send("option name MoveOverhead type spin default 50 min 0 max 5000")
+            self.send(f"option name BatchSize type spin default {self._options['BatchSize']} min 1 max 256")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self._set_option(args)
+        elif command == "ucinewgame":
+            self._stop_search()
+            self._engine.reset()
+        elif command == "position":
+            self._stop_search()
+            self._set_position(args)
+        elif command == "go":
+            self._stop_search()
+            self._go(args)
+        elif command == "stop":
+            self._stop_search()
+        elif command == "ponderhit":
+            with self._state_lock:
+                # the search carries on under the normal time control, from this moment
+                self._pondering = False
+                self._interrupt.set()
+        elif command == "quit":
+            return False
+
+        return True
+
+    def _set_option(self, args):
+        if "name" not in args:
+            return
+
+        value_at = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:value_at])
+        value = " ".join(args[value_at + 1:])
+
+        if name == "Ponder":
+            self._options[name] = value.lower() == "true"
+        elif name in ("MoveOverhead", "BatchSize"):
+            self._options[name] = int(value)
+
+    def _set_position(self, args):
+        if not args:
+            return
+
+        moves_at = args.index("moves") if "moves" in args else len(args)
+        if args[0] == "startpos":
+            fen = chess.STARTING_FEN
+        elif args[0] == "fen":
+            fen = " ".join(args[1:moves_at])
+        else:
+            return
+
+        if fen != self._base_fen:
+            # the kept tree is matched by move history, which only holds from the same start position
+            self._engine.reset()
+            self._base_fen = fen
+
+        board = chess.Board(fen)
+        for move in args[moves_at + 1:]:
+            board.push_uci(move)
+        self._board = board
+
+    def _go(self, args):
+        params = {}
+        for i, token in enumerate(args):
+            if token in GO_FLAGS:
+                params[token] = True
+            elif token in GO_LIMITS and i + 1 < len(args):
+                params[token] = int(args[i + 1])
+
+        with self._state_lock:
+            self._interrupt.clear()
+            self._pondering = params.get("ponder", False)
+            self._stopped = False
+
+        self._thread = threading.Thread(target=self._search, args=(self._board.copy(), params), daemon=True)
+        self._thread.start()
+
+    def _stop_search(self):
+        if self._thread is None:
+            return
+
+        with self._state_lock:
+            self._stopped = True
+            self._interrupt.set()
+
+        self._thread.join()
+        self._thread = None
+
+    def _move_time(self, board, params):
+        if "movetime" in params:
+            budget = params["movetime"]
+        elif "wtime" in params or "btime" in params:
+            time_left = params.get("wtime" if board.turn else "btime", 0)
+            increment = params.get("winc" if board.turn else "binc", 0)
+            moves_to_go = params.get("movestogo", 30)
+
+            budget = time_left / max(moves_to_go, 1) + increment * 0.8
+            budget = min(budget, time_left * 0.5)
+        else:
+            return None
+
+        return max(budget - self._options["MoveOverhead"], 1) / 1000
+
+    def _search(self, board, params):
+        if board.is_game_over():
+            self.send("bestmove 0000")
+            return
+
+        started = time.perf_counter()
+        simulations = 0
+        pruned = 0
+        infinite = params.get("infinite", False)
+
+        while True:
+            with self._state_lock:
+                pondering = self._pondering
+                if not pondering and not self._stopped:
+                    # a ponderhit only interrupts the open-ended ponder search
+                    self._interrupt.clear()
+
+            move_time = None if pondering or infinite else self._move_time(board, params)
+            max_simulations = params.get("nodes")
+            if move_time is None and max_simulations is None and not (pondering or infinite):
+                max_simulations = 800
+
+            move, _, value, done = self._engine.timed_best_move(
+                board, move_time, self._C, self._options["BatchSize"], max_simulations, self._interrupt
+            )
+            simulations += done
+            tree_stats = self._engine.tree_stats()
+            pruned += tree_stats["pruned"] if tree_stats else 0
+
+            with self._state_lock:
+                if pondering and not self._stopped and not self._pondering:
+                    continue
+
+            if (pondering or infinite) and not self._stopped:
+                # UCI expects no bestmove before `stop` while pondering or in infinite mode
+                self._interrupt.wait()
+                if not self._stopped:
+                    continue
+            break
+
+        if pruned:
+            self.send(f"info string node budget reached, {pruned} nodes pruned, {tree_stats['nodes']} in the tree")
+        self._send_result(board, move, value, simulations, time.perf_counter() - started)
+
+    def _send_result(self, board, move, value, simulations, elapsed):
+        value = float(value.reshape(-1)[0]) if hasattr(value, "reshape") else float(value)
+        # the value head scores positions for white
+        score = value_to_centipawns(value if board.turn else -value)
+
+        pv = self._engine.principal_variation()
+        if not pv or pv[0] != move:
+            pv = [move]
+
+        self.send(
+            f"info depth {len(pv)} nodes {simulations} time {int(elapsed * 1000)} "
+            f"nps {int(simulations / max(elapsed, 1e-9))} score cp {score} pv {' '.join(m.uci() for m in pv)}"
+        )
+
+        ponder_board = board.copy()
+        ponder_board.push(move)
+        if len(pv) > 1 and pv[1] in ponder_board.legal_moves:
+            self.send(f"bestmove {move.uci()} ponder {pv[1].uci()}")
+        else:
+            self.send(f"bestmove {move.uci()}")